@@ -0,0 +1,68 @@
+// 邻接索引 data/adjacency.bin（由 organize_data.py 生成，格式见 adjacency.py）
+// 按节点 uid 存放出边、入边的压缩稀疏行数组，读取为类型化数组后，查找一个节点的关系只需访问它自己的区间
+
+const ADJACENCY_URL = 'data/adjacency.bin';
+const ADJACENCY_MAGIC = 'KGCS';
+const ADJACENCY_FORMAT_VERSION = 1;
+const ADJACENCY_ARRAY_TYPES = { uint32: Uint32Array, uint16: Uint16Array };
+let adjacencyPromise = null;
+
+// 解析索引文件：各数组直接引用 buffer，不复制
+function parseAdjacency(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== ADJACENCY_MAGIC) {
+        throw new Error('不是邻接索引文件');
+    }
+    const headerLength = view.getUint32(4, true);
+    const header = JSON.parse(new TextDecoder('utf-8').decode(new Uint8Array(buffer, 8, headerLength)));
+    if (header.version !== ADJACENCY_FORMAT_VERSION) {
+        throw new Error(`不支持的邻接索引版本: ${header.version}`);
+    }
+    const adjacency = {
+        nodeCount: header.node_count,
+        edgeCount: header.edge_count,
+        types: header.types,
+        dataVersion: header.data_version
+    };
+    Object.entries(header.sections).forEach(([name, [offset, count, kind]]) => {
+        // out_offsets -> outOffsets
+        const key = name.replace(/_(\w)/g, (_, c) => c.toUpperCase());
+        adjacency[key] = new ADJACENCY_ARRAY_TYPES[kind](buffer, offset, count);
+    });
+    return adjacency;
+}
+
+// 加载邻接索引（只请求一次）
+function fetchAdjacency() {
+    if (!adjacencyPromise) {
+        adjacencyPromise = fetchAsset(ADJACENCY_URL).then(async response => {
+            if (!response.ok) {
+                throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+            }
+            return parseAdjacency(await response.arrayBuffer());
+        });
+        adjacencyPromise.catch(() => { adjacencyPromise = null; });
+    }
+    return adjacencyPromise;
+}
+
+// 节点的全部关系：[{ neighbor, edge, type, outgoing }]，edge 为关系在 combined.relationships 中的下标
+function adjacencyEdges(adjacency, uid) {
+    const result = [];
+    if (!(uid >= 0 && uid < adjacency.nodeCount)) return result;
+    [
+        [adjacency.outOffsets, adjacency.outNeighbors, adjacency.outEdges, adjacency.outTypes, true],
+        [adjacency.inOffsets, adjacency.inNeighbors, adjacency.inEdges, adjacency.inTypes, false]
+    ].forEach(([offsets, neighbors, edges, types, outgoing]) => {
+        for (let i = offsets[uid]; i < offsets[uid + 1]; i++) {
+            result.push({ neighbor: neighbors[i], edge: edges[i], type: adjacency.types[types[i]], outgoing });
+        }
+    });
+    return result;
+}
+
+// 相邻节点的 uid（去重）
+function adjacencyNeighbors(adjacency, uid) {
+    return [...new Set(adjacencyEdges(adjacency, uid).map(entry => entry.neighbor))];
+}
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩稀疏行（CSR）格式的邻接索引 data/adjacency.bin
+按节点 uid 存放出边、入边的偏移、邻居 uid、关系下标和关系类型，
+查找一个节点的邻居只需读取它自己的区间（O(度数)），不必遍历全部关系。
+Python 中通过 mmap 零拷贝读取（load_adjacency），前端通过 adjacency.js 读取为类型化数组
+
+文件格式（小端）：
+    4 字节魔数 KGCS，4 字节头部长度 H，H 字节 JSON 头部（补空格到 8 字节对齐），其后为各数组；
+    头部记录 node_count、edge_count、types（类型表）、data_version，
+    以及 sections：数组名 -> [相对文件开头的字节偏移, 元素个数, 'uint32' 或 'uint16']
+
+    out_offsets[u] .. out_offsets[u + 1] 为节点 u 的出边在 out_neighbors / out_edges / out_types 中的区间，
+    in_* 同理为入边；out_edges / in_edges 为关系在 combined.relationships 中的下标
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from content_hash import write_if_changed
+
+# 索引文件（相对于网站根目录）
+ADJACENCY_FILE = os.path.join('data', 'adjacency.bin')
+
+MAGIC = b'KGCS'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+# 数组名 -> (array 类型码, 头部中的类型名)
+SECTIONS = {
+    'out_offsets': ('I', 'uint32'),
+    'out_neighbors': ('I', 'uint32'),
+    'out_edges': ('I', 'uint32'),
+    'out_types': ('H', 'uint16'),
+    'in_offsets': ('I', 'uint32'),
+    'in_neighbors': ('I', 'uint32'),
+    'in_edges': ('I', 'uint32'),
+    'in_types': ('H', 'uint16')
+}
+
+# out_types / in_types 为 uint16，关系类型最多 65536 种
+MAX_TYPES = 1 << 16
+
+def _csr(node_count, keys):
+    """
+    按 keys（边的一端）计数排序，返回 (偏移数组, 排序后的边序号：第 k 个位置放原来的第 order[k] 条边)
+
+    同一节点的边保持在 combined.relationships 中的先后顺序
+    """
+    offsets = array('I', bytes(4 * (node_count + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    position = array('I', offsets[:-1])
+    order = array('I', bytes(4 * len(keys)))
+    for i, key in enumerate(keys):
+        order[position[key]] = i
+        position[key] += 1
+    return offsets, order
+
+def build_adjacency(all_data):
+    """
+    由合并数据构建邻接索引；两端都有 uid 的关系才计入
+
+    Returns:
+        (节点数, 类型表, 数组名 -> array)
+    """
+    nodes = all_data['combined']['nodes']
+    node_count = max((node['uid'] for node in nodes if node.get('uid') is not None), default=-1) + 1
+
+    types = {}
+    sources, targets, edges, type_ids = array('I'), array('I'), array('I'), array('H')
+    for index, rel in enumerate(all_data['combined']['relationships']):
+        source, target = rel.get('source_uid'), rel.get('target_uid')
+        if source is None or target is None or source >= node_count or target >= node_count:
+            continue
+        sources.append(source)
+        targets.append(target)
+        edges.append(index)
+        type_id = types.setdefault(rel.get('type', ''), len(types))
+        if type_id >= MAX_TYPES:
+            raise ValueError(f"关系类型超过 {MAX_TYPES} 种，无法写入 uint16 类型数组")
+        type_ids.append(type_id)
+
+    sections = {}
+    for side, keys, others in (('out', sources, targets), ('in', targets, sources)):
+        offsets, order = _csr(node_count, keys)
+        sections[f'{side}_offsets'] = offsets
+        sections[f'{side}_neighbors'] = array('I', (others[i] for i in order))
+        sections[f'{side}_edges'] = array('I', (edges[i] for i in order))
+        sections[f'{side}_types'] = array('H', (type_ids[i] for i in order))
+    return node_count, list(types), sections
+
+def _padding(length):
+    return -length % ALIGNMENT
+
+def encode_adjacency(node_count, types, sections, data_version=None):
+    """编码为索引文件内容"""
+    # 头部长度取决于各数组的偏移，偏移又取决于头部长度：先按占位偏移估计，不够时放大重试
+    reserved = 0
+    while True:
+        layout = {}
+        offset = 8 + reserved
+        for name, (_, kind) in SECTIONS.items():
+            values = sections[name]
+            layout[name] = [offset, len(values), kind]
+            offset += values.itemsize * len(values)
+            offset += _padding(offset)
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'node_count': node_count,
+            'edge_count': len(sections['out_edges']),
+            'types': types,
+            'data_version': data_version,
+            'sections': layout
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(header) <= reserved:
+            break
+        reserved = len(header) + _padding(8 + len(header))
+
+    parts = [MAGIC, struct.pack('<I', reserved), header.ljust(reserved, b' ')]
+    length = 8 + reserved
+    for name in SECTIONS:
+        values = sections[name]
+        if sys.byteorder != 'little':
+            values = array(values.typecode, values)
+            values.byteswap()
+        data = values.tobytes()
+        parts.append(data)
+        length += len(data)
+        parts.append(b'\0' * _padding(length))
+        length += _padding(length)
+    return b''.join(parts)
+
+def write_adjacency(all_data, base_dir):
+    """
+    写入邻接索引，内容未变化时不重写
+
+    Returns:
+        (是否写入, 节点数, 关系数)
+    """
+    node_count, types, sections = build_adjacency(all_data)
+    data = encode_adjacency(node_count, types, sections, all_data.get('metadata', {}).get('data_version'))
+    file_path = os.path.join(base_dir, ADJACENCY_FILE)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return write_if_changed(file_path, data), node_count, len(sections['out_edges'])
+
+class Adjacency:
+    """
+    内存映射的邻接索引
+
+    各数组为映射文件上的 memoryview，切片不复制数据；用完后调用 close()（或使用 with 语句）
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if buffer[:4] != MAGIC:
+            buffer.release()
+            self._mmap.close()
+            raise ValueError(f"{file_path} 不是邻接索引文件")
+        length = struct.unpack_from('<I', buffer, 4)[0]
+        header = json.loads(bytes(buffer[8:8 + length]))
+        if header['version'] != FORMAT_VERSION:
+            buffer.release()
+            self._mmap.close()
+            raise ValueError(f"不支持的邻接索引版本: {header['version']}")
+
+        self.node_count = header['node_count']
+        self.edge_count = header['edge_count']
+        self.types = header['types']
+        self.data_version = header.get('data_version')
+        self._views = [buffer]
+        for name, (offset, count, _) in header['sections'].items():
+            typecode = SECTIONS[name][0]
+            view = buffer[offset:offset + count * array(typecode).itemsize]
+            if sys.byteorder == 'little':
+                values = view.cast(typecode)
+                self._views += [view, values]
+            else:
+                # 大端机器上只能复制后转换字节序
+                values = array(typecode, view.tobytes())
+                values.byteswap()
+                view.release()
+            setattr(self, name, values)
+
+    def close(self):
+        for name in SECTIONS:
+            setattr(self, name, None)
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def out_range(self, uid):
+        return self.out_offsets[uid], self.out_offsets[uid + 1]
+
+    def in_range(self, uid):
+        return self.in_offsets[uid], self.in_offsets[uid + 1]
+
+    def out_neighbors_of(self, uid):
+        start, end = self.out_range(uid)
+        return self.out_neighbors[start:end]
+
+    def in_neighbors_of(self, uid):
+        start, end = self.in_range(uid)
+        return self.in_neighbors[start:end]
+
+    def degree(self, uid):
+        """出度与入度之和"""
+        return (self.out_offsets[uid + 1] - self.out_offsets[uid]) + (self.in_offsets[uid + 1] - self.in_offsets[uid])
+
+    def edges_of(self, uid):
+        """
+        节点的全部关系：[(邻居 uid, 关系下标, 类型名, 是否为出边), ...]
+        """
+        result = []
+        for side, outgoing in (('out', True), ('in', False)):
+            offsets = getattr(self, f'{side}_offsets')
+            neighbors = getattr(self, f'{side}_neighbors')
+            edges = getattr(self, f'{side}_edges')
+            types = getattr(self, f'{side}_types')
+            for i in range(offsets[uid], offsets[uid + 1]):
+                result.append((neighbors[i], edges[i], self.types[types[i]], outgoing))
+        return result
+
+    def neighbors(self, uid):
+        """相邻节点的 uid（出边和入边，去重，按首次出现的顺序）"""
+        return list(dict.fromkeys(list(self.out_neighbors_of(uid)) + list(self.in_neighbors_of(uid))))
+
+def load_adjacency(base_dir):
+    """读取网站目录中的邻接索引，文件不存在时返回 None"""
+    file_path = os.path.join(base_dir, ADJACENCY_FILE)
+    if not os.path.exists(file_path):
+        return None
+    return Adjacency(file_path)
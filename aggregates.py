@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+汇总统计文件 data/stats.json
+按数据集、标签、关系类型、CSV关系文件和地区计数，在 organize_data 构建合并图时一并计算；
+首页和概览页只需加载这个几 KB 的文件，不必下载 data.json 或分片
+"""
+
+import os
+from collections import Counter
+
+from content_hash import write_if_changed
+from geo_regions import coordinates, region_of
+from json_writer import encode
+from knowledge_graph import CATEGORIES
+
+# 统计文件（相对于网站根目录）
+STATS_FILE = os.path.join('data', 'stats.json')
+
+# 坐标不在任何地区内、没有坐标的节点所在的分组
+OUTSIDE_REGION = '区域外'
+NO_COORDINATES = '无坐标'
+
+def _sorted_counts(counter):
+    """按数量从多到少排列的计数字典"""
+    return dict(sorted(counter.items(), key=lambda item: (-item[1], item[0])))
+
+def region_counts(graph, regions, categories):
+    """
+    各地区的节点数量及各类别数量
+
+    Args:
+        categories: graph.categories(partial=True) 的结果
+    """
+    category_of = {}
+    for key, indexes in categories.items():
+        for i in indexes:
+            category_of.setdefault(i, []).append(key)
+
+    counts = {}
+    for i, props in enumerate(graph.node_props):
+        point = coordinates(props)
+        if point is None:
+            name = NO_COORDINATES
+        else:
+            name = region_of(regions, *point) or OUTSIDE_REGION
+        entry = counts.setdefault(name, dict({'total': 0}, **{key: 0 for key in CATEGORIES}))
+        entry['total'] += 1
+        for key in category_of.get(i, ()):
+            entry[key] += 1
+    # 地区按边界文件中的顺序，其后为区域外和无坐标
+    order = [region.name for region in regions] + [OUTSIDE_REGION, NO_COORDINATES]
+    return {name: counts[name] for name in order if name in counts}
+
+def build_aggregates(graph, all_data, csv_edge_counts, regions):
+    """
+    由合并图计算汇总统计
+
+    Args:
+        graph: 合并后的 KnowledgeGraph
+        all_data: merge_sources 生成的数据
+        csv_edge_counts: CSV关系文件名 -> 连接出的边数
+        regions: geo_regions.load_regions 的结果，为空时不按地区统计
+    """
+    categories = graph.categories(partial=True)
+    summary = all_data['combined']['summary']
+
+    datasets = []
+    for dataset in all_data['datasets']:
+        indexes = graph.in_dataset(dataset['dataset'])
+        datasets.append({
+            'dataset': dataset['dataset'],
+            'data_source': dataset.get('data_source'),
+            'summary': dataset['summary'],
+            'labels': _sorted_counts(Counter(label for i in indexes for label in graph.node_labels[i])),
+            'relationship_types': _sorted_counts(Counter(rel.get('type', '') for rel in dataset['relationships']))
+        })
+
+    descriptions = all_data.get('metadata', {}).get('data_sources', {})
+    csv_files = {
+        file_name: {
+            'description': descriptions.get(file_name),
+            'rows': len(rows),
+            'edges': csv_edge_counts.get(file_name, 0)
+        }
+        for file_name, rows in all_data.get('csv_relationships', {}).items()
+    }
+
+    aggregates = {
+        'summary': summary,
+        'datasets': datasets,
+        'labels': _sorted_counts(graph.label_counts()),
+        'relationship_types': _sorted_counts(graph.edge_type_counts()),
+        'csv_files': csv_files
+    }
+    if regions:
+        aggregates['regions'] = region_counts(graph, regions, categories)
+    return aggregates
+
+def write_aggregates(aggregates, base_dir):
+    """写入统计文件，内容未变化时不重写，返回是否写入"""
+    file_path = os.path.join(base_dir, STATS_FILE)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return write_if_changed(file_path, encode(aggregates, pretty=True))
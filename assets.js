@@ -0,0 +1,30 @@
+// 已发布资源的地址解析
+// publish.py 把数据和边界文件按内容哈希重命名后放在 dist/ 中，asset-manifest.json 记录原路径到实际文件的映射；
+// 没有清单（未运行 publish.py）或清单中没有该文件时使用原路径
+
+const ASSET_MANIFEST_URL = 'asset-manifest.json';
+let assetManifestPromise = null;
+
+// 加载资源清单（只请求一次）；清单地址固定，每次都向服务器确认是否更新
+function fetchAssetManifest() {
+    if (!assetManifestPromise) {
+        assetManifestPromise = fetch(ASSET_MANIFEST_URL, { cache: 'no-cache' })
+            .then(response => (response.ok ? response.json() : { assets: {} }))
+            .catch(() => ({ assets: {} }));
+    }
+    return assetManifestPromise;
+}
+
+// 原路径 -> 实际地址（各段分别编码，文件名中可以有中文和特殊字符）
+async function resolveAsset(path) {
+    const key = path.replace(/^\.\//, '').replace(/^\//, '');
+    const manifest = await fetchAssetManifest();
+    const entry = manifest.assets && manifest.assets[key];
+    const file = entry ? entry.file : key;
+    return file.split('/').map(encodeURIComponent).join('/');
+}
+
+// 按原路径请求资源
+async function fetchAsset(path, options) {
+    return fetch(await resolveAsset(path), options);
+}
@@ -0,0 +1,53 @@
+// 节点名称的前缀自动补全索引 data/autocomplete.json（由 organize_data.py 生成，格式见 autocomplete.py）
+// 名称、全拼和拼音首字母都是排序好的键，补全时二分查找前缀区间；区间很大的短前缀直接使用预先算好的结果
+
+const AUTOCOMPLETE_URL = 'data/autocomplete.json';
+// 键中去掉的字符，必须与 autocomplete.py 中的 _IGNORED 相同
+const COMPLETION_IGNORED = /[\s'’·•・]+/g;
+let autocompletePromise = null;
+
+// 加载补全索引（只请求一次），尚未生成时返回 null
+function fetchAutocomplete() {
+    if (!autocompletePromise) {
+        autocompletePromise = fetchAsset(AUTOCOMPLETE_URL).then(response => {
+            if (response.status === 404) return null;
+            if (!response.ok) {
+                throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+            }
+            return response.json();
+        });
+        autocompletePromise.catch(() => { autocompletePromise = null; });
+    }
+    return autocompletePromise;
+}
+
+function normalizeCompletionKey(text) {
+    return String(text).normalize('NFKC').toLowerCase().replace(COMPLETION_IGNORED, '');
+}
+
+// 补全：返回 [{ name, weight, uids }]，按权重从高到低，与 autocomplete.Autocomplete.complete 一致
+function completeName(index, text, limit = index.k) {
+    const prefix = normalizeCompletionKey(text);
+    if (!prefix) return [];
+    let ids = index.top[prefix];
+    if (!ids || (limit > ids.length && ids.length === index.k)) {
+        // 第一个不小于 prefix 的键（JavaScript 字符串按 UTF-16 码元比较，与生成时的排序相同）
+        const keys = index.keys;
+        let low = 0;
+        let high = keys.length;
+        while (low < high) {
+            const mid = (low + high) >> 1;
+            if (keys[mid] < prefix) low = mid + 1;
+            else high = mid;
+        }
+        const found = new Set();
+        for (let i = low; i < keys.length && keys[i].startsWith(prefix); i++) {
+            found.add(index.targets[i]);
+        }
+        ids = [...found].sort((a, b) => a - b);
+    }
+    return ids.slice(0, limit).map(i => {
+        const [name, weight, uids] = index.entries[i];
+        return { name, weight, uids };
+    });
+}
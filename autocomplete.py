@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点名称的前缀自动补全索引 data/autocomplete.json
+每个名称按 名称、全拼（jiangjieshi）和拼音首字母（jjs）三种键排序保存，
+补全时二分查找前缀所在的区间；区间很大的短前缀预先算好前 k 个结果，其余区间不超过 SCAN_LIMIT 个键，
+因此每次补全只需一次二分查找和少量比较。
+名称排序后编号，编号越小排名越靠前：有 `权重` 属性的名称按权重排在前面，其余按关系数（度数）排在后面。
+拼音需要安装 pypinyin（pip install pypinyin），未安装时只按名称前缀补全；前端对应的函数见 autocomplete.js
+
+用法：
+    python autocomplete.py jjs        # 在已生成的索引中补全
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+
+from content_hash import write_if_changed
+from entity_resolution import entity_name
+from json_writer import encode
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+# 设置输出编码为UTF-8
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 索引文件（相对于网站根目录）
+AUTOCOMPLETE_FILE = os.path.join('data', 'autocomplete.json')
+FORMAT_VERSION = 1
+
+# 每个前缀的补全数量
+TOP_K = 10
+# 前缀区间超过这个键数时预先计算补全结果
+SCAN_LIMIT = 64
+
+# 键中去掉的字符：空白和拼音分隔符，autocomplete.js 中的 COMPLETION_IGNORED 必须相同
+_IGNORED = re.compile("[\\s'\u2019\u00b7\u2022\u30fb]+")
+
+def completion_key(text):
+    """规范化的键：全角转半角、转小写、去掉空白和分隔符"""
+    return _IGNORED.sub('', unicodedata.normalize('NFKC', str(text)).lower())
+
+def _sort_key(key):
+    """按 UTF-16 码元排序，与 JavaScript 的字符串比较一致"""
+    return key.encode('utf-16-be')
+
+def name_keys(name):
+    """名称的全部补全键：名称本身，以及有拼音时的全拼和首字母"""
+    keys = [completion_key(name)]
+    if lazy_pinyin is not None:
+        syllables = [completion_key(s) for s in lazy_pinyin(str(name), style=Style.NORMAL, errors='default')]
+        syllables = [s for s in syllables if s]
+        keys.append(''.join(syllables))
+        keys.append(''.join(s[0] for s in syllables))
+    return [key for key in dict.fromkeys(keys) if key]
+
+def _number(value):
+    """有限的数值，其余（空值、布尔值、无法转换、inf、nan）返回 None"""
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def _display(value):
+    return int(value) if value == int(value) else value
+
+def collect_entries(all_data):
+    """
+    按名称合并节点并排序
+
+    Returns:
+        [[名称, 权重, [uid...]]]，按 (是否有 `权重` 属性, `权重`, 度数) 从高到低排列，
+        有 `权重` 属性的名称总在没有的之前；权重为 `权重` 属性，没有时为度数，同名节点取排序最靠前的一个
+    """
+    degree = Counter()
+    for rel in all_data['combined']['relationships']:
+        for side in ('source_uid', 'target_uid'):
+            if rel.get(side) is not None:
+                degree[rel[side]] += 1
+
+    by_name = {}
+    for node in all_data['combined']['nodes']:
+        name = entity_name(node['properties'])
+        if name is None or not completion_key(name):
+            continue
+        uid = node.get('uid')
+        weight = _number(node['properties'].get('权重'))
+        rank = (weight is not None, weight or 0.0, degree[uid])
+        by_name.setdefault(str(name).strip(), []).append((rank, uid))
+
+    entries = []
+    for name, nodes in by_name.items():
+        nodes.sort(key=lambda item: (tuple(-x for x in item[0]), item[1] if item[1] is not None else -1))
+        best = nodes[0][0]
+        entries.append((best, name, [uid for _, uid in nodes if uid is not None]))
+    entries.sort(key=lambda item: (tuple(-x for x in item[0]), _sort_key(item[1])))
+    return [[name, _display(weight if has_weight else degree), uids]
+            for (has_weight, weight, degree), name, uids in entries]
+
+def build_autocomplete(all_data, entries=None):
+    """构建索引内容，entries 为已收集的名称（collect_entries 的结果），默认重新收集"""
+    if entries is None:
+        entries = collect_entries(all_data)
+    pairs = sorted(
+        {(key, index) for index, (name, _, _) in enumerate(entries) for key in name_keys(name)},
+        key=lambda pair: (_sort_key(pair[0]), pair[1])
+    )
+    keys = [key for key, _ in pairs]
+    targets = [index for _, index in pairs]
+
+    prefixes = Counter()
+    for key in keys:
+        for length in range(1, len(key) + 1):
+            prefixes[key[:length]] += 1
+    sort_keys = [_sort_key(key) for key in keys]
+    top = {}
+    for prefix, count in prefixes.items():
+        if count > SCAN_LIMIT:
+            start = bisect.bisect_left(sort_keys, _sort_key(prefix))
+            top[prefix] = sorted(set(targets[start:start + count]))[:TOP_K]
+
+    return {
+        'version': FORMAT_VERSION,
+        'k': TOP_K,
+        'pinyin': lazy_pinyin is not None,
+        'data_version': all_data.get('metadata', {}).get('data_version'),
+        'entries': entries,
+        'keys': keys,
+        'targets': targets,
+        'top': dict(sorted(top.items()))
+    }
+
+def write_autocomplete(all_data, base_dir, index=None):
+    """
+    写入索引，内容未变化时不重写；未安装 pypinyin 时打印警告
+
+    Args:
+        index: 已构建的索引（build_autocomplete 的结果），默认重新构建；数据版本号总是取自 all_data
+
+    Returns:
+        (是否写入, 名称数, 键数)
+    """
+    if lazy_pinyin is None:
+        print("  警告: 未安装 pypinyin（pip install pypinyin），自动补全索引只有名称键，不支持拼音和首字母补全")
+    index = dict(index or build_autocomplete(all_data), data_version=all_data.get('metadata', {}).get('data_version'))
+    file_path = os.path.join(base_dir, AUTOCOMPLETE_FILE)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return write_if_changed(file_path, encode(index)), len(index['entries']), len(index['keys'])
+
+class Autocomplete:
+    """已加载的补全索引"""
+
+    def __init__(self, index):
+        self.index = index
+        self._sort_keys = [_sort_key(key) for key in index['keys']]
+
+    @classmethod
+    def load(cls, base_dir):
+        """读取网站目录中的索引，文件不存在时返回 None"""
+        try:
+            with open(os.path.join(base_dir, AUTOCOMPLETE_FILE), 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except OSError:
+            return None
+
+    def complete(self, text, limit=None):
+        """
+        补全
+
+        Returns:
+            [(名称, 权重, [uid...])]，按权重从高到低
+        """
+        index = self.index
+        limit = index['k'] if limit is None else limit
+        prefix = completion_key(text)
+        if not prefix:
+            return []
+        ids = index['top'].get(prefix)
+        if ids is None or limit > len(ids) == index['k']:
+            keys, targets = index['keys'], index['targets']
+            found = set()
+            i = bisect.bisect_left(self._sort_keys, _sort_key(prefix))
+            while i < len(keys) and keys[i].startswith(prefix):
+                found.add(targets[i])
+                i += 1
+            ids = sorted(found)
+        return [tuple(index['entries'][i]) for i in ids[:limit]]
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='按名称、全拼或拼音首字母前缀补全节点名称')
+    parser.add_argument('prefix', help='输入的前缀，如 jjs')
+    parser.add_argument('--limit', type=int, help=f'返回的结果数（默认 {TOP_K}）')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    completer = Autocomplete.load(base_dir)
+    if completer is None:
+        print("尚未生成自动补全索引，请先运行 organize_data.py")
+        sys.exit(1)
+    for name, weight, uids in completer.complete(args.prefix, args.limit):
+        print(f"{weight:>8}  {name}  {uids}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量构建入口
+以有向无环图声明各处理脚本的输入和输出，按内容哈希跳过输入未变化的步骤，
+互不依赖的步骤并行运行
+
+用法：
+    python build.py                    # 构建全部默认步骤
+    python build.py organize_data      # 只构建指定步骤（及其上游步骤）
+    python build.py --force            # 忽略缓存，全部重跑
+    python build.py --dry-run          # 只打印需要运行的步骤
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
+
+from content_hash import file_digest, load_state, save_state
+
+# 设置输出编码为UTF-8
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(BASE_DIR, '.build-state.json')
+
+SIX_CITIES = ['蚌埠市', '亳州市', '阜阳市', '淮北市', '淮南市', '宿州市']
+
+# 构建步骤：路径相对于本目录，可使用通配符；
+# code 为脚本导入的本地模块，改动后同样会触发重跑；
+# optional 列出可以缺失的输入（脚本会跳过不存在的数据源），缺失时不算错误，出现或改动时仍会触发重跑；
+# 没有输入的下载步骤只在输出缺失或使用 --force 时运行；
+# default 为 False 的步骤只有在命令行中点名时才会运行
+STAGES = [
+    {
+        'name': 'download_anhui',
+        'script': 'download_anhui.py',
+        'inputs': [],
+        'outputs': ['boundaries/安徽省.json']
+    },
+    {
+        'name': 'download_boundaries',
+        'script': 'download_and_process_boundaries.py',
+        'inputs': [],
+        'outputs': [f'boundaries/{city}.json' for city in SIX_CITIES]
+    },
+    {
+        'name': 'extract_six_cities',
+        'script': 'extract_six_cities_from_anhui.py',
+        'inputs': ['boundaries/安徽省.json'],
+        'outputs': ['six_cities_from_anhui.geojson']
+    },
+    {
+        'name': 'extract_wanbei_cities',
+        'script': 'extract_wanbei_cities.py',
+        'inputs': ['boundaries/安徽省.geojson'],
+        'outputs': ['boundaries/皖北六市.geojson'],
+        'default': False
+    },
+    {
+        'name': 'extract_city_boundaries',
+        'script': 'extract_city_boundaries.py',
+        'inputs': [f'boundaries/{city}.json' for city in SIX_CITIES],
+        'outputs': ['six_cities_boundaries.geojson']
+    },
+    {
+        'name': 'organize_data',
+        'script': 'organize_data.py',
+        'code': [
+            'csv_ingest.py', 'cypher_parser.py', 'neo4j_json.py', 'content_hash.py',
+            'knowledge_graph.py', 'id_allocator.py', 'data_schema.py', 'data_shards.py',
+            'entity_store.py', 'json_writer.py', 'columnar_export.py', 'data_delta.py',
+            'aggregates.py', 'geo_regions.py', 'entity_resolution.py', 'adjacency.py',
+            'search_index.py', 'autocomplete.py', 'graph_analytics.py'
+        ],
+        'inputs': [
+            '../花园口决堤_Neo4j导入脚本_最终版.cypher',
+            '../neo4j导入数据/*.json',
+            '../neo4j导入数据/*.csv',
+            'six_cities_boundaries.geojson'
+        ],
+        # organize_data 跳过不存在的图数据源；
+        # 可选依赖：pypinyin（自动补全的拼音键，未安装时打印警告）、numpy + scipy（图分析加速）
+        'optional': ['../花园口决堤_Neo4j导入脚本_最终版.cypher'],
+        # data.json 只在 --monolithic 时生成
+        'outputs': [
+            'data.json', 'data/manifest.json', 'data/*.json', 'data/entities/*.json', 'data/delta/*.json',
+            'data/*.bin', 'data/search/*.json', 'data/search/terms/*.json', 'data/search/docs/*.json',
+            'node_ids.json'
+        ]
+    },
+    {
+        # 与 organize_data 输出同一套数据分片，只在点名时运行
+        'name': 'extract_data',
+        'script': 'extract_data.py',
+        'code': [
+            'cypher_parser.py', 'knowledge_graph.py', 'id_allocator.py', 'data_schema.py',
+            'data_shards.py', 'entity_store.py', 'json_writer.py', 'search_index.py', 'entity_resolution.py'
+        ],
+        'inputs': ['../*.cypher'],
+        'outputs': [
+            'data/manifest.json', 'data/*.json', 'data/entities/*.json',
+            'data/search/*.json', 'data/search/terms/*.json', 'data/search/docs/*.json', 'node_ids.json'
+        ],
+        'default': False
+    },
+    {
+        'name': 'publish',
+        'script': 'publish.py',
+        'code': ['content_hash.py', 'json_writer.py'],
+        'inputs': [
+            'data.json', 'data/*.json', 'data/*.bin', 'data/entities/*.json',
+            'data/search/*.json', 'data/search/terms/*.json', 'data/search/docs/*.json',
+            'six_cities_*.geojson', 'boundaries/*.json'
+        ],
+        # 默认只发布数据分片，存在 data.json 时一并发布
+        'optional': ['data.json'],
+        'outputs': [
+            'asset-manifest.json', 'dist/*', 'dist/data/*', 'dist/data/entities/*',
+            'dist/data/search/*', 'dist/data/search/terms/*', 'dist/data/search/docs/*', 'dist/boundaries/*'
+        ]
+    },
+    {
+        # 供数据分析使用的 Arrow 列式文件，需要 pyarrow，只在点名时运行
+        'name': 'export_columnar',
+        'script': 'columnar_export.py',
+        'code': ['data_schema.py', 'data_shards.py', 'json_writer.py'],
+        'inputs': ['data/manifest.json', 'data/*.json'],
+        'outputs': ['columnar/*.arrow'],
+        'default': False
+    }
+]
+
+def expand(patterns):
+    """展开路径模式，返回存在的文件（相对路径，排序）"""
+    files = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(BASE_DIR, pattern)):
+            if os.path.isfile(path):
+                files.add(os.path.relpath(path, BASE_DIR))
+    return sorted(files)
+
+def fingerprint(files):
+    """文件 -> 内容哈希"""
+    return {path: file_digest(os.path.join(BASE_DIR, path)) for path in files}
+
+def input_files(stage):
+    return expand([stage['script']] + stage.get('code', []) + stage['inputs'])
+
+def missing_inputs(stage, produced=()):
+    """
+    没有通配符、又不存在的必需输入
+
+    Args:
+        produced: 上游步骤声明的输出；只打印计划（--dry-run）时上游没有真正运行，这些输入不算缺失
+    """
+    optional = set(stage.get('optional', ()))
+    return [
+        pattern for pattern in stage['inputs']
+        if pattern not in optional and not glob.has_magic(pattern)
+        and not os.path.exists(os.path.join(BASE_DIR, pattern))
+        and not any(fnmatch(pattern, out) for out in produced)
+    ]
+
+def build_graph(stages):
+    """步骤 -> 其依赖的上游步骤（某个输入匹配上游的某个输出）"""
+    graph = {}
+    for stage in stages:
+        deps = set()
+        for other in stages:
+            if other is stage:
+                continue
+            for inp in stage['inputs']:
+                if any(fnmatch(out, inp) or fnmatch(inp, out) for out in other['outputs']):
+                    deps.add(other['name'])
+        graph[stage['name']] = deps
+    return graph
+
+def select_stages(stages, graph, names):
+    """选出要构建的步骤：点名的步骤及其全部上游；未点名时为全部默认步骤"""
+    by_name = {stage['name']: stage for stage in stages}
+    if not names:
+        names = [stage['name'] for stage in stages if stage.get('default', True)]
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise SystemExit(f"未知的构建步骤: {', '.join(unknown)}")
+
+    selected = set()
+    todo = list(names)
+    while todo:
+        name = todo.pop()
+        if name in selected:
+            continue
+        selected.add(name)
+        # 非默认步骤只在点名时作为上游
+        todo.extend(dep for dep in graph[name] if by_name[dep].get('default', True) or dep in names)
+    return [stage for stage in stages if stage['name'] in selected]
+
+def is_up_to_date(stage, state):
+    """输入哈希与上次成功构建一致，且输出未被改动；没有输入的下载步骤只要输出齐全即可"""
+    if not stage['inputs']:
+        return all(os.path.exists(os.path.join(BASE_DIR, p)) for p in stage['outputs'])
+    record = state.get(stage['name'])
+    if not record:
+        return False
+    outputs = expand(stage['outputs'])
+    if not outputs:
+        return False
+    return (record.get('inputs') == fingerprint(input_files(stage))
+            and record.get('outputs') == fingerprint(outputs))
+
+def run_stage(stage):
+    """在子进程中运行步骤脚本，返回 (是否成功, 输出文本)"""
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    result = subprocess.run(
+        [sys.executable, stage['script']] + stage.get('args', []),
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    output = result.stdout + result.stderr
+    # 部分脚本失败时只打印信息不返回错误码，以声明的输出是否存在为准
+    missing = [p for p in stage['outputs'] if not glob.has_magic(p) and not os.path.exists(os.path.join(BASE_DIR, p))]
+    return result.returncode == 0 and not missing, output
+
+def build(names=None, force=False, dry_run=False, jobs=None):
+    """按依赖顺序构建，返回失败的步骤名列表"""
+    graph = build_graph(STAGES)
+    stages = select_stages(STAGES, graph, names)
+    state = load_state(STATE_FILE)
+    pending = {stage['name']: stage for stage in stages}
+    done = set()
+    failed = set()
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        running = {}
+        while pending or running:
+            # 提交所有上游已完成的步骤
+            for name, stage in list(pending.items()):
+                deps = graph[name] & set(s['name'] for s in stages)
+                if deps & failed:
+                    del pending[name]
+                    failed.add(name)
+                    print(f"[{name}] 上游步骤失败，跳过")
+                    continue
+                if not deps <= done:
+                    continue
+                del pending[name]
+
+                produced = [out for s in stages if s['name'] in deps for out in s['outputs']] if dry_run else ()
+                missing = missing_inputs(stage, produced)
+                if missing:
+                    failed.add(name)
+                    print(f"[{name}] 缺少输入 {', '.join(missing)}，跳过")
+                elif not force and is_up_to_date(stage, state):
+                    done.add(name)
+                    print(f"[{name}] 已是最新，跳过")
+                elif dry_run:
+                    done.add(name)
+                    print(f"[{name}] 需要运行")
+                else:
+                    print(f"[{name}] 运行 {stage['script']}...")
+                    inputs = fingerprint(input_files(stage))
+                    running[executor.submit(run_stage, stage)] = (stage, inputs)
+
+            if not running:
+                if pending:
+                    raise SystemExit(f"构建步骤存在循环依赖: {', '.join(pending)}")
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, inputs = running.pop(future)
+                ok, output = future.result()
+                for line in output.rstrip().splitlines():
+                    print(f"[{stage['name']}] {line}")
+                if ok:
+                    done.add(stage['name'])
+                    state[stage['name']] = {
+                        'inputs': inputs,
+                        'outputs': fingerprint(expand(stage['outputs']))
+                    }
+                    save_state(STATE_FILE, state)
+                    print(f"[{stage['name']}] 完成")
+                else:
+                    failed.add(stage['name'])
+                    print(f"[{stage['name']}] 失败")
+
+    return sorted(failed)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='增量构建数据和边界文件')
+    parser.add_argument('stages', nargs='*', help='要构建的步骤，默认全部：' +
+                        ', '.join(stage['name'] for stage in STAGES))
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重跑')
+    parser.add_argument('--dry-run', action='store_true', help='只打印需要运行的步骤')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='同时运行的步骤数，默认CPU核心数')
+    args = parser.parse_args()
+
+    failed = build(args.stages, args.force, args.dry_run, args.jobs)
+    if failed:
+        print(f"\n以下步骤未完成: {', '.join(failed)}")
+        sys.exit(1)
+    print("\n构建完成")
+
+if __name__ == '__main__':
+    main()
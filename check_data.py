@@ -2,18 +2,41 @@
 # -*- coding: utf-8 -*-
 """检查数据文件"""
 
-import json
+from adjacency import load_adjacency
+from data_shards import load_site_data
+from knowledge_graph import CATEGORIES, KnowledgeGraph
 
-with open('data.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+data = load_site_data('.')
+
+graph = KnowledgeGraph.from_data(data)
+summary = graph.summary(partial=True)
 
 print(f"数据集数量: {len(data['datasets'])}")
-print(f"总节点: {data['combined']['summary']['total_nodes']}")
-print(f"总关系: {data['combined']['summary']['total_relationships']}")
-print(f"事件: {data['combined']['summary']['events']}")
-print(f"人物: {data['combined']['summary']['persons']}")
-print(f"地点: {data['combined']['summary']['locations']}")
-print(f"时间: {data['combined']['summary']['times']}")
+print(f"总节点: {summary['total_nodes']}")
+print(f"总关系: {summary['total_relationships']}")
+for key, label in CATEGORIES.items():
+    print(f"{label}: {summary[key]}")
+
+# 与文件中记录的统计核对
+mismatched = [key for key, value in summary.items() if data['combined']['summary'].get(key) != value]
+if mismatched:
+    print(f"警告: 统计与节点数据不一致: {', '.join(mismatched)}")
+
+# 以匹配条件表示端点的关系（如花园口决堤）不计入
+dangling = sum(
+    1 for rel, s, t in zip(graph.edges, graph.edge_sources, graph.edge_targets)
+    if not isinstance(rel['source'], dict) and (s < 0 or t < 0)
+)
+if dangling:
+    print(f"警告: {dangling} 条关系的端点不在节点中")
+
+# 邻接索引应包含全部两端有 uid 的关系
+adjacency = load_adjacency('.')
+if adjacency is not None:
+    with adjacency:
+        expected = sum(1 for rel in graph.edges if rel.get('source_uid') is not None and rel.get('target_uid') is not None)
+        if adjacency.data_version != data.get('metadata', {}).get('data_version') or adjacency.edge_count != expected:
+            print(f"警告: 邻接索引（{adjacency.edge_count} 条关系）与合并数据（{expected} 条关系）不一致")
 
 print("\n各数据集详情:")
 for ds in data['datasets']:
@@ -23,15 +46,3 @@ if 'csv_relationships' in data:
     print(f"\nCSV关系文件: {len(data['csv_relationships'])}个")
     for filename in data['csv_relationships']:
         print(f"  {filename}: {len(data['csv_relationships'][filename])}条关系")
-
-
-
-
-
-
-
-
-
-
-
-
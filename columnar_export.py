@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合并图谱的列式导出（Arrow IPC / Parquet）
+把节点、边和 CSV 关系表写入 columnar/ 目录，供 pandas / pyarrow 直接加载：
+lat、lng、权重为数值列，标签、类型、数据集、来源为字典编码列，其余属性保存为 JSON 文本列。
+Arrow 文件不压缩，可以内存映射后零拷贝读取；需要安装 pyarrow（pip install pyarrow）
+
+用法：
+    python columnar_export.py                    # 从数据分片（或 data.json）导出 Arrow 文件
+    python columnar_export.py --format parquet   # 导出 Parquet 文件
+
+在 notebook 中：
+    from columnar_export import load_table
+    nodes = load_table('.', 'nodes').to_pandas()
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from data_schema import CATEGORY_KEYS, PROVENANCE_KEYS
+from data_shards import load_site_data
+from json_writer import replace_if_changed
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 设置输出编码为UTF-8
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 导出目录（相对于网站根目录）
+COLUMNAR_DIR = 'columnar'
+
+# 格式 -> 扩展名
+FORMATS = {'arrow': '.arrow', 'parquet': '.parquet'}
+
+# 单独成列的数值属性：属性名 -> 列类型名
+NUMERIC_PROPERTIES = {'lat': 'float64', 'lng': 'float64', '权重': 'int64'}
+
+def _number(value, kind):
+    """把属性值转换为数值，无法转换时为 None"""
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        return float(value) if kind == 'float64' else int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def _json_or_none(value):
+    return json.dumps(value, ensure_ascii=False) if value else None
+
+def _endpoint(value):
+    """边的端点ID；以匹配条件表示的端点保存为 JSON 文本"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+def _dictionary(values):
+    return pa.array(values, type=pa.string()).dictionary_encode()
+
+def _labels(values):
+    """标签列：list<dictionary<int32, string>>，所有行共用一个标签字典"""
+    flat = [label for labels in values for label in labels]
+    offsets = [0]
+    for labels in values:
+        offsets.append(offsets[-1] + len(labels))
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), _dictionary(flat))
+
+def nodes_table(all_data):
+    """节点表：每个节点一行"""
+    combined = all_data['combined']
+    dataset_of = {}
+    for dataset in all_data['datasets']:
+        for node in dataset['nodes']:
+            dataset_of.setdefault(id(node), dataset['dataset'])
+    categories = {key: {id(node) for node in combined.get(key, [])} for key in CATEGORY_KEYS}
+
+    columns = {name: [] for name in ('uid', 'id', 'labels', 'dataset', 'name') + tuple(NUMERIC_PROPERTIES)
+               + CATEGORY_KEYS + PROVENANCE_KEYS + ('properties',)}
+    hidden = set(NUMERIC_PROPERTIES) | set(PROVENANCE_KEYS)
+    for node in combined['nodes']:
+        props = node['properties']
+        columns['uid'].append(node.get('uid'))
+        columns['id'].append(str(node['id']))
+        columns['labels'].append(node['labels'])
+        columns['dataset'].append(dataset_of.get(id(node)))
+        name = props.get('name') or props.get('名称') or props.get('姓名')
+        columns['name'].append(str(name) if name is not None else None)
+        for key, kind in NUMERIC_PROPERTIES.items():
+            columns[key].append(_number(props.get(key), kind))
+        for key in CATEGORY_KEYS:
+            columns[key].append(id(node) in categories[key])
+        for key in PROVENANCE_KEYS:
+            columns[key].append(props.get(key))
+        columns['properties'].append(_json_or_none({k: v for k, v in props.items() if k not in hidden}))
+
+    arrays = {
+        'uid': pa.array(columns['uid'], type=pa.int32()),
+        'id': pa.array(columns['id'], type=pa.string()),
+        'labels': _labels(columns['labels']),
+        'dataset': _dictionary(columns['dataset']),
+        'name': pa.array(columns['name'], type=pa.string())
+    }
+    for key, kind in NUMERIC_PROPERTIES.items():
+        arrays[key] = pa.array(columns[key], type=getattr(pa, kind)())
+    for key in CATEGORY_KEYS:
+        arrays[key] = pa.array(columns[key], type=pa.bool_())
+    for key in PROVENANCE_KEYS:
+        arrays[key] = _dictionary(columns[key])
+    arrays['properties'] = pa.array(columns['properties'], type=pa.string())
+    return pa.table(arrays)
+
+def edges_table(all_data):
+    """边表：每条关系一行，source_uid / target_uid 与节点表的 uid 对应"""
+    dataset_of = {}
+    for dataset in all_data['datasets']:
+        for rel in dataset['relationships']:
+            dataset_of.setdefault(id(rel), dataset['dataset'])
+
+    columns = {name: [] for name in ('source_uid', 'target_uid', 'source', 'target', 'type', 'dataset')
+               + PROVENANCE_KEYS + ('properties',)}
+    for rel in all_data['combined']['relationships']:
+        columns['source_uid'].append(rel.get('source_uid'))
+        columns['target_uid'].append(rel.get('target_uid'))
+        columns['source'].append(_endpoint(rel.get('source')))
+        columns['target'].append(_endpoint(rel.get('target')))
+        columns['type'].append(rel.get('type'))
+        columns['dataset'].append(dataset_of.get(id(rel)))
+        for key in PROVENANCE_KEYS:
+            columns[key].append(rel.get(key))
+        columns['properties'].append(_json_or_none(rel.get('properties')))
+
+    return pa.table({
+        'source_uid': pa.array(columns['source_uid'], type=pa.int32()),
+        'target_uid': pa.array(columns['target_uid'], type=pa.int32()),
+        'source': pa.array(columns['source'], type=pa.string()),
+        'target': pa.array(columns['target'], type=pa.string()),
+        'type': _dictionary(columns['type']),
+        'dataset': _dictionary(columns['dataset']),
+        **{key: _dictionary(columns[key]) for key in PROVENANCE_KEYS},
+        'properties': pa.array(columns['properties'], type=pa.string())
+    })
+
+def csv_table(rows):
+    """CSV 关系原始行：每列一个字典编码的文本列"""
+    columns = []
+    for row in rows:
+        for key in row['raw_data']:
+            if key not in columns:
+                columns.append(key)
+    return pa.table({
+        str(column): _dictionary([row['raw_data'].get(column) for row in rows])
+        for column in columns
+    })
+
+def table_name(file_name):
+    """CSV 关系表名，如 rel_E&L.csv -> csv_rel_E&L"""
+    return 'csv_' + os.path.splitext(file_name)[0]
+
+def build_tables(all_data):
+    """表名 -> 表"""
+    tables = {'nodes': nodes_table(all_data), 'edges': edges_table(all_data)}
+    for file_name, rows in all_data.get('csv_relationships', {}).items():
+        tables[table_name(file_name)] = csv_table(rows)
+    return tables
+
+def write_table(table, file_path, fmt):
+    """写入一个表，内容未变化时不重写，返回是否写入"""
+    tmp_path = file_path + '.tmp'
+    if fmt == 'parquet':
+        pq.write_table(table, tmp_path, compression='zstd')
+    else:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    return replace_if_changed(tmp_path, file_path)
+
+def write_columnar(all_data, base_dir, fmt='arrow'):
+    """
+    导出全部表，并删除本格式下已不存在的旧表
+
+    Returns:
+        (实际写入的文件数, 表数)；未安装 pyarrow 时返回 None
+    """
+    if pa is None:
+        print("未安装 pyarrow（pip install pyarrow），跳过列式导出")
+        return None
+    out_dir = os.path.join(base_dir, COLUMNAR_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    ext = FORMATS[fmt]
+    tables = build_tables(all_data)
+
+    written = 0
+    names = set()
+    for name, table in tables.items():
+        names.add(name + ext)
+        written += write_table(table, os.path.join(out_dir, name + ext), fmt)
+    for name in os.listdir(out_dir):
+        if name.endswith(ext) and name not in names:
+            os.remove(os.path.join(out_dir, name))
+
+    print(f"列式数据已保存到: {out_dir}（{len(tables)} 个表，更新 {written} 个文件）")
+    return written, len(tables)
+
+def load_table(base_dir, name, fmt='arrow'):
+    """
+    读取导出的表
+
+    Arrow 文件通过内存映射读取，列数据直接引用映射的文件，不复制到内存
+    """
+    path = os.path.join(base_dir, COLUMNAR_DIR, name + FORMATS[fmt])
+    if fmt == 'parquet':
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='把合并数据（数据分片或 data.json）导出为 Arrow / Parquet 列式文件')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='arrow', help='导出格式，默认 arrow')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    if write_columnar(load_site_data(base_dir), base_dir, args.format) is None:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容哈希与增量写入工具
+供 build.py 判断步骤是否需要重跑，供各脚本跳过内容未变化的输出文件
+"""
+
+import hashlib
+import json
+import os
+
+# 计算哈希时每次读取的字节数
+CHUNK_SIZE = 1 << 20
+
+def file_digest(file_path):
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_state(state_file):
+    """读取状态文件，不存在或损坏时返回空字典"""
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state_file, state):
+    """先写临时文件再替换，避免中断时留下半个状态文件"""
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_file, state_file)
+
+def write_if_changed(file_path, data):
+    """
+    仅当内容变化时写入文件
+
+    Args:
+        file_path: 输出路径
+        data: 要写入的字节串
+
+    Returns:
+        是否实际写入
+    """
+    try:
+        if os.path.getsize(file_path) == len(data):
+            with open(file_path, 'rb') as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return True
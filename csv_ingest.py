@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV 流式导入引擎
+按每个文件的 schema（列类型、ID 列、标签）逐行生成类型化节点，
+来源信息每次运行只生成一次，类型转换失败的行统一汇总报告
+"""
+
+import csv
+import sys
+from datetime import datetime
+
+# 节点CSV文件的schema：标签、ID列、缺省ID前缀、需要转换类型的列
+CSV_NODE_SCHEMAS = {
+    'events.csv': {
+        'label': '事件',
+        'id_column': '事件ID',
+        'id_prefix': 'event',
+        'types': {'lng': float, 'lat': float}
+    },
+    'persons.csv': {
+        'label': '人物',
+        'id_column': '人物序号',
+        'id_prefix': 'person',
+        'types': {'lng': float, 'lat': float, '权重': int}
+    },
+    'geo_coords.csv': {
+        'label': '地点',
+        'id_column': 'LocationID',
+        'id_prefix': 'location',
+        'types': {'lng': float, 'lat': float}
+    }
+}
+
+# 关系CSV文件的schema：起点/终点的（标签、ID列），关系类型列（按顺序取第一个非空值）
+CSV_REL_SCHEMAS = {
+    'rel_E&E.csv': {
+        'source': ('事件', '事件ID1'),
+        'target': ('事件', '事件ID2'),
+        'type_columns': ['关联词', '关联类型']
+    },
+    'rel_E&L.csv': {
+        'source': ('事件', '事件ID'),
+        'target': ('地点', 'LocationID'),
+        'type_columns': ['关系类型']
+    },
+    'rel_E&P.csv': {
+        'source': ('事件', '事件ID'),
+        'target': ('人物', '人物序号'),
+        'type_columns': ['关系类型']
+    },
+    'rel_P&L.csv': {
+        'source': ('人物', '实体ID1'),
+        'target': ('地点', '实体ID2'),
+        'type_columns': ['关系类型']
+    },
+    'rel_P&P.csv': {
+        'source': ('人物', '实体ID1'),
+        'target': ('人物', '实体ID2'),
+        'type_columns': ['关系类型']
+    }
+}
+
+def make_provenance(data_source, import_time=None):
+    """生成来源信息，同一次运行内的所有记录共用同一个导入时间"""
+    if import_time is None:
+        import_time = datetime.now().isoformat()
+    return {
+        'data_source': sys.intern(data_source),
+        'import_time': sys.intern(import_time)
+    }
+
+def intern_row(row):
+    """
+    驻留一行中的字符串
+
+    关系CSV的ID列和类型列在各行间大量重复，驻留后相同的值共用一个字符串对象
+    """
+    return {key: sys.intern(value) if isinstance(value, str) else value for key, value in row.items()}
+
+def iter_csv_nodes(file_path, schema, provenance, errors=None):
+    """
+    按schema流式生成节点
+
+    Args:
+        file_path: CSV 文件路径
+        schema: CSV_NODE_SCHEMAS 中的一项
+        provenance: make_provenance 生成的来源信息
+        errors: 可选列表，类型转换失败时追加 (行号, 列名, 原始值)
+    """
+    types = schema.get('types', {})
+    id_column = schema['id_column']
+    id_prefix = schema['id_prefix']
+    label = schema['label']
+    data_source = provenance['data_source']
+    import_time = provenance['import_time']
+
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [sys.intern(column) for column in next(reader, None) or []]
+        converters = [(column, types[column]) for column in header if column in types]
+
+        for count, row in enumerate(reader):
+            props = dict(zip(header, row))
+
+            for column, convert in converters:
+                value = props.get(column)
+                if value:
+                    try:
+                        props[column] = convert(value)
+                    except ValueError:
+                        props[column] = None
+                        if errors is not None:
+                            # 第1行为表头，数据行号从2开始
+                            errors.append((count + 2, column, value))
+
+            props['data_source'] = data_source
+            props['import_time'] = import_time
+
+            yield {
+                'id': props.get(id_column) or f"{id_prefix}_{count}",
+                'labels': [label],
+                'properties': props
+            }
+
+def report_errors(file_name, errors, limit=5):
+    """汇总打印类型转换失败的行"""
+    if not errors:
+        return
+    print(f"  警告: {file_name} 有 {len(errors)} 个字段类型转换失败，已置为空值")
+    for row_number, column, value in errors[:limit]:
+        print(f"    第 {row_number} 行 {column}: {value!r}")
+    if len(errors) > limit:
+        print(f"    ... 还有 {len(errors) - limit} 个")
+
+def build_id_index(nodes):
+    """
+    按节点CSV的ID列（事件ID、人物序号、LocationID）构建 (标签, ID) -> 节点 索引
+
+    ID 重复时保留第一个节点，与 KnowledgeGraph 按节点ID查找的规则一致
+    """
+    id_columns = {schema['label']: schema['id_column'] for schema in CSV_NODE_SCHEMAS.values()}
+    index = {}
+    for node in nodes:
+        props = node['properties']
+        for label in node['labels']:
+            column = id_columns.get(label)
+            if column is None:
+                continue
+            key = props.get(column)
+            if key:
+                index.setdefault((label, key), node)
+    return index
+
+def iter_csv_edges(rows, schema, id_index, provenance, unresolved=None):
+    """
+    把关系CSV的行连接为图中的边
+
+    Args:
+        rows: 关系CSV的行（字典）
+        schema: CSV_REL_SCHEMAS 中的一项
+        id_index: build_id_index 生成的索引
+        provenance: make_provenance 生成的来源信息
+        unresolved: 可选字典，统计找不到的起点（'source'）和终点（'target'）数量
+    """
+    source_label, source_column = schema['source']
+    target_label, target_column = schema['target']
+    type_columns = schema['type_columns']
+    data_source = provenance['data_source']
+    import_time = provenance['import_time']
+
+    for row in rows:
+        source = id_index.get((source_label, row.get(source_column)))
+        target = id_index.get((target_label, row.get(target_column)))
+        if source is None or target is None:
+            if unresolved is not None:
+                if source is None:
+                    unresolved['source'] = unresolved.get('source', 0) + 1
+                if target is None:
+                    unresolved['target'] = unresolved.get('target', 0) + 1
+            continue
+
+        rel_type = next((row[column] for column in type_columns if row.get(column)), '')
+        edge = {
+            'source': source['id'],
+            'target': target['id'],
+            'type': rel_type,
+            'properties': {
+                key: value for key, value in row.items()
+                if key != source_column and key != target_column
+            },
+            'data_source': data_source,
+            'import_time': import_time
+        }
+        # 节点已分配全局编号时一并记录，避免不同数据源的同名ID混淆
+        if 'uid' in source and 'uid' in target:
+            edge['source_uid'] = source['uid']
+            edge['target_uid'] = target['uid']
+        yield edge
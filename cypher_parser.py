@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cypher 脚本解析器
+分块读取文件并线性扫描为词法单元，逐条解析 CREATE / MERGE / MATCH 语句，
+以生成器形式输出节点和关系记录，供 extract_data 和 organize_data 共用
+"""
+
+import json
+import re
+import sys
+
+# 每次读取的字符数
+CHUNK_SIZE = 1 << 16
+# 词法单元之后至少保留的字符数，避免把 "2.5"、"1e+3"、"<-" 在块边界处截成较短的单元
+LOOKAHEAD = 4
+
+# 词法单元：先跳过空白和注释，再匹配一个单元；末尾两个分支保证总能匹配成功，
+# 因此不会出现回溯，整个文件只扫描一遍
+TOKEN_PATTERN = re.compile(r'''
+    (?:\s+|//[^\n]*|/\*.*?\*/)*
+    (?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<name>[^\W\d]\w*|`[^`]*`)
+      | (?P<arrow>->|<-)
+      | (?P<punct>[(){}\[\]:,;=|.*$+<>-])
+      | (?P<error>.)
+      | (?P<space>)
+    )
+''', re.VERBOSE | re.DOTALL)
+
+# Cypher 字符串转义
+STRING_ESCAPES = {
+    'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f',
+    '"': '"', "'": "'", '\\': '\\'
+}
+ESCAPE_PATTERN = re.compile(r'\\(u[0-9a-fA-F]{4}|.)', re.DOTALL)
+
+# 创建节点/关系的子句
+CREATE_CLAUSES = {'CREATE', 'MERGE'}
+# 会开启新子句的关键字
+CLAUSE_KEYWORDS = {
+    'CREATE', 'MERGE', 'MATCH', 'OPTIONAL', 'WITH', 'WHERE', 'RETURN', 'SET',
+    'DELETE', 'DETACH', 'REMOVE', 'UNWIND', 'CALL', 'ON', 'FOREACH', 'LOAD'
+}
+
+class CypherSyntaxError(ValueError):
+    """Cypher 语法错误"""
+
+def _unescape(match):
+    code = match.group(1)
+    if code[0] == 'u' and len(code) == 5:
+        return chr(int(code[1:], 16))
+    return STRING_ESCAPES.get(code, code)
+
+def tokenize(f, chunk_size=CHUNK_SIZE):
+    """
+    把文本流切分为 (类型, 值) 词法单元
+
+    每次只保留未消费的尾部和新读入的一块，跨块的字符串、注释会在补读后再匹配
+    """
+    buf = ''
+    pos = 0
+    eof = False
+    while True:
+        # 未到文件末尾时，结束位置太靠近块尾的单元可能被截断，留到补读之后再匹配
+        limit = len(buf) if eof else len(buf) - LOOKAHEAD
+        for match in TOKEN_PATTERN.finditer(buf, pos):
+            end = match.end()
+            if end > limit:
+                break
+            kind = match.lastgroup
+            if kind == 'error':
+                # 未闭合的字符串或注释，补读后重试
+                if not eof:
+                    break
+                snippet = buf[match.start(kind):match.start(kind) + 30]
+                raise CypherSyntaxError(f"无法识别的字符: {snippet!r}")
+            pos = end
+            if kind == 'space':
+                continue
+            value = match.group(kind)
+            if kind == 'string':
+                value = ESCAPE_PATTERN.sub(_unescape, value[1:-1])
+            elif kind == 'number':
+                value = float(value) if ('.' in value or 'e' in value or 'E' in value) else int(value)
+            elif kind == 'name' and value[0] == '`':
+                value = value[1:-1]
+                kind = 'quoted'
+            yield kind, value
+        else:
+            if eof:
+                return
+
+        chunk = f.read(chunk_size)
+        buf = buf[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+class _Parser:
+    """逐条语句解析词法单元流"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.current = next(tokens, None)
+        self.anonymous = 0
+        # 变量 -> {(标签, name): 节点ID}，同一变量在不同语句中创建不同节点时按此区分
+        self.identities = {}
+        self.collisions = []
+
+    def peek(self):
+        return self.current
+
+    def advance(self):
+        token = self.current
+        self.current = next(self.tokens, None)
+        return token
+
+    def accept(self, value):
+        token = self.current
+        if token is not None and token[0] in ('punct', 'arrow') and token[1] == value:
+            self.advance()
+            return True
+        return False
+
+    def expect(self, value):
+        if not self.accept(value):
+            raise CypherSyntaxError(f"期望 {value!r}，实际为 {self.current!r}")
+
+    def at_keyword(self):
+        token = self.current
+        return token is not None and token[0] == 'name' and token[1].upper() in CLAUSE_KEYWORDS
+
+    def name(self):
+        """名称（变量、标签、属性键、关系类型），大量重复出现，驻留后共用同一个字符串对象"""
+        token = self.advance()
+        if token is None or token[0] not in ('name', 'quoted'):
+            raise CypherSyntaxError(f"期望名称，实际为 {token!r}")
+        return sys.intern(token[1])
+
+    # ---- 值 ----
+
+    def value(self):
+        token = self.advance()
+        if token is None:
+            raise CypherSyntaxError("语句意外结束")
+        kind, value = token
+        if kind in ('string', 'number'):
+            return value
+        if kind == 'punct' and value == '[':
+            items = []
+            if not self.accept(']'):
+                items.append(self.value())
+                while self.accept(','):
+                    items.append(self.value())
+                self.expect(']')
+            return items
+        if kind == 'punct' and value == '{':
+            return self.map_body()
+        if kind == 'punct' and value == '$':
+            return '$' + self.name()
+        if kind == 'name':
+            lowered = value.lower()
+            if lowered == 'true':
+                return True
+            if lowered == 'false':
+                return False
+            if lowered == 'null':
+                return None
+            # 函数调用，如 date("1938-06-09")，保留为文本
+            if self.accept('('):
+                args = []
+                if not self.accept(')'):
+                    args.append(self.value())
+                    while self.accept(','):
+                        args.append(self.value())
+                    self.expect(')')
+                rendered = ', '.join(json.dumps(a, ensure_ascii=False) for a in args)
+                return f"{value}({rendered})"
+            return value
+        raise CypherSyntaxError(f"无法解析的值: {token!r}")
+
+    def map_body(self):
+        """解析 { 之后的键值对，直到 }"""
+        props = {}
+        if self.accept('}'):
+            return props
+        while True:
+            key = self.name()
+            self.expect(':')
+            props[key] = self.value()
+            if self.accept('}'):
+                return props
+            self.expect(',')
+
+    # ---- 模式 ----
+
+    def node_pattern(self):
+        """(var:Label1:Label2 {props})"""
+        self.expect('(')
+        var = None
+        token = self.peek()
+        if token is not None and token[0] in ('name', 'quoted'):
+            var = self.name()
+        labels = []
+        while self.accept(':'):
+            labels.append(self.name())
+        props = self.map_body() if self.accept('{') else {}
+        self.expect(')')
+        return var, labels, props
+
+    def rel_pattern(self):
+        """-[var:TYPE {props}]-> 或 <-[...]-，返回 (类型, 属性, 是否反向)"""
+        reverse = self.accept('<-')
+        if not reverse:
+            self.expect('-')
+        rel_type = ''
+        props = {}
+        if self.accept('['):
+            token = self.peek()
+            if token is not None and token[0] in ('name', 'quoted'):
+                self.name()
+            if self.accept(':'):
+                rel_type = self.name()
+                while self.accept('|'):
+                    self.accept(':')
+                    rel_type += '|' + self.name()
+            if self.accept('{'):
+                props = self.map_body()
+            self.expect(']')
+        if not self.accept('->'):
+            self.expect('-')
+        return rel_type, props, reverse
+
+    def path(self):
+        """节点 (关系 节点)*，返回节点列表和关系列表"""
+        nodes = [self.node_pattern()]
+        rels = []
+        while True:
+            token = self.peek()
+            if token is None or token[0] not in ('punct', 'arrow') or token[1] not in ('-', '<-'):
+                break
+            rels.append(self.rel_pattern())
+            nodes.append(self.node_pattern())
+        return nodes, rels
+
+    def patterns(self):
+        paths = [self.path()]
+        while self.accept(','):
+            paths.append(self.path())
+        return paths
+
+    def skip_clause(self):
+        """跳过不关心的子句，直到下一个子句关键字或语句结束"""
+        depth = 0
+        while self.current is not None:
+            kind, value = self.current
+            if depth == 0 and (value == ';' and kind == 'punct' or self.at_keyword()):
+                return
+            if kind == 'punct' and value in '([{':
+                depth += 1
+            elif kind == 'punct' and value in ')]}':
+                depth -= 1
+            self.advance()
+
+    # ---- 语句 ----
+
+    def records(self):
+        """生成 ('node', 节点) 和 ('relationship', 关系) 记录"""
+        bindings = {}
+        created = {}
+        last_clause = None
+        while self.current is not None:
+            if self.accept(';'):
+                bindings = {}
+                created = {}
+                last_clause = None
+                continue
+            if not self.at_keyword():
+                raise CypherSyntaxError(f"期望子句关键字，实际为 {self.current!r}")
+
+            clause = self.advance()[1].upper()
+            if clause == 'OPTIONAL':
+                clause = self.advance()[1].upper()
+
+            if clause == 'MATCH':
+                # 缺少分号时，新的 MATCH 开启新语句
+                if last_clause in CREATE_CLAUSES:
+                    bindings = {}
+                    created = {}
+                for nodes, _ in self.patterns():
+                    for var, labels, props in nodes:
+                        if var:
+                            bindings[var] = (labels, props)
+                self.skip_clause()
+            elif clause in CREATE_CLAUSES and self.peek() is not None and self.peek()[1] == '(':
+                for nodes, rels in self.patterns():
+                    yield from self.create(nodes, rels, bindings, created)
+                self.skip_clause()
+            else:
+                self.skip_clause()
+            last_clause = clause
+
+    def node_id(self, var, labels, props):
+        """
+        节点ID：变量第一次创建的节点使用变量名，
+        同一变量再创建标签或 name 不同的节点时使用 变量:标签:name，并记录冲突
+        """
+        identity = (tuple(labels), props.get('name'))
+        known = self.identities.setdefault(var, {})
+        node_id = known.get(identity)
+        if node_id is None:
+            node_id = var
+            if known:
+                node_id = ':'.join([var, *labels] + ([str(identity[1])] if identity[1] is not None else []))
+                self.collisions.append((var, node_id))
+            known[identity] = node_id
+        return node_id
+
+    def create(self, nodes, rels, bindings, created):
+        """created 为本条语句中 变量 -> 创建的节点ID"""
+        ids = []
+        for var, labels, props in nodes:
+            if var is None:
+                self.anonymous += 1
+                var = f"_anon{self.anonymous}"
+            # 已绑定的变量只是引用，不创建新节点
+            if var not in bindings and (labels or props):
+                created[var] = self.node_id(var, labels, props)
+                yield 'node', {
+                    'id': created[var],
+                    'labels': labels,
+                    'properties': props
+                }
+            # 其他语句创建的变量按变量名引用，即该变量第一次创建的节点
+            ids.append(created.get(var, var))
+
+        for i, (rel_type, props, reverse) in enumerate(rels):
+            source_var, target_var = ids[i], ids[i + 1]
+            if reverse:
+                source_var, target_var = target_var, source_var
+            source_labels, source_match = bindings.get(source_var, ([], {}))
+            target_labels, target_match = bindings.get(target_var, ([], {}))
+            yield 'relationship', {
+                'source': dict(source_match),
+                'target': dict(target_match),
+                'type': rel_type,
+                'source_var': source_var,
+                'target_var': target_var,
+                'source_labels': list(source_labels),
+                'target_labels': list(target_labels),
+                'properties': props
+            }
+
+def iter_cypher_records(file_path, chunk_size=CHUNK_SIZE, collisions=None):
+    """
+    逐条生成 Cypher 文件中的节点和关系记录
+
+    同一变量在不同语句中创建了标签或 name 不同的节点时，以 (变量, 新节点ID) 的形式追加到 collisions 中
+    """
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        parser = _Parser(tokenize(f, chunk_size))
+        yield from parser.records()
+    if collisions is not None:
+        collisions.extend(parser.collisions)
+
+def report_collisions(file_name, collisions, limit=5):
+    """汇总打印重复使用的变量"""
+    if not collisions:
+        return
+    print(f"  警告: {file_name} 中有 {len(collisions)} 个节点的变量名已被其他语句使用，已按 变量:标签:name 区分")
+    for var, node_id in collisions[:limit]:
+        print(f"    {var} -> {node_id}")
+    if len(collisions) > limit:
+        print(f"    ... 还有 {len(collisions) - limit} 个")
+
+def parse_cypher_file(file_path, collisions=None):
+    """解析 Cypher 文件，返回节点列表和关系列表；collisions 见 iter_cypher_records"""
+    nodes = []
+    relationships = []
+    for kind, record in iter_cypher_records(file_path, collisions=collisions):
+        if kind == 'node':
+            nodes.append(record)
+        else:
+            relationships.append(record)
+    return nodes, relationships
@@ -3,11 +3,37 @@
 let allData = null;
 let currentDataset = '全部';
 
-// 加载数据
+// 各页面需要的节点类别：空数组表示只需要统计，null 表示需要完整数据（含关系）
+const PAGE_CATEGORIES = {
+    'overview.html': [],
+    'events.html': ['events'],
+    'persons.html': ['persons'],
+    'map.html': ['locations']
+};
+
+// 当前页面需要的节点类别，未列出的页面返回 null
+function getPageCategories() {
+    const path = window.location.pathname;
+    const page = Object.keys(PAGE_CATEGORIES).find(name => path.includes(name));
+    return page ? PAGE_CATEGORIES[page] : null;
+}
+
+// 加载数据：已知页面只加载所需的分片，其余页面加载全部分片（含关系）
 async function loadData() {
+    const categories = getPageCategories();
+    // 只需要统计的页面优先加载汇总统计文件
+    if (categories && categories.length === 0) {
+        try {
+            const stats = await fetchStats();
+            allData = { datasets: stats.datasets, combined: { summary: stats.summary }, stats };
+            console.log('统计数据加载成功:', stats);
+            return allData;
+        } catch (error) {
+            console.warn('统计文件加载失败，改为加载分片清单:', error);
+        }
+    }
     try {
-        const response = await fetch('data.json');
-        allData = await response.json();
+        allData = categories ? await fetchShardedData(categories) : await fetchShardedData(null, true);
         console.log('数据加载成功:', allData);
         return allData;
     } catch (error) {
@@ -112,14 +138,22 @@ function updateEventsPage() {
 }
 
 // 更新人物页面
-function updatePersonsPage() {
+async function updatePersonsPage() {
     const data = getCurrentData();
     if (!data || !data.persons) return;
     
-    const persons = data.persons;
     const personCards = document.querySelector('.person-cards');
     if (!personCards) return;
     
+    // 按图分析结果中的 PageRank 排序，影响力大的人物排在前面；没有分析结果时保持原顺序
+    let analytics = null;
+    try {
+        analytics = await fetchAnalytics();
+    } catch (error) {
+        console.warn('图分析结果加载失败，人物按原顺序显示:', error);
+    }
+    const persons = orderByRanking(data.persons, analytics && analytics.rankings.persons);
+    
     // 清空现有内容
     personCards.innerHTML = '';
     
@@ -0,0 +1,318 @@
+// data.json 紧凑格式（schema_version 3）的加载辅助函数
+// 节点和关系只在顶层的 nodes / relationships 中保存一次，
+// 数据集和分类列表中保存节点的 uid 和关系的下标；来源信息按来源保存在 sources 中，记录用 src 引用；
+// csv_relationships 按列保存并共用字符串表。这里还原为页面使用的旧格式
+
+const DATA_SCHEMA_VERSION = 3;
+// 仍可读取的旧版紧凑格式
+const DATA_SCHEMA_VERSIONS = [2, 3];
+const DATA_CATEGORY_KEYS = ['events', 'persons', 'locations', 'times'];
+
+// 把节点的 src 还原为 properties 中的 data_source / import_time
+function expandNode(node, sources) {
+    if (node.src === undefined) return node;
+    const { src, ...rest } = node;
+    return { ...rest, properties: { ...node.properties, ...sources[src] } };
+}
+
+// 把关系的 src 还原为顶层的 data_source / import_time
+function expandRelationship(rel, sources) {
+    if (rel.src === undefined) return rel;
+    const { src, ...rest } = rel;
+    return { ...rest, ...sources[src] };
+}
+
+// 把按列保存的 CSV 关系还原为逐行的记录
+function expandCsvRelationships(encoded, sources) {
+    const { strings, files } = encoded;
+    const result = {};
+    Object.entries(files).forEach(([fileName, table]) => {
+        const provenance = table.src === null ? {} : sources[table.src];
+        const count = table.values.length ? table.values[0].length : 0;
+        const rows = [];
+        for (let r = 0; r < count; r++) {
+            const rawData = {};
+            table.columns.forEach((column, c) => {
+                const i = table.values[c][r];
+                rawData[column] = i === null ? null : strings[i];
+            });
+            rows.push({ source_file: fileName, ...provenance, raw_data: rawData });
+        }
+        result[fileName] = rows;
+    });
+    return result;
+}
+
+// 把紧凑格式还原为旧格式；旧格式原样返回
+function expandData(data) {
+    if (!data || !DATA_SCHEMA_VERSIONS.includes(data.schema_version)) return data;
+
+    const { schema_version, sources = [], datasets, combined, ...rest } = data;
+    const nodes = data.nodes.map(node => expandNode(node, sources));
+    const relationships = data.relationships.map(rel => expandRelationship(rel, sources));
+    delete rest.nodes;
+    delete rest.relationships;
+    if (schema_version >= 3 && rest.csv_relationships) {
+        rest.csv_relationships = expandCsvRelationships(rest.csv_relationships, sources);
+    }
+    // uid 是从 0 开始的稠密整数，直接用数组下标查找
+    const byUid = [];
+    nodes.forEach(node => { byUid[node.uid] = node; });
+
+    const resolve = group => {
+        const resolved = { ...group };
+        ['nodes', ...DATA_CATEGORY_KEYS].forEach(key => {
+            if (group[key]) resolved[key] = group[key].map(uid => byUid[uid]);
+        });
+        if (group.relationships) {
+            resolved.relationships = group.relationships.map(i => relationships[i]);
+        }
+        return resolved;
+    };
+
+    return {
+        datasets: datasets.map(resolve),
+        combined: { nodes, relationships, ...resolve(combined) },
+        ...rest
+    };
+}
+
+// 加载 data.json 并还原为旧格式
+async function fetchGraphData(url = 'data.json') {
+    const response = await fetchAsset(url);
+    if (!response.ok) {
+        throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+    }
+    return expandData(await response.json());
+}
+
+// ---- 分片加载 ----
+// data/manifest.json 列出按数据集、类别拆分的分片，页面只下载需要的分片
+
+const SHARD_DIR = 'data';
+const OTHER_CATEGORY = 'other';
+let manifestPromise = null;
+
+// 加载分片清单（只请求一次）
+function fetchManifest() {
+    if (!manifestPromise) {
+        manifestPromise = fetchAsset(`${SHARD_DIR}/manifest.json`).then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+            }
+            return response.json();
+        });
+        manifestPromise.catch(() => { manifestPromise = null; });
+    }
+    return manifestPromise;
+}
+
+// 并行加载清单中满足条件的分片
+async function fetchShards(filter) {
+    const manifest = await fetchManifest();
+    const entries = manifest.shards.filter(filter);
+    return Promise.all(entries.map(async entry => {
+        const response = await fetchAsset(`${SHARD_DIR}/${entry.file}`);
+        if (!response.ok) {
+            throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+        }
+        return response.json();
+    }));
+}
+
+// 加载预先计算的汇总统计 data/stats.json（按数据集、标签、关系类型、CSV关系文件和地区计数）
+async function fetchStats() {
+    const response = await fetchAsset(`${SHARD_DIR}/stats.json`);
+    if (!response.ok) {
+        throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+    }
+    return response.json();
+}
+
+// 加载图分析结果 data/analytics.json（按 uid 的度数、PageRank、介数中心性、连通分量及排序列表），尚未生成时返回 null
+async function fetchAnalytics() {
+    const response = await fetchAsset(`${SHARD_DIR}/analytics.json`);
+    if (response.status === 404) return null;
+    if (!response.ok) {
+        throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+    }
+    return response.json();
+}
+
+// 按图分析结果的排序列表（如 analytics.rankings.persons）排列节点，不在列表中的节点保持原顺序排在后面
+function orderByRanking(nodes, ranking) {
+    if (!ranking) return nodes;
+    const position = new Map(ranking.map((uid, i) => [uid, i]));
+    const rank = node => (position.has(node.uid) ? position.get(node.uid) : Infinity);
+    return [...nodes].sort((a, b) => (rank(a) - rank(b)) || 0);
+}
+
+// 只加载指定类别的节点分片（以及可选的关系分片和 CSV 关系原始行），组装为旧格式；
+// categories 为 null 时加载全部节点，为空数组时只使用清单中的统计。
+// 与 data_shards.load_shards 一致；尚未生成分片时退回加载完整的 data.json（只在 organize_data.py --monolithic 时生成）
+async function fetchShardedData(categories = null, withRelationships = false) {
+    let manifest;
+    try {
+        manifest = await fetchManifest();
+    } catch (error) {
+        console.warn('分片清单加载失败，改为加载完整数据:', error);
+        return fetchGraphData('data.json');
+    }
+    const shards = await fetchShards(entry =>
+        (entry.kind === 'nodes' && (!categories || categories.includes(entry.category))) ||
+        ((entry.kind === 'relationships' || entry.kind === 'csv_relationships') && withRelationships)
+    );
+
+    const datasets = manifest.datasets.map(dataset => ({ ...dataset, nodes: [], relationships: [] }));
+    const byName = {};
+    datasets.forEach(dataset => { byName[dataset.dataset] = dataset; });
+    const combined = { summary: manifest.summary, nodes: [], relationships: [] };
+    DATA_CATEGORY_KEYS.forEach(key => { combined[key] = []; });
+    const sources = manifest.sources || [];
+    const result = { datasets, combined, metadata: manifest.metadata };
+    const byUid = new Map();
+
+    shards.forEach(shard => {
+        const dataset = byName[shard.dataset];
+        if (shard.kind === 'csv_relationships') {
+            result.csv_relationships = expandCsvRelationships(shard.csv_relationships, sources);
+            return;
+        }
+        if (shard.kind === 'relationships') {
+            const relationships = shard.relationships.map(rel => expandRelationship(rel, sources));
+            combined.relationships.push(...relationships);
+            if (dataset) dataset.relationships.push(...relationships);
+            return;
+        }
+        // 同时属于多个类别的节点会出现在多个分片中，nodes 中只保留一次，各类别列表引用同一个对象
+        shard.nodes.forEach(record => {
+            let node = byUid.get(record.uid);
+            if (!node) {
+                node = expandNode(record, sources);
+                byUid.set(record.uid, node);
+                combined.nodes.push(node);
+                if (dataset) dataset.nodes.push(node);
+            }
+            if (shard.category !== OTHER_CATEGORY) combined[shard.category].push(node);
+        });
+    });
+
+    return result;
+}
+
+// ---- 增量更新 ----
+// data/delta/index.json 列出最近的补丁（from -> to）；持有旧版本数据（metadata.data_version）的页面
+// 依次应用补丁即可更新到最新版本，与 data_delta.apply_delta 一致
+
+const DELTA_DIR = 'data/delta';
+const DATA_CATEGORY_LABELS = { events: '事件', persons: '人物', locations: '地点', times: '时间' };
+
+// 关系的键：起点uid-终点uid:类型，与 data_delta.relationship_key 一致
+function relationshipKey(rel) {
+    const ends = ['source', 'target'].map(side => {
+        const uid = rel[`${side}_uid`];
+        if (uid !== undefined && uid !== null) return String(uid);
+        const value = rel[side];
+        return typeof value === 'string' ? value : JSON.stringify(value);
+    });
+    return `${ends[0]}-${ends[1]}:${rel.type || ''}`;
+}
+
+// 把一个补丁应用到旧格式的数据上（原地修改）
+function applyDelta(data, patch) {
+    let metadata = data.metadata || (data.metadata = {});
+    if (metadata.data_version !== patch.from) {
+        throw new Error(`数据版本 ${metadata.data_version} 与补丁起始版本 ${patch.from} 不符`);
+    }
+    const combined = data.combined;
+    const previous = {};
+    data.datasets.forEach(dataset => { previous[dataset.dataset] = dataset; });
+    data.datasets = patch.datasets.map(info =>
+        Object.assign(previous[info.dataset] || { nodes: [], relationships: [] }, info)
+    );
+    const byName = {};
+    data.datasets.forEach(dataset => { byName[dataset.dataset] = dataset; });
+
+    const dropped = new Set(patch.nodes.removed);
+    patch.nodes.changed.forEach(entry => dropped.add(entry.node.uid));
+    const droppedKeys = new Set(patch.relationships.removed);
+    patch.relationships.changed.forEach(entry => droppedKeys.add(entry.key));
+
+    [combined, ...data.datasets].forEach(group => {
+        ['nodes', ...DATA_CATEGORY_KEYS].forEach(key => {
+            if (group[key]) group[key] = group[key].filter(node => !dropped.has(node.uid));
+        });
+        if (group.relationships) {
+            group.relationships = group.relationships.filter(rel => !droppedKeys.has(relationshipKey(rel)));
+        }
+    });
+
+    [...patch.nodes.added, ...patch.nodes.changed].forEach(({ datasets, node }) => {
+        const categories = DATA_CATEGORY_KEYS.filter(key =>
+            (node.labels || []).some(label => label.includes(DATA_CATEGORY_LABELS[key]))
+        );
+        [combined, ...datasets.map(name => byName[name])].forEach(group => {
+            if (!group) return;
+            group.nodes.push(node);
+            categories.forEach(key => {
+                if (group === combined) (group[key] || (group[key] = [])).push(node);
+                else if (group[key]) group[key].push(node);
+            });
+        });
+    });
+    [...patch.relationships.added, ...patch.relationships.changed].forEach(({ datasets, relationships }) => {
+        combined.relationships.push(...relationships);
+        relationships.forEach((rel, i) => {
+            const group = byName[datasets[i]];
+            if (group) group.relationships.push(rel);
+        });
+    });
+
+    const csv = patch.csv_relationships || {};
+    if ((csv.removed && csv.removed.length) || (csv.updated && Object.keys(csv.updated).length)) {
+        data.csv_relationships = data.csv_relationships || {};
+        (csv.removed || []).forEach(name => { delete data.csv_relationships[name]; });
+        Object.entries(csv.updated || {}).forEach(([name, update]) => {
+            const oldRows = data.csv_relationships[name] || [];
+            const rows = [];
+            update.operations.forEach(operation => {
+                if (operation.copy) {
+                    rows.push(...oldRows.slice(operation.copy[0], operation.copy[1]));
+                } else {
+                    operation.insert.forEach(raw => {
+                        rows.push({ source_file: name, ...update.source, raw_data: raw });
+                    });
+                }
+            });
+            data.csv_relationships[name] = rows;
+        });
+    }
+
+    combined.summary = patch.summary;
+    if (patch.metadata) metadata = data.metadata = { ...patch.metadata };
+    metadata.data_version = patch.to;
+    return data;
+}
+
+// 把持有的数据更新到最新版本；缺少所需的补丁时返回 null，需要重新加载完整数据
+async function fetchDataUpdate(data) {
+    const response = await fetchAsset(`${DELTA_DIR}/index.json`, { cache: 'no-cache' });
+    if (!response.ok) return null;
+    const index = await response.json();
+    let version = data.metadata && data.metadata.data_version;
+    if (version === index.version) return data;
+
+    const chain = [];
+    while (version !== index.version) {
+        const entry = index.patches.find(p => p.from === version);
+        if (!entry) return null;
+        chain.push(entry);
+        version = entry.to;
+    }
+    for (const entry of chain) {
+        const res = await fetchAsset(`${DELTA_DIR}/${entry.file}`);
+        if (!res.ok) return null;
+        applyDelta(data, await res.json());
+    }
+    return data;
+}
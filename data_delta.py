@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相邻两次构建之间的增量补丁
+按键（节点用 uid，关系用 起点uid-终点uid:类型）计算每条记录的内容哈希，与上次构建比较，
+把新增、删除和变化的记录写成补丁 data/delta/<旧版本>-<新版本>.json；
+持有上一版本数据的客户端只需依次应用补丁，不必重新下载完整的 data.json。
+前端对应的函数见 data-schema.js 中的 fetchDataUpdate / applyDelta
+"""
+
+import difflib
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from content_hash import load_state, save_state, write_if_changed
+from data_schema import CATEGORY_KEYS
+from json_writer import encode
+from knowledge_graph import CATEGORIES
+
+# 补丁目录（相对于网站根目录）
+DELTA_DIR = os.path.join('data', 'delta')
+# 补丁索引，客户端据此判断能否从自己持有的版本增量更新
+DELTA_INDEX = 'index.json'
+# 上次构建的记录哈希，只供构建使用
+DELTA_STATE = 'state.json'
+# 保留的补丁数量，更早的版本只能重新下载完整数据
+MAX_PATCHES = 20
+
+def record_hash(record):
+    """记录的内容哈希（与键的顺序无关）"""
+    text = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+# 导入时间只随数据源文件整体变化，不参与比较，否则改动一行就会让整个文件的记录都算作变化
+
+def node_hash(node):
+    props = {key: value for key, value in node['properties'].items() if key != 'import_time'}
+    return record_hash(dict(node, properties=props))
+
+def relationship_hash(rel):
+    return record_hash({key: value for key, value in rel.items() if key != 'import_time'})
+
+def relationship_key(rel):
+    """
+    关系的键；起点、终点和类型都相同的多条关系作为一组整体比较
+
+    以匹配条件表示的端点按紧凑 JSON 编码并保持属性顺序，与 data-schema.js 中 JSON.stringify 的结果相同
+    """
+    ends = []
+    for side in ('source', 'target'):
+        uid = rel.get(f'{side}_uid')
+        if uid is None:
+            value = rel.get(side)
+            uid = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        ends.append(str(uid))
+    return f"{ends[0]}-{ends[1]}:{rel.get('type', '')}"
+
+def snapshot(all_data):
+    """
+    当前构建的记录
+
+    Returns:
+        nodes: uid -> (所属数据集列表, 节点)
+        groups: 关系键 -> (各关系所属的数据集, 关系列表)
+        hashes: {'nodes': uid -> 哈希, 'relationships': 键 -> 哈希, 'csv_relationships': 文件名 -> 各行哈希}
+    """
+    # 实体消解合并的节点可能同时属于多个数据集，同一个键下的关系也可能来自不同数据集
+    datasets_of = {}
+    for dataset in all_data['datasets']:
+        for record in dataset['nodes'] + dataset['relationships']:
+            datasets_of.setdefault(id(record), []).append(dataset['dataset'])
+
+    combined = all_data['combined']
+    nodes = {str(node['uid']): (datasets_of.get(id(node), []), node) for node in combined['nodes']}
+    groups = {}
+    for rel in combined['relationships']:
+        datasets, rels = groups.setdefault(relationship_key(rel), ([], []))
+        datasets.append(datasets_of.get(id(rel), [None])[0])
+        rels.append(rel)
+
+    hashes = {
+        'nodes': {uid: node_hash(node) for uid, (_, node) in nodes.items()},
+        # 组内按哈希排序，顺序变化不算变化
+        'relationships': {
+            key: ','.join(sorted(relationship_hash(rel) for rel in rels))
+            for key, (_, rels) in groups.items()
+        },
+        'csv_relationships': {
+            file_name: [record_hash(row['raw_data']) for row in rows]
+            for file_name, rows in all_data.get('csv_relationships', {}).items()
+        }
+    }
+    return nodes, groups, hashes
+
+def diff(old, new):
+    """比较两组哈希，返回 (新增的键, 删除的键, 变化的键)"""
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key in new if key in old and old[key] != new[key]]
+    return added, removed, changed
+
+def csv_operations(old_rows, new_rows):
+    """
+    CSV 关系文件的逐行差异
+
+    CSV 行没有ID，按行哈希序列比较：{'copy': [起, 止]} 表示沿用旧文件中的这些行，
+    {'insert': [...]} 为新行的 raw_data
+    """
+    operations = []
+    matcher = difflib.SequenceMatcher(None, old_rows, new_rows, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append({'copy': [i1, i2]})
+        elif j2 > j1:
+            operations.append({'insert': list(range(j1, j2))})
+    return operations
+
+def build_patch(all_data, old_hashes, nodes, groups, hashes):
+    """生成补丁内容；没有任何变化时返回 None"""
+    node_diff = diff(old_hashes.get('nodes', {}), hashes['nodes'])
+    rel_diff = diff(old_hashes.get('relationships', {}), hashes['relationships'])
+    csv_diff = diff(old_hashes.get('csv_relationships', {}), hashes['csv_relationships'])
+    if not any(keys for d in (node_diff, rel_diff, csv_diff) for keys in d):
+        return None
+
+    def node_entries(keys):
+        return [{'datasets': nodes[uid][0], 'node': nodes[uid][1]} for uid in keys]
+
+    def group_entries(keys):
+        return [{'key': key, 'datasets': groups[key][0], 'relationships': groups[key][1]} for key in keys]
+
+    csv_rows = all_data.get('csv_relationships', {})
+    csv_updates = {}
+    for name in csv_diff[0] + csv_diff[2]:
+        rows = csv_rows[name]
+        operations = csv_operations(old_hashes['csv_relationships'].get(name, []), hashes['csv_relationships'][name])
+        for operation in operations:
+            if 'insert' in operation:
+                operation['insert'] = [rows[i]['raw_data'] for i in operation['insert']]
+        csv_updates[name] = {
+            'source': {key: rows[0][key] for key in ('data_source', 'import_time') if key in rows[0]} if rows else {},
+            'operations': operations
+        }
+    return {
+        'nodes': {
+            'added': node_entries(node_diff[0]),
+            'removed': [int(uid) for uid in node_diff[1]],
+            'changed': node_entries(node_diff[2])
+        },
+        'relationships': {
+            'added': group_entries(rel_diff[0]),
+            'removed': rel_diff[1],
+            'changed': group_entries(rel_diff[2])
+        },
+        'csv_relationships': {
+            'updated': csv_updates,
+            'removed': csv_diff[1]
+        },
+        'summary': all_data['combined']['summary'],
+        # 数据集的名称、统计等（不含节点和关系），客户端据此增删数据集
+        'datasets': [
+            {key: value for key, value in dataset.items()
+             if key not in ('nodes', 'relationships') + CATEGORY_KEYS}
+            for dataset in all_data['datasets']
+        ],
+        # 整理过程的统计（实体合并、无法解析的端点等），不含数据版本号
+        'metadata': {key: value for key, value in all_data.get('metadata', {}).items() if key != 'data_version'}
+    }
+
+def patch_file(from_version, to_version):
+    return f"{from_version}-{to_version}.json"
+
+def write_delta(all_data, base_dir):
+    """
+    与上次构建比较并写入补丁，把数据版本号记入 metadata.data_version
+
+    首次构建（没有上次的哈希）时只记录版本，不生成补丁；内容没有变化时版本号不变
+
+    Returns:
+        (数据版本号, 补丁条目或 None)
+    """
+    delta_dir = os.path.join(base_dir, DELTA_DIR)
+    os.makedirs(delta_dir, exist_ok=True)
+    state_file = os.path.join(delta_dir, DELTA_STATE)
+    index_file = os.path.join(delta_dir, DELTA_INDEX)
+    state = load_state(state_file)
+    index = load_state(index_file) or {'version': 0, 'patches': []}
+
+    nodes, groups, hashes = snapshot(all_data)
+    version = index['version']
+    entry = None
+    if not state or state.get('version') != version:
+        # 没有与当前版本对应的哈希，无法生成补丁，只能开始新版本
+        version += 1
+    else:
+        patch = build_patch(all_data, state['hashes'], nodes, groups, hashes)
+        if patch is not None:
+            version += 1
+            patch = dict({'from': version - 1, 'to': version, 'generated_at': datetime.now().isoformat()}, **patch)
+            data = encode(patch)
+            name = patch_file(version - 1, version)
+            write_if_changed(os.path.join(delta_dir, name), data)
+            entry = {'from': version - 1, 'to': version, 'file': name, 'bytes': len(data)}
+            index['patches'].append(entry)
+
+    index['version'] = version
+    index['patches'] = index['patches'][-MAX_PATCHES:]
+    names = {p['file'] for p in index['patches']}
+    for name in os.listdir(delta_dir):
+        if name not in names and name not in (DELTA_INDEX, DELTA_STATE):
+            os.remove(os.path.join(delta_dir, name))
+
+    if version != state.get('version') or hashes != state.get('hashes'):
+        save_state(state_file, {'version': version, 'hashes': hashes})
+    write_if_changed(index_file, encode(index, pretty=True))
+    all_data.setdefault('metadata', {})['data_version'] = version
+    return version, entry
+
+def _category_keys(labels):
+    """节点所属的类别：标签包含类别关键字即归入该类别，与 KnowledgeGraph.categories(partial=True) 一致"""
+    return [key for key, keyword in CATEGORIES.items() if any(keyword in label for label in labels)]
+
+def apply_delta(data, patch):
+    """
+    把补丁应用到旧格式的数据（data_schema.load_data 的结果）上，原地修改并返回
+
+    数据的 metadata.data_version 必须等于补丁的 from
+    """
+    metadata = data.setdefault('metadata', {})
+    if metadata.get('data_version') != patch['from']:
+        raise ValueError(f"数据版本 {metadata.get('data_version')} 与补丁起始版本 {patch['from']} 不符")
+
+    combined = data['combined']
+    # 按补丁中的数据集列表增删数据集并更新其统计等信息
+    by_name = {dataset['dataset']: dataset for dataset in data['datasets']}
+    datasets = []
+    for info in patch['datasets']:
+        dataset = by_name.get(info['dataset']) or {'nodes': [], 'relationships': []}
+        dataset.update(info)
+        datasets.append(dataset)
+    data['datasets'] = datasets
+    by_name = {dataset['dataset']: dataset for dataset in datasets}
+
+    node_patch = patch['nodes']
+    dropped = {int(uid) for uid in node_patch['removed']}
+    dropped.update(entry['node']['uid'] for entry in node_patch['changed'])
+    rel_patch = patch['relationships']
+    dropped_keys = set(rel_patch['removed'])
+    dropped_keys.update(entry['key'] for entry in rel_patch['changed'])
+
+    def keep_node(node):
+        return node.get('uid') not in dropped
+
+    def keep_rel(rel):
+        return relationship_key(rel) not in dropped_keys
+
+    for group in [combined] + data['datasets']:
+        for key in ('nodes',) + CATEGORY_KEYS:
+            if key in group:
+                group[key] = [node for node in group[key] if keep_node(node)]
+        if 'relationships' in group:
+            group['relationships'] = [rel for rel in group['relationships'] if keep_rel(rel)]
+
+    for entry in node_patch['added'] + node_patch['changed']:
+        node = entry['node']
+        combined['nodes'].append(node)
+        for key in _category_keys(node['labels']):
+            combined.setdefault(key, []).append(node)
+        for name in entry['datasets']:
+            dataset = by_name.get(name)
+            if dataset is not None:
+                dataset['nodes'].append(node)
+                for key in _category_keys(node['labels']):
+                    if key in dataset:
+                        dataset[key].append(node)
+
+    for entry in rel_patch['added'] + rel_patch['changed']:
+        rels = entry['relationships']
+        combined['relationships'].extend(rels)
+        for name, rel in zip(entry['datasets'], rels):
+            dataset = by_name.get(name)
+            if dataset is not None:
+                dataset['relationships'].append(rel)
+
+    csv_patch = patch.get('csv_relationships', {})
+    if csv_patch.get('updated') or csv_patch.get('removed'):
+        csv_relationships = data.setdefault('csv_relationships', {})
+        for name in csv_patch.get('removed', []):
+            csv_relationships.pop(name, None)
+        for name, update in csv_patch.get('updated', {}).items():
+            old_rows = csv_relationships.get(name, [])
+            rows = []
+            for operation in update['operations']:
+                if 'copy' in operation:
+                    rows.extend(old_rows[operation['copy'][0]:operation['copy'][1]])
+                else:
+                    rows.extend(dict(source_file=name, **update['source'], raw_data=raw)
+                                for raw in operation['insert'])
+            csv_relationships[name] = rows
+
+    combined['summary'] = patch['summary']
+    if 'metadata' in patch:
+        metadata = data['metadata'] = dict(patch['metadata'])
+    metadata['data_version'] = patch['to']
+    return data
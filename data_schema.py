@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+data.json 的紧凑格式（schema_version 3）
+
+每个节点和关系只保存一次，放在顶层的 nodes / relationships 中；
+数据集和分类列表只保存引用：节点用全局编号 uid，关系用其在 relationships 中的下标。
+来源信息（data_source、import_time）按来源保存在顶层的 sources 中，节点和关系用 src 引用；
+csv_relationships 按列保存，所有文件共用一张字符串表。
+写入见 data_shards.write_data；expand_data 把紧凑格式还原为旧格式，前端对应的函数见 data-schema.js
+"""
+
+import json
+
+SCHEMA_VERSION = 3
+# 仍可读取的旧版紧凑格式（版本 2 没有来源表，csv_relationships 按行保存）
+SUPPORTED_VERSIONS = (2, 3)
+
+# 按来源保存的字段：节点在 properties 中，关系在顶层
+PROVENANCE_KEYS = ('data_source', 'import_time')
+
+# 合并数据中按类别列出的节点
+CATEGORY_KEYS = ('events', 'persons', 'locations', 'times')
+
+class SourceTable:
+    """
+    来源表：每个 (data_source, import_time) 只保存一次
+
+    compact_node / compact_relationship 把记录中的来源信息换成 src 下标，
+    entries 即写入文件的 sources 列表
+    """
+
+    __slots__ = ('entries', '_index')
+
+    def __init__(self):
+        self.entries = []
+        self._index = {}
+
+    def add(self, container):
+        """登记 container 中的来源信息，返回下标；字段不全时返回 None"""
+        if not all(key in container for key in PROVENANCE_KEYS):
+            return None
+        key = tuple(container[k] for k in PROVENANCE_KEYS)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.entries)
+            self.entries.append(dict(zip(PROVENANCE_KEYS, key)))
+        return index
+
+    def compact_node(self, node):
+        src = self.add(node['properties'])
+        if src is None:
+            return node
+        compact = dict(node, src=src)
+        compact['properties'] = {k: v for k, v in node['properties'].items() if k not in PROVENANCE_KEYS}
+        return compact
+
+    def compact_relationship(self, rel):
+        src = self.add(rel)
+        if src is None:
+            return rel
+        compact = {k: v for k, v in rel.items() if k not in PROVENANCE_KEYS}
+        compact['src'] = src
+        return compact
+
+def expand_node(node, sources):
+    """把节点的 src 还原为 properties 中的来源信息"""
+    if 'src' not in node:
+        return node
+    expanded = {k: v for k, v in node.items() if k != 'src'}
+    expanded['properties'] = dict(node['properties'], **sources[node['src']])
+    return expanded
+
+def expand_relationship(rel, sources):
+    """把关系的 src 还原为顶层的来源信息"""
+    if 'src' not in rel:
+        return rel
+    expanded = {k: v for k, v in rel.items() if k != 'src'}
+    expanded.update(sources[rel['src']])
+    return expanded
+
+def compact_csv_relationships(csv_relationships, sources):
+    """
+    把 CSV 关系原始行按列保存
+
+    每个文件保存一次表头和来源（src），values 为每列一个数组，元素是字符串表 strings 中的下标，
+    空值为 None；source_file 即文件名，不再逐行保存
+
+    Returns:
+        {'strings': 字符串表, 'files': 文件名 -> {'src', 'columns', 'values'}}
+    """
+    strings = []
+    string_index = {}
+
+    def intern(value):
+        if value is None:
+            return None
+        index = string_index.get(value)
+        if index is None:
+            index = string_index[value] = len(strings)
+            strings.append(value)
+        return index
+
+    files = {}
+    for file_name, rels in csv_relationships.items():
+        columns = []
+        for rel in rels:
+            for key in rel['raw_data']:
+                if key not in columns:
+                    columns.append(key)
+        files[file_name] = {
+            'src': sources.add(rels[0]) if rels else None,
+            'columns': columns,
+            'values': [[intern(rel['raw_data'].get(column)) for rel in rels] for column in columns]
+        }
+    return {'strings': strings, 'files': files}
+
+def expand_csv_relationships(encoded, sources):
+    """把按列保存的 CSV 关系还原为逐行的记录"""
+    strings = encoded['strings']
+    csv_relationships = {}
+    for file_name, table in encoded['files'].items():
+        provenance = sources[table['src']] if table['src'] is not None else {}
+        columns = [[None if i is None else strings[i] for i in values] for values in table['values']]
+        rows = zip(*columns) if columns else ()
+        csv_relationships[file_name] = [
+            dict(source_file=file_name, **provenance, raw_data=dict(zip(table['columns'], row)))
+            for row in rows
+        ]
+    return csv_relationships
+
+def expand_data(data):
+    """把紧凑格式还原为旧格式；旧格式原样返回"""
+    version = data.get('schema_version')
+    if version not in SUPPORTED_VERSIONS:
+        return data
+    sources = data.get('sources', [])
+    nodes = [expand_node(node, sources) for node in data['nodes']]
+    by_uid = {node['uid']: node for node in nodes}
+    relationships = [expand_relationship(rel, sources) for rel in data['relationships']]
+
+    def resolve(group):
+        resolved = dict(group)
+        for key in ('nodes',) + CATEGORY_KEYS:
+            if key in group:
+                resolved[key] = [by_uid[uid] for uid in group[key]]
+        if 'relationships' in group:
+            resolved['relationships'] = [relationships[i] for i in group['relationships']]
+        return resolved
+
+    combined = dict(nodes=nodes, relationships=relationships)
+    combined.update(resolve(data['combined']))
+    expanded = {
+        'datasets': [resolve(dataset) for dataset in data['datasets']],
+        'combined': combined
+    }
+    for key, value in data.items():
+        if key in ('schema_version', 'sources', 'datasets', 'combined', 'nodes', 'relationships'):
+            continue
+        if key == 'csv_relationships' and version >= 3:
+            value = expand_csv_relationships(value, sources)
+        expanded[key] = value
+    return expanded
+
+def load_data(file_path):
+    """读取 data.json，无论新旧格式都返回旧格式"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return expand_data(json.load(f))
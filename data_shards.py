@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按数据集和节点类别拆分的数据分片
+data/manifest.json 列出各分片的文件名、大小和记录数，页面按需加载所需分片；
+分片即完整数据，只有指定 monolithic 时才另外写入包含全部记录的 data.json（页面在没有分片时的后备）。
+Python 中用 load_site_data 读取，前端对应的函数见 data-schema.js
+"""
+
+import json
+import os
+
+from content_hash import load_state, write_if_changed
+from data_schema import (CATEGORY_KEYS, SCHEMA_VERSION, SourceTable, compact_csv_relationships,
+                         expand_csv_relationships, expand_node, expand_relationship, load_data)
+from json_writer import BATCH_SIZE, JsonStreamWriter, encode, encode_items
+
+# 分片目录（相对于网站根目录）
+SHARD_DIR = 'data'
+MANIFEST_FILE = 'manifest.json'
+
+# 不属于任何数据集的节点和边（CSV）所在的分组
+CSV_GROUP = 'csv'
+# 不属于任何类别的节点所在的分片
+OTHER_CATEGORY = 'other'
+
+def shard_file(group, kind):
+    """分片文件名，如 花园口决堤.events.json"""
+    return f"{group}.{kind}.json"
+
+def build_shards(all_data):
+    """
+    拆分合并数据
+
+    节点按 (数据集, 类别) 分片，类别与 combined 中的分类列表一致，
+    同时属于多个类别的节点会出现在多个分片中；不属于任何类别的节点放入 other 分片。
+    关系按数据集分片，CSV 原始行单独成一个分片
+
+    Returns:
+        manifest: 清单（不含文件大小）
+        shards: 文件名 -> 分片内容，按清单顺序排列
+        sources: 来源表，分片中的节点和关系按它压缩
+    """
+    combined = all_data['combined']
+    groups = [dataset['dataset'] for dataset in all_data['datasets']]
+    group_of_node = {}
+    group_of_edge = {}
+    for dataset in all_data['datasets']:
+        for node in dataset['nodes']:
+            group_of_node.setdefault(id(node), dataset['dataset'])
+        for rel in dataset['relationships']:
+            group_of_edge.setdefault(id(rel), dataset['dataset'])
+
+    # (分组, 类别) -> 节点列表
+    buckets = {}
+    categorized = set()
+    for key in CATEGORY_KEYS:
+        for node in combined.get(key, []):
+            categorized.add(id(node))
+            buckets.setdefault((group_of_node.get(id(node), CSV_GROUP), key), []).append(node)
+    for node in combined['nodes']:
+        if id(node) not in categorized:
+            buckets.setdefault((group_of_node.get(id(node), CSV_GROUP), OTHER_CATEGORY), []).append(node)
+    edges = {}
+    for rel in combined['relationships']:
+        edges.setdefault(group_of_edge.get(id(rel), CSV_GROUP), []).append(rel)
+
+    if any(group == CSV_GROUP for group, _ in buckets) or CSV_GROUP in edges:
+        groups.append(CSV_GROUP)
+
+    entries = []
+    shards = {}
+    for group in groups:
+        dataset = None if group == CSV_GROUP else group
+        for category in CATEGORY_KEYS + (OTHER_CATEGORY,):
+            nodes = buckets.get((group, category))
+            if not nodes:
+                continue
+            name = shard_file(group, category)
+            shards[name] = {'dataset': dataset, 'kind': 'nodes', 'category': category, 'nodes': nodes}
+            entries.append({'file': name, 'dataset': dataset, 'kind': 'nodes',
+                            'category': category, 'count': len(nodes)})
+        rels = edges.get(group)
+        if rels:
+            name = shard_file(group, 'relationships')
+            shards[name] = {'dataset': dataset, 'kind': 'relationships', 'relationships': rels}
+            entries.append({'file': name, 'dataset': dataset, 'kind': 'relationships', 'count': len(rels)})
+
+    csv_rows = all_data.get('csv_relationships')
+    if csv_rows:
+        name = 'csv_relationships.json'
+        shards[name] = {'kind': 'csv_relationships', 'csv_relationships': csv_rows}
+        entries.append({'file': name, 'dataset': None, 'kind': 'csv_relationships',
+                        'count': sum(len(rows) for rows in csv_rows.values())})
+
+    # 先登记全部来源，来源表的顺序只取决于数据，且在写入任何记录之前就已完整
+    sources = SourceTable()
+    for node in combined['nodes']:
+        sources.add(node['properties'])
+    for rel in combined['relationships']:
+        sources.add(rel)
+    for rows in (csv_rows or {}).values():
+        for row in rows:
+            sources.add(row)
+
+    manifest = {
+        'schema_version': SCHEMA_VERSION,
+        'sources': sources.entries,
+        'summary': combined['summary'],
+        'datasets': [
+            {key: value for key, value in dataset.items()
+             if key not in ('nodes', 'relationships') + CATEGORY_KEYS}
+            for dataset in all_data['datasets']
+        ],
+        'shards': entries
+    }
+    if 'metadata' in all_data:
+        manifest['metadata'] = all_data['metadata']
+    return manifest, shards, sources
+
+def _data_refs(all_data, manifest):
+    """
+    data.json 中数据集和分类列表的引用
+
+    data.json 的 nodes / relationships 按分片顺序排列，以便直接复用分片的编码结果，
+    因此关系下标按各分组关系分片的位置计算
+    """
+    offsets = {}
+    position = 0
+    for entry in manifest['shards']:
+        if entry['kind'] == 'relationships':
+            offsets[entry['dataset']] = position
+            position += entry['count']
+
+    datasets = []
+    for dataset in all_data['datasets']:
+        start = offsets.get(dataset['dataset'], 0)
+        ref = dict(dataset, nodes=[node['uid'] for node in dataset['nodes']],
+                   relationships=list(range(start, start + len(dataset['relationships']))))
+        for key in CATEGORY_KEYS:
+            if key in dataset:
+                ref[key] = [node['uid'] for node in dataset[key]]
+        datasets.append(ref)
+
+    combined = {key: value for key, value in all_data['combined'].items()
+                if key not in ('nodes', 'relationships')}
+    for key in CATEGORY_KEYS:
+        combined[key] = [node['uid'] for node in combined.get(key, [])]
+    return datasets, combined
+
+def _write_shard(shard_path, shard, sources, combined_writer, seen, pretty):
+    """
+    分批编码并写入一个分片，同一批编码结果同时追加到 data.json 的对应数组中
+
+    记录中的来源信息按 sources 换成 src 下标；
+    节点可能同时出现在多个类别分片中，data.json 中只保留第一次出现的节点
+    """
+    kind = shard['kind']
+    with JsonStreamWriter(shard_path, pretty) as w:
+        for key, value in shard.items():
+            if key != kind:
+                w.member(key, value)
+        if kind == 'csv_relationships':
+            data = encode(compact_csv_relationships(shard[kind], sources), pretty)
+            w.raw_member(kind, data)
+            if combined_writer is not None:
+                combined_writer.raw_member(kind, data)
+            return w
+
+        w.begin_array(kind)
+        items = shard[kind]
+        compact = sources.compact_node if kind == 'nodes' else sources.compact_relationship
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = [compact(item) for item in items[start:start + BATCH_SIZE]]
+            data = encode_items(batch, pretty)
+            w.raw_items(data)
+            if combined_writer is None:
+                continue
+            if kind == 'nodes':
+                fresh = [node for node in batch if node['uid'] not in seen]
+                seen.update(node['uid'] for node in fresh)
+                if len(fresh) != len(batch):
+                    data = encode_items(fresh, pretty)
+            combined_writer.raw_items(data)
+        w.end_array()
+    return w
+
+def write_data(all_data, base_dir, legacy=False, pretty=False, monolithic=False):
+    """
+    写入各分片和清单，指定 monolithic 时同时写入 data.json
+
+    每批记录只编码一次（写入 data.json 时同一份编码结果同时写入所属分片和 data.json），编码后的文本只保留一批
+    （csv_relationships 为列式结构，整体编码一次）。输入的 all_data 已完整在内存中，
+    合并、实体合并和统计都需要整个图，因此峰值内存仍与数据总量成正比，分批只避免了再多一份整个文件的文本；
+    内容未变化的文件不重写，并删除清单中已不存在的旧分片；不写 data.json 时删除上次留下的 data.json
+
+    Args:
+        legacy: data.json 使用旧格式（节点对象在 combined 与各数据集中重复存放），总是写入 data.json
+        pretty: 缩进输出，便于查看；默认紧凑输出
+        monolithic: 同时写入包含全部记录的 data.json，供没有分片清单的页面和工具读取；默认只写分片
+
+    Returns:
+        (分片中实际写入的文件数, 分片总数)
+    """
+    shard_dir = os.path.join(base_dir, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest, shards, sources = build_shards(all_data)
+    manifest_path = os.path.join(shard_dir, MANIFEST_FILE)
+    # 只删除上次清单中列出的分片，目录中的其他文件（如统计文件）不受影响
+    previous = [entry['file'] for entry in load_state(manifest_path).get('shards', [])]
+    entries = {entry['file']: entry for entry in manifest['shards']}
+    data_path = os.path.join(base_dir, 'data.json')
+    written = 0
+
+    if legacy:
+        with JsonStreamWriter(data_path, pretty=True) as w:
+            for key, value in all_data.items():
+                w.member(key, value)
+        for name, shard in shards.items():
+            shard_writer = _write_shard(os.path.join(shard_dir, name), shard, sources, None, None, pretty)
+            entries[name]['bytes'] = shard_writer.bytes
+            written += shard_writer.changed
+    elif not monolithic:
+        # 分片与 data.json 内容相同，默认只保留分片
+        for name, shard in shards.items():
+            shard_writer = _write_shard(os.path.join(shard_dir, name), shard, sources, None, None, pretty)
+            entries[name]['bytes'] = shard_writer.bytes
+            written += shard_writer.changed
+        if os.path.exists(data_path):
+            os.remove(data_path)
+    else:
+        datasets, combined = _data_refs(all_data, manifest)
+        seen = set()
+        with JsonStreamWriter(data_path, pretty) as w:
+            w.member('schema_version', SCHEMA_VERSION)
+            w.member('sources', sources.entries)
+            w.member('datasets', datasets)
+            w.member('combined', combined)
+            for kind in ('nodes', 'relationships'):
+                w.begin_array(kind)
+                for name, shard in shards.items():
+                    if shard['kind'] == kind:
+                        shard_writer = _write_shard(os.path.join(shard_dir, name), shard, sources, w, seen, pretty)
+                        entries[name]['bytes'] = shard_writer.bytes
+                        written += shard_writer.changed
+                w.end_array()
+            for key, value in all_data.items():
+                if key in ('datasets', 'combined'):
+                    continue
+                shard = shards.get(f"{key}.json")
+                if shard is not None and shard['kind'] == key:
+                    # 与分片共用同一份编码结果
+                    shard_writer = _write_shard(os.path.join(shard_dir, f"{key}.json"), shard, sources, w, seen, pretty)
+                    entries[f"{key}.json"]['bytes'] = shard_writer.bytes
+                    written += shard_writer.changed
+                else:
+                    w.member(key, value)
+
+    written += write_if_changed(manifest_path, encode(manifest, pretty=True))
+
+    for name in previous:
+        if name not in shards and os.path.exists(os.path.join(shard_dir, name)):
+            os.remove(os.path.join(shard_dir, name))
+    return written, len(shards)
+
+def load_shards(base_dir):
+    """
+    读取分片清单和全部分片，还原为旧格式（结构与 data_schema.load_data 的结果相同）
+
+    与 data-schema.js 的 fetchShardedData(null, true) 一致：节点和关系（包括各数据集的）按清单中分片的顺序排列，
+    同时属于多个类别的节点只保留一次，各类别列表引用同一个节点对象
+    """
+    shard_dir = os.path.join(base_dir, SHARD_DIR)
+    with open(os.path.join(shard_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    sources = manifest.get('sources', [])
+    datasets = [dict(dataset, nodes=[], relationships=[]) for dataset in manifest['datasets']]
+    by_name = {dataset['dataset']: dataset for dataset in datasets}
+    combined = dict(summary=manifest['summary'], nodes=[], relationships=[], **{key: [] for key in CATEGORY_KEYS})
+    data = {'datasets': datasets, 'combined': combined}
+    if 'metadata' in manifest:
+        data['metadata'] = manifest['metadata']
+
+    by_uid = {}
+    for entry in manifest['shards']:
+        with open(os.path.join(shard_dir, entry['file']), 'r', encoding='utf-8') as f:
+            shard = json.load(f)
+        dataset = by_name.get(entry['dataset'])
+        if entry['kind'] == 'csv_relationships':
+            data['csv_relationships'] = expand_csv_relationships(shard['csv_relationships'], sources)
+        elif entry['kind'] == 'relationships':
+            relationships = [expand_relationship(rel, sources) for rel in shard['relationships']]
+            combined['relationships'].extend(relationships)
+            if dataset is not None:
+                dataset['relationships'].extend(relationships)
+        else:
+            for record in shard['nodes']:
+                node = by_uid.get(record['uid'])
+                if node is None:
+                    node = by_uid[record['uid']] = expand_node(record, sources)
+                    combined['nodes'].append(node)
+                    if dataset is not None:
+                        dataset['nodes'].append(node)
+                if entry['category'] != OTHER_CATEGORY:
+                    combined[entry['category']].append(node)
+    return data
+
+def load_site_data(base_dir):
+    """读取网站目录中的合并数据：优先读取分片，没有分片清单时读取 data.json"""
+    if os.path.exists(os.path.join(base_dir, SHARD_DIR, MANIFEST_FILE)):
+        return load_shards(base_dir)
+    return load_data(os.path.join(base_dir, 'data.json'))
@@ -0,0 +1,50 @@
+// 按ID哈希分桶的实体存储（data/entities/<桶号>.json）
+// 详情页只请求节点所在的一个桶，再按桶内索引直接取出节点，与数据总量无关
+
+const ENTITY_DIR = 'data/entities';
+// 必须与 entity_store.py 中的 BUCKET_COUNT 相同
+const ENTITY_BUCKET_COUNT = 256;
+
+// 32位 FNV-1a 哈希，按 UTF-16 码元计算，与 entity_store.fnv1a 一致
+function fnv1a(key) {
+    let h = 0x811c9dc5;
+    for (let i = 0; i < key.length; i++) {
+        h ^= key.charCodeAt(i);
+        h = Math.imul(h, 0x01000193) >>> 0;
+    }
+    return h;
+}
+
+function entityBucketOf(key) {
+    return fnv1a(String(key)) % ENTITY_BUCKET_COUNT;
+}
+
+const entityBuckets = {};
+
+// 加载键所在的桶（同一个桶只请求一次）
+function fetchEntityBucket(key) {
+    const bucket = entityBucketOf(key);
+    if (!entityBuckets[bucket]) {
+        const file = bucket.toString(16).padStart(2, '0');
+        entityBuckets[bucket] = fetchAsset(`${ENTITY_DIR}/${file}.json`).then(response => {
+            // 空桶不会生成文件
+            if (response.status === 404) return { index: {}, entities: [] };
+            if (!response.ok) {
+                throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+            }
+            return response.json();
+        });
+        entityBuckets[bucket].catch(() => { delete entityBuckets[bucket]; });
+    }
+    return entityBuckets[bucket];
+}
+
+// 按节点ID（或 properties.id）查找节点，返回匹配的节点列表；
+// 不同数据源的节点ID可能相同，可用 label 只保留标签中包含该关键字的节点
+async function fetchEntities(key, label = null) {
+    key = String(key);
+    const bucket = await fetchEntityBucket(key);
+    const entities = (bucket.index[key] || []).map(i => bucket.entities[i]);
+    if (!label) return entities;
+    return entities.filter(node => node.labels && node.labels.some(l => l.includes(label)));
+}
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨数据源的实体消解
+同一人物、地点会同时出现在 Cypher、Neo4j JSON 和 CSV 数据源中，合并时各自成为一个节点。
+这里先按 (规范化名称, 类别, 粗网格) 分块，只在块内（及相邻网格）两两比较，
+把判定为同一实体的节点用并查集聚类（同一类中每个数据源至多一个节点），每类保留一个代表节点，
+其余节点的来源记入 merged_from。比较次数只与同名节点的数量有关，不随节点总数平方增长
+"""
+
+import math
+import re
+import unicodedata
+from collections import defaultdict
+
+from data_schema import PROVENANCE_KEYS
+from geo_regions import coordinates
+from knowledge_graph import CATEGORIES, KnowledgeGraph
+
+# 各数据源中表示名称的属性，按顺序取第一个非空的
+NAME_KEYS = ('name', '名称', '姓名', '人物姓名', '事件名称', 'LocationName')
+
+# 坐标能标识实体本身的类别（地点）；人物、事件的坐标只是活动地点，不参与分块
+GEO_CATEGORIES = ('locations',)
+# 分块网格的边长（度），约 50 公里；比较时同时查找相邻网格
+CELL_SIZE = 0.5
+# 同名地点的最大距离（公里）
+MAX_DISTANCE_KM = 25
+
+# 两个节点都有且取值不同即不是同一实体的属性
+CONFLICT_KEYS = ('时间', 'time')
+
+# 规范化名称时去掉的空白和分隔符
+_IGNORED = re.compile(r'[\s·•・\-—_"\'“”‘’]+')
+
+def normalize_name(name):
+    """规范化名称：全角转半角、去掉空白和分隔符、转小写"""
+    return _IGNORED.sub('', unicodedata.normalize('NFKC', str(name))).lower()
+
+def entity_name(props):
+    """节点的名称，没有时返回 None"""
+    for key in NAME_KEYS:
+        value = props.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+def entity_kind(labels):
+    """节点的类别（CATEGORIES 中第一个匹配的键），不属于任何类别时返回 None"""
+    for key, keyword in CATEGORIES.items():
+        if any(keyword in label for label in labels):
+            return key
+    return None
+
+def geocell(point):
+    return (math.floor(point[0] / CELL_SIZE), math.floor(point[1] / CELL_SIZE))
+
+def distance_km(a, b):
+    """两个 (经度, 纬度) 之间的球面距离"""
+    lng1, lat1, lng2, lat2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * math.asin(min(1.0, math.sqrt(h)))
+
+def shares_attribute(props_a, props_b):
+    """
+    除名称和来源外两个节点是否还有一项相同：坐标相距不超过 MAX_DISTANCE_KM，或同名属性取值相同
+    """
+    point_a, point_b = coordinates(props_a), coordinates(props_b)
+    if point_a is not None and point_b is not None and distance_km(point_a, point_b) <= MAX_DISTANCE_KM:
+        return True
+    for key, value in props_a.items():
+        if key in NAME_KEYS or key in PROVENANCE_KEYS or value in (None, ''):
+            continue
+        other = props_b.get(key)
+        if other not in (None, '') and str(other) == str(value):
+            return True
+    return False
+
+class UnionFind:
+    """
+    并查集；合并时序号小的作为根，因此每类的代表节点是数据源顺序中最早的节点
+
+    给出各元素的数据源时，每类记录其中的数据源，拒绝合并数据源有重叠的两类，
+    同一数据源的两个节点不会经由其他数据源的节点间接归为一类
+    """
+
+    __slots__ = ('parent', 'sources')
+
+    def __init__(self, size, sources=None):
+        self.parent = list(range(size))
+        self.sources = [{source} for source in sources] if sources is not None else None
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        """合并 i、j 所在的两类，返回两者是否在同一类"""
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return True
+        if j < i:
+            i, j = j, i
+        if self.sources is not None:
+            if not self.sources[i].isdisjoint(self.sources[j]):
+                return False
+            self.sources[i] |= self.sources[j]
+            self.sources[j] = None
+        self.parent[j] = i
+        return True
+
+class _Entry:
+    """参与消解的节点：序号、类别、数据源、坐标、网格"""
+
+    __slots__ = ('index', 'kind', 'source', 'point', 'cell')
+
+    def __init__(self, index, kind, source, point, cell):
+        self.index = index
+        self.kind = kind
+        self.source = source
+        self.point = point
+        self.cell = cell
+
+def build_blocks(nodes):
+    """
+    分块
+
+    Returns:
+        (规范化名称, 类别) -> 网格 -> 节点列表；不参与坐标分块的类别及没有坐标的节点网格为 None
+    """
+    blocks = defaultdict(lambda: defaultdict(list))
+    for index, node in enumerate(nodes):
+        props = node['properties']
+        name = entity_name(props)
+        kind = entity_kind(node['labels'])
+        if name is None or kind is None:
+            continue
+        key = normalize_name(name)
+        if not key:
+            continue
+        point = coordinates(props) if kind in GEO_CATEGORIES else None
+        cell = geocell(point) if point is not None else None
+        blocks[(key, kind)][cell].append(_Entry(index, kind, props.get('data_source'), point, cell))
+    return blocks
+
+def _candidates(cells, entry):
+    """与 entry 需要比较的块：相邻网格及没有坐标的块；entry 没有坐标时为同名的全部块"""
+    if entry.cell is None:
+        for group in cells.values():
+            yield from group
+        return
+    x, y = entry.cell
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            yield from cells.get((x + dx, y + dy), ())
+    yield from cells.get(None, ())
+
+def is_match(a, b, node_a, node_b):
+    """
+    同一块中的两个节点是否为同一实体：来自不同数据源、距离足够近、关键属性不冲突；
+    人物、事件等重名常见，除名称外还要有一项相同的属性（见 shares_attribute）
+    """
+    if a.source == b.source:
+        return False
+    if a.point is not None and b.point is not None and distance_km(a.point, b.point) > MAX_DISTANCE_KM:
+        return False
+    props_a, props_b = node_a['properties'], node_b['properties']
+    if a.kind not in GEO_CATEGORIES and not shares_attribute(props_a, props_b):
+        return False
+    for key in CONFLICT_KEYS:
+        value_a, value_b = props_a.get(key), props_b.get(key)
+        if value_a not in (None, '') and value_b not in (None, '') and str(value_a) != str(value_b):
+            return False
+    return True
+
+def find_duplicates(nodes):
+    """
+    找出同一实体的节点
+
+    Returns:
+        (聚类列表, 比较次数)；每个聚类为按序号排列的节点序号列表，只包含两个以上节点的聚类
+    """
+    pairs = []
+    comparisons = 0
+    for cells in build_blocks(nodes).values():
+        for group in cells.values():
+            for entry in group:
+                for other in _candidates(cells, entry):
+                    # 每对只比较一次
+                    if other.index >= entry.index:
+                        continue
+                    comparisons += 1
+                    if is_match(entry, other, nodes[entry.index], nodes[other.index]):
+                        pairs.append((other.index, entry.index))
+
+    # 按序号顺序合并，拒绝的合并与块的遍历顺序无关
+    uf = UnionFind(len(nodes), [node['properties'].get('data_source') for node in nodes])
+    for i, j in sorted(pairs):
+        uf.union(i, j)
+    clusters = defaultdict(list)
+    for index in range(len(nodes)):
+        clusters[uf.find(index)].append(index)
+    return [members for members in clusters.values() if len(members) > 1], comparisons
+
+def merge_cluster(members):
+    """
+    合并一类节点，返回新的代表节点（不修改原节点）
+
+    代表节点沿用第一个节点的ID、uid和来源，标签取并集，缺少的属性由其余节点补齐；
+    其余节点的 uid、ID和来源记入 merged_from
+    """
+    first = members[0]
+    labels = list(first['labels'])
+    props = dict(first['properties'])
+    merged_from = list(first.get('merged_from', []))
+    for node in members[1:]:
+        labels.extend(label for label in node['labels'] if label not in labels)
+        for key, value in node['properties'].items():
+            if key not in PROVENANCE_KEYS and props.get(key) in (None, ''):
+                props[key] = value
+        merged_from.append({
+            'uid': node.get('uid'),
+            'id': node['id'],
+            'data_source': node['properties'].get('data_source')
+        })
+    return dict(first, labels=labels, properties=props, merged_from=merged_from)
+
+def apply_resolution(all_data, clusters):
+    """
+    用代表节点替换合并数据和各数据集中的节点，把关系两端（source/target 和 source_uid/target_uid）
+    改为代表节点的ID和 uid
+
+    数据集和关系按需复制，不修改解析结果本身（监视模式下解析结果会被再次合并）；
+    各数据集的 summary 重新计算，合并数据已有 summary 时连同类别列表一起重新计算
+
+    Returns:
+        被合并掉的节点数
+    """
+    combined = all_data['combined']
+    nodes = combined['nodes']
+    replace = {}
+    # 被合并节点的 uid -> 代表节点
+    uid_map = {}
+    for members in clusters:
+        representative = merge_cluster([nodes[i] for i in members])
+        for i in members:
+            replace[id(nodes[i])] = representative
+            uid = nodes[i].get('uid')
+            if uid is not None and uid != representative.get('uid'):
+                uid_map[uid] = representative
+
+    def resolve_nodes(items):
+        result = []
+        seen = set()
+        for node in items:
+            node = replace.get(id(node), node)
+            if id(node) not in seen:
+                seen.add(id(node))
+                result.append(node)
+        return result
+
+    def resolve_relationship(rel):
+        if rel.get('source_uid') not in uid_map and rel.get('target_uid') not in uid_map:
+            return rel
+        rel = dict(rel)
+        for side in ('source', 'target'):
+            representative = uid_map.get(rel.get(f'{side}_uid'))
+            if representative is not None:
+                rel[side] = representative['id']
+                rel[f'{side}_uid'] = representative.get('uid')
+        return rel
+
+    relationships = {}
+    for rel in combined['relationships']:
+        relationships[id(rel)] = resolve_relationship(rel)
+    combined['nodes'] = resolve_nodes(nodes)
+    combined['relationships'] = [relationships[id(rel)] for rel in combined['relationships']]
+    datasets = []
+    for dataset in all_data['datasets']:
+        dataset = dict(dataset,
+                       nodes=resolve_nodes(dataset['nodes']),
+                       relationships=[relationships.get(id(rel), rel) for rel in dataset['relationships']])
+        graph = KnowledgeGraph.from_nodes(dataset['nodes'], dataset['relationships'], dataset['dataset'])
+        dataset['summary'] = graph.summary()
+        datasets.append(dataset)
+    all_data['datasets'] = datasets
+    if 'summary' in combined:
+        graph = KnowledgeGraph.from_nodes(combined['nodes'], combined['relationships'])
+        for key, indexes in graph.categories(partial=True).items():
+            combined[key] = [combined['nodes'][i] for i in indexes]
+        combined['summary'] = graph.summary(partial=True)
+    return len(nodes) - len(combined['nodes'])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按ID哈希分桶的实体存储
+把全部节点按ID散列到固定数量的桶中，每个桶一个小文件（data/entities/<桶号>.json），
+详情页只需请求一个桶并按索引直接取出节点；前端对应的函数见 entity-store.js
+"""
+
+import json
+import os
+
+from content_hash import write_if_changed
+from json_writer import encode
+
+# 存储目录（相对于网站根目录）
+ENTITY_DIR = os.path.join('data', 'entities')
+# 桶数量，entity-store.js 中的 ENTITY_BUCKET_COUNT 必须与之相同
+BUCKET_COUNT = 256
+
+FNV_OFFSET = 0x811c9dc5
+FNV_PRIME = 0x01000193
+
+def fnv1a(key):
+    """
+    32位 FNV-1a 哈希
+
+    按 UTF-16 码元计算，与 JavaScript 中逐个 charCodeAt 的结果一致
+    """
+    h = FNV_OFFSET
+    data = key.encode('utf-16-le')
+    for i in range(0, len(data), 2):
+        h ^= data[i] | (data[i + 1] << 8)
+        h = (h * FNV_PRIME) & 0xffffffff
+    return h
+
+def bucket_of(key):
+    """键所在的桶号"""
+    return fnv1a(str(key)) % BUCKET_COUNT
+
+def bucket_file(bucket):
+    return f"{bucket:02x}.json"
+
+def entity_keys(node):
+    """节点的查找键：节点ID、与之不同的 properties.id，以及实体消解时并入该节点的原节点ID"""
+    keys = [str(node['id'])]
+    prop_id = node['properties'].get('id')
+    if prop_id is not None and str(prop_id) not in keys:
+        keys.append(str(prop_id))
+    for entry in node.get('merged_from', ()):
+        if str(entry['id']) not in keys:
+            keys.append(str(entry['id']))
+    return keys
+
+def build_entity_store(nodes):
+    """
+    把节点分配到桶中
+
+    每个桶为 {'bucket': 桶号, 'index': 键 -> 节点下标列表, 'entities': 节点列表}；
+    不同数据源的节点ID可能相同，因此一个键可以对应多个节点
+
+    Returns:
+        桶号 -> 桶内容，只包含非空的桶
+    """
+    buckets = {}
+    for node in nodes:
+        for key in entity_keys(node):
+            bucket = buckets.setdefault(bucket_of(key), {'index': {}, 'entities': [], 'positions': {}})
+            # 同一节点的多个键落在同一个桶时只保存一次
+            position = bucket['positions'].get(id(node))
+            if position is None:
+                position = bucket['positions'][id(node)] = len(bucket['entities'])
+                bucket['entities'].append(node)
+            bucket['index'].setdefault(key, []).append(position)
+
+    return {
+        number: {'bucket': number, 'index': bucket['index'], 'entities': bucket['entities']}
+        for number, bucket in sorted(buckets.items())
+    }
+
+def write_entity_store(nodes, base_dir):
+    """
+    写入全部桶，内容未变化的桶不重写，并删除已为空的旧桶
+
+    Returns:
+        (实际写入的桶数, 桶总数)
+    """
+    store_dir = os.path.join(base_dir, ENTITY_DIR)
+    os.makedirs(store_dir, exist_ok=True)
+    buckets = build_entity_store(nodes)
+
+    written = 0
+    names = set()
+    for number, bucket in buckets.items():
+        name = bucket_file(number)
+        names.add(name)
+        written += write_if_changed(os.path.join(store_dir, name), encode(bucket))
+
+    for name in os.listdir(store_dir):
+        if name.endswith('.json') and name not in names:
+            os.remove(os.path.join(store_dir, name))
+    return written, len(buckets)
+
+def lookup(base_dir, key):
+    """按键查找节点，返回匹配的节点列表"""
+    key = str(key)
+    path = os.path.join(base_dir, ENTITY_DIR, bucket_file(bucket_of(key)))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            bucket = json.load(f)
+    except OSError:
+        return []
+    return [bucket['entities'][i] for i in bucket['index'].get(key, [])]
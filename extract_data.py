@@ -5,156 +5,85 @@
 支持：花园口决堤、淝水之战、双堆集战争、全部数据
 """
 
-import re
-import json
 import os
-from collections import defaultdict
+from cypher_parser import parse_cypher_file, report_collisions
+from data_shards import SHARD_DIR, write_data
+from entity_store import ENTITY_DIR, write_entity_store
+from id_allocator import IdAllocator, report_duplicates
+from knowledge_graph import KnowledgeGraph
+from search_index import SEARCH_DIR, write_search_index
 
-def parse_cypher_file(file_path):
-    """解析 Cypher 文件，提取节点和关系"""
-    nodes = []
-    relationships = []
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 提取节点：CREATE (n1:人物:花园口 {name: "蒋介石", lat: 32.06004, lng: 118.79688})
-    node_pattern = r'CREATE\s+\((\w+):([^:]+)(?::([^:]+))?\s*\{([^}]+)\}\)'
-    
-    for match in re.finditer(node_pattern, content):
-        var_name = match.group(1)
-        label1 = match.group(2).strip()
-        label2 = match.group(3).strip() if match.group(3) else None
-        props_str = match.group(4)
-        
-        # 解析属性
-        props = {}
-        for prop_match in re.finditer(r'(\w+):\s*([^,}]+)', props_str):
-            key = prop_match.group(1).strip()
-            value = prop_match.group(2).strip().strip('"')
-            # 尝试转换为数字
-            try:
-                if '.' in value:
-                    props[key] = float(value)
-                else:
-                    props[key] = int(value)
-            except ValueError:
-                props[key] = value
-        
-        node = {
-            'id': var_name,
-            'labels': [label1] + ([label2] if label2 else []),
-            'properties': props
-        }
-        nodes.append(node)
-    
-    # 提取关系：MATCH (a:人物:花园口 {name: "蒋介石"}), (b:人物:花园口 {name: "陈果夫"}) CREATE (a)-[:建议]->(b);
-    rel_pattern = r'MATCH\s+\((\w+):[^:]+(?::[^:]+)?\s*\{([^}]+)\}\),\s*\((\w+):[^:]+(?::[^:]+)?\s*\{([^}]+)\}\)\s+CREATE\s+\(\1\)-\[:([^\]]+)\]->\(\3\)'
-    
-    for match in re.finditer(rel_pattern, content):
-        source_var = match.group(1)
-        source_props = match.group(2)
-        target_var = match.group(3)
-        target_props = match.group(4)
-        rel_type = match.group(5).strip()
-        
-        # 解析源节点属性（用于匹配）
-        source_match = {}
-        if 'name:' in source_props:
-            name_match = re.search(r'name:\s*"([^"]+)"', source_props)
-            if name_match:
-                source_match['name'] = name_match.group(1)
-        
-        # 解析目标节点属性（用于匹配）
-        target_match = {}
-        if 'name:' in target_props:
-            name_match = re.search(r'name:\s*"([^"]+)"', target_props)
-            if name_match:
-                target_match['name'] = name_match.group(1)
-        
-        rel = {
-            'source': source_match,
-            'target': target_match,
-            'type': rel_type,
-            'source_var': source_var,
-            'target_var': target_var
-        }
-        relationships.append(rel)
-    
-    return nodes, relationships
-
-def build_node_map(nodes):
-    """构建节点映射表，通过name查找节点"""
-    node_map = {}
-    for node in nodes:
-        if 'name' in node['properties']:
-            name = node['properties']['name']
-            if name not in node_map:
-                node_map[name] = []
-            node_map[name].append(node)
-    return node_map
+def resolve_relationships(graph, relationships, errors=None):
+    """
+    解析关系，将匹配条件替换为实际的节点ID
 
-def resolve_relationships(nodes, relationships):
-    """解析关系，将变量名替换为实际的节点ID"""
-    node_map = build_node_map(nodes)
+    每条关系至多生成一条边；找不到端点或匹配到多个节点的关系不会展开，
+    而是以 (原因, 关系) 的形式追加到 errors 中
+    """
     resolved_rels = []
     
     for rel in relationships:
-        source_name = rel['source'].get('name')
-        target_name = rel['target'].get('name')
+        source_nodes = graph.match(rel['source'], rel.get('source_labels', []), rel.get('source_var'))
+        target_nodes = graph.match(rel['target'], rel.get('target_labels', []), rel.get('target_var'))
         
-        if source_name and target_name:
-            source_nodes = node_map.get(source_name, [])
-            target_nodes = node_map.get(target_name, [])
-            
-            # 如果找到匹配的节点，创建关系
-            if source_nodes and target_nodes:
-                for source_node in source_nodes:
-                    for target_node in target_nodes:
-                        resolved_rels.append({
-                            'source': source_node['id'],
-                            'target': target_node['id'],
-                            'type': rel['type'],
-                            'source_name': source_name,
-                            'target_name': target_name
-                        })
+        if len(source_nodes) == 1 and len(target_nodes) == 1:
+            source, target = source_nodes[0], target_nodes[0]
+            resolved_rels.append({
+                'source': graph.node_ids[source],
+                'target': graph.node_ids[target],
+                'type': rel['type'],
+                'source_name': graph.node_props[source].get('name'),
+                'target_name': graph.node_props[target].get('name'),
+                'source_uid': graph.node_uids[source],
+                'target_uid': graph.node_uids[target]
+            })
+        elif errors is not None:
+            if not source_nodes or not target_nodes:
+                errors.append(('未找到端点', rel))
+            else:
+                errors.append(('匹配到多个节点', rel))
     
     return resolved_rels
 
-def extract_data_from_file(file_path, dataset_name):
-    """从文件中提取数据"""
+def report_unresolved(errors, limit=5):
+    """汇总打印未能解析的关系"""
+    if not errors:
+        return
+    print(f"  警告: {len(errors)} 条关系未能解析，已跳过")
+    for reason, rel in errors[:limit]:
+        print(f"    {reason}: {rel['source'] or rel.get('source_var')} -[{rel['type']}]-> {rel['target'] or rel.get('target_var')}")
+    if len(errors) > limit:
+        print(f"    ... 还有 {len(errors) - limit} 条")
+
+def extract_data_from_file(file_path, dataset_name, allocator):
+    """从文件中提取数据，节点编号由 allocator 按数据集分配"""
     print(f"正在处理: {file_path}")
     
     if not os.path.exists(file_path):
         print(f"文件不存在: {file_path}")
         return None
     
-    nodes, relationships = parse_cypher_file(file_path)
-    resolved_rels = resolve_relationships(nodes, relationships)
+    collisions = []
+    nodes, relationships = parse_cypher_file(file_path, collisions)
+    report_collisions(os.path.basename(file_path), collisions)
+    report_duplicates(dataset_name, allocator.assign(nodes, dataset_name))
+    graph = KnowledgeGraph.from_nodes(nodes, dataset=dataset_name)
+    errors = []
+    for rel in resolve_relationships(graph, relationships, errors):
+        graph.add_edge(rel)
+    report_unresolved(errors)
     
     # 分类节点
-    events = [n for n in nodes if '事件' in n['labels']]
-    persons = [n for n in nodes if '人物' in n['labels']]
-    locations = [n for n in nodes if '地点' in n['labels']]
-    times = [n for n in nodes if '时间' in n['labels']]
+    categories = graph.categories()
     
     data = {
         'dataset': dataset_name,
-        'summary': {
-            'total_nodes': len(nodes),
-            'total_relationships': len(resolved_rels),
-            'events': len(events),
-            'persons': len(persons),
-            'locations': len(locations),
-            'times': len(times)
-        },
+        'summary': graph.summary(),
         'nodes': nodes,
-        'relationships': resolved_rels,
-        'events': events,
-        'persons': persons,
-        'locations': locations,
-        'times': times
+        'relationships': graph.edges
     }
+    for key, indexes in categories.items():
+        data[key] = [nodes[i] for i in indexes]
     
     return data
 
@@ -206,9 +135,10 @@ def main():
         }
     }
     
-    # 处理每个数据集
+    # 处理每个数据集，节点编号跨数据集唯一，并在多次运行间保持不变
+    allocator = IdAllocator.load(os.path.join(base_dir, 'node_ids.json'))
     for dataset in datasets:
-        data = extract_data_from_file(dataset['file'], dataset['name'])
+        data = extract_data_from_file(dataset['file'], dataset['name'], allocator)
         if data:
             all_data['datasets'].append(data)
             
@@ -220,6 +150,8 @@ def main():
             all_data['combined']['locations'].extend(data['locations'])
             all_data['combined']['times'].extend(data['times'])
     
+    allocator.save()
+    
     # 计算合并后的统计
     all_data['combined']['summary'] = {
         'total_nodes': len(all_data['combined']['nodes']),
@@ -230,23 +162,19 @@ def main():
         'times': len(all_data['combined']['times'])
     }
     
-    # 保存为JSON文件
-    output_file = os.path.join(base_dir, 'data.json')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=2)
+    # 保存按数据集、类别拆分的分片
+    written, total = write_data(all_data, base_dir)
     
     print(f"\n数据提取完成！")
     print(f"共处理 {len(all_data['datasets'])} 个数据集")
     print(f"总计节点: {all_data['combined']['summary']['total_nodes']}")
     print(f"总计关系: {all_data['combined']['summary']['total_relationships']}")
-    print(f"数据已保存到: {output_file}")
-    
-    # 保存各个数据集的单独文件
-    for dataset in all_data['datasets']:
-        dataset_file = os.path.join(base_dir, f"data_{dataset['dataset']}.json")
-        with open(dataset_file, 'w', encoding='utf-8') as f:
-            json.dump(dataset, f, ensure_ascii=False, indent=2)
-        print(f"  - {dataset['dataset']}: {dataset_file}")
+    print(f"分片已保存到: {os.path.join(base_dir, SHARD_DIR)}（{total} 个分片）")
+    written, total = write_entity_store(all_data['combined']['nodes'], base_dir)
+    print(f"实体存储已保存到: {os.path.join(base_dir, ENTITY_DIR)}（{total} 个桶）")
+    # 检索索引与数据分片一起重建，避免页面检索到已不存在的节点
+    _, documents, terms = write_search_index(all_data, base_dir)
+    print(f"检索索引已保存到: {os.path.join(base_dir, SEARCH_DIR)}（{documents} 个文档，{terms} 个词项）")
 
 if __name__ == '__main__':
     main()
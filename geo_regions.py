@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按行政区边界判断坐标所属地区
+读取 six_cities_boundaries.geojson 等边界文件，先用外接矩形排除，再用射线法判断点是否在多边形内
+"""
+
+import json
+import os
+
+# 默认的地区边界文件（相对于网站根目录）
+REGION_FILE = 'six_cities_boundaries.geojson'
+
+class Region:
+    """一个地区：名称、外接矩形和多边形列表（每个多边形为 [外环, 内环...]，环为 [(lng, lat), ...]）"""
+
+    __slots__ = ('name', 'bbox', 'polygons')
+
+    def __init__(self, name, polygons):
+        self.name = name
+        self.polygons = polygons
+        points = [point for polygon in polygons for point in polygon[0]]
+        lngs = [p[0] for p in points]
+        lats = [p[1] for p in points]
+        self.bbox = (min(lngs), min(lats), max(lngs), max(lats))
+
+    def contains(self, lng, lat):
+        min_lng, min_lat, max_lng, max_lat = self.bbox
+        if not (min_lng <= lng <= max_lng and min_lat <= lat <= max_lat):
+            return False
+        for outer, *holes in self.polygons:
+            if _in_ring(outer, lng, lat) and not any(_in_ring(hole, lng, lat) for hole in holes):
+                return True
+        return False
+
+def _in_ring(ring, x, y):
+    """射线法：从点向右的水平射线与环的交点个数为奇数时点在环内"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+def load_regions(file_path):
+    """
+    读取边界文件中的地区，地区名取 properties.name
+
+    Returns:
+        Region 列表；文件不存在时返回空列表
+    """
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+
+    regions = []
+    for feature in geojson.get('features', []):
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+        polygons = [polygon for polygon in polygons if polygon and polygon[0]]
+        if polygons:
+            regions.append(Region(feature.get('properties', {}).get('name', ''), polygons))
+    return regions
+
+def coordinates(props):
+    """节点属性中的 (经度, 纬度)，缺失或无法转换时返回 None"""
+    lng = props.get('lng', props.get('经度'))
+    lat = props.get('lat', props.get('纬度'))
+    try:
+        return float(lng), float(lat)
+    except (TypeError, ValueError):
+        return None
+
+def region_of(regions, lng, lat):
+    """坐标所在地区的名称，不在任何地区内时返回 None"""
+    for region in regions:
+        if region.contains(lng, lat):
+            return region.name
+    return None
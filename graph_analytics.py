@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图分析结果 data/analytics.json
+按节点 uid 计算度数、PageRank、近似介数中心性和连通分量，并给出按指标排序的节点列表，
+页面（如人物页按影响力排序）直接读取，不必在浏览器中计算。
+关系按无向边处理（同一对节点之间的多条关系计为多重边），只计入两端都有 uid 的关系，与邻接索引相同。
+安装了 NumPy 和 SciPy 时用稀疏矩阵计算 PageRank 和连通分量，否则使用纯 Python 实现，结果相同
+
+文件：
+    nodes：指标名 -> 按 uid 排列的数组（没有节点的 uid 为 null）
+        degree 关系数，pagerank PageRank 值，betweenness 归一化的近似介数中心性，
+        component 所在连通分量的序号（按分量大小从大到小编号）
+    component_sizes：各连通分量的节点数
+    rankings：指标名 -> 排在前面的 uid；类别名（events、persons 等）-> 该类全部节点按 PageRank 排序的 uid
+
+用法：
+    python graph_analytics.py                    # 显示已生成结果中各指标排名靠前的节点
+    python graph_analytics.py --metric persons --top 20
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from collections import deque
+
+from adjacency import build_adjacency
+from content_hash import write_if_changed
+from data_shards import load_site_data
+from entity_resolution import entity_name
+from json_writer import encode
+from knowledge_graph import CATEGORIES
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse import csgraph
+except ImportError:
+    sparse = None
+
+# 设置输出编码为UTF-8
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 分析结果文件（相对于网站根目录）
+ANALYTICS_FILE = os.path.join('data', 'analytics.json')
+FORMAT_VERSION = 1
+
+# PageRank 的阻尼系数、收敛阈值（两次迭代之差的 L1 范数）和最大迭代次数
+DAMPING = 0.85
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 200
+
+# 近似介数中心性抽样的源节点数（节点数不超过它时为精确值）和随机种子，种子固定以保证结果可复现
+BETWEENNESS_SAMPLES = 200
+SEED = 0
+
+# rankings 中各指标保留的节点数
+RANKING_SIZE = 100
+# 写入文件的小数位数
+PRECISION = 8
+
+def undirected_edges(all_data):
+    """
+    两端都有 uid 的关系，按邻接索引的出边顺序
+
+    Returns:
+        (节点数, [(起点 uid, 终点 uid)])
+    """
+    node_count, _, sections = build_adjacency(all_data)
+    offsets, neighbors = sections['out_offsets'], sections['out_neighbors']
+    edges = [(u, neighbors[i]) for u in range(node_count) for i in range(offsets[u], offsets[u + 1])]
+    return node_count, edges
+
+def _neighbor_lists(node_count, edges):
+    """无向邻接表（保留多重边，去掉自环）"""
+    neighbors = [[] for _ in range(node_count)]
+    for source, target in edges:
+        if source != target:
+            neighbors[source].append(target)
+            neighbors[target].append(source)
+    return neighbors
+
+def _pagerank_python(present, weights):
+    """
+    幂迭代计算 PageRank；weights[u] 为 {邻居: 边数}，自环计两次。
+    没有关系的节点把自己的值平均分给全部节点
+    """
+    count = sum(present)
+    rank = [1.0 / count if p else 0.0 for p in present]
+    totals = [sum(w.values()) for w in weights]
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        dangling = sum(rank[u] for u in range(len(rank)) if present[u] and not totals[u])
+        base = (DAMPING * dangling + 1 - DAMPING) / count
+        new = [base if p else 0.0 for p in present]
+        for u, neighbors in enumerate(weights):
+            if totals[u]:
+                share = DAMPING * rank[u] / totals[u]
+                for v, weight in neighbors.items():
+                    new[v] += share * weight
+        change = sum(abs(a - b) for a, b in zip(new, rank))
+        rank = new
+        if change < TOLERANCE:
+            break
+    return rank, iteration
+
+def _pagerank_sparse(present, edges):
+    """与 _pagerank_python 相同的幂迭代，转移矩阵为 SciPy 稀疏矩阵"""
+    node_count = len(present)
+    mask = np.array(present, dtype=float)
+    count = mask.sum()
+    if edges:
+        sources, targets = np.array(edges, dtype=np.int64).T
+    else:
+        sources = targets = np.zeros(0, dtype=np.int64)
+    rows = np.concatenate([sources, targets])
+    cols = np.concatenate([targets, sources])
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(node_count, node_count))
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    dangling = (totals == 0) & (mask > 0)
+    scale = np.divide(1.0, totals, out=np.zeros(node_count), where=totals > 0)
+    # 转移矩阵的转置：new = DAMPING * M^T (rank / 度数) + 均匀分配的部分
+    transition = matrix.T.tocsr()
+    rank = mask / count
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        base = (DAMPING * rank[dangling].sum() + 1 - DAMPING) / count
+        new = DAMPING * transition.dot(rank * scale) + base * mask
+        change = np.abs(new - rank).sum()
+        rank = new
+        if change < TOLERANCE:
+            break
+    return rank.tolist(), iteration
+
+def pagerank(present, edges):
+    """
+    无向图的 PageRank
+
+    Returns:
+        (按 uid 排列的 PageRank 值, 迭代次数)
+    """
+    if sparse is not None:
+        return _pagerank_sparse(present, edges)
+    weights = [{} for _ in present]
+    for source, target in edges:
+        weights[source][target] = weights[source].get(target, 0) + 1
+        weights[target][source] = weights[target].get(source, 0) + 1
+    return _pagerank_python(present, weights)
+
+def approximate_betweenness(present, neighbors):
+    """
+    抽样源节点的 Brandes 算法计算介数中心性，按抽样比例放大后归一化到 [0, 1]
+
+    Returns:
+        (按 uid 排列的介数中心性, 抽样的源节点数)
+    """
+    nodes = [u for u, p in enumerate(present) if p]
+    count = len(nodes)
+    sources = nodes if count <= BETWEENNESS_SAMPLES else sorted(random.Random(SEED).sample(nodes, BETWEENNESS_SAMPLES))
+    # 邻接表去重：介数按最短路径计算，多重边不影响路径
+    simple = [sorted(set(adjacent)) for adjacent in neighbors]
+    centrality = [0.0] * len(present)
+    for source in sources:
+        order = []
+        predecessors = {source: []}
+        paths = {source: 1}
+        distance = {source: 0}
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            order.append(u)
+            for v in simple[u]:
+                if v not in distance:
+                    distance[v] = distance[u] + 1
+                    paths[v] = 0
+                    predecessors[v] = []
+                    queue.append(v)
+                if distance[v] == distance[u] + 1:
+                    paths[v] += paths[u]
+                    predecessors[v].append(u)
+        dependency = dict.fromkeys(order, 0.0)
+        for v in reversed(order):
+            for u in predecessors[v]:
+                dependency[u] += paths[u] / paths[v] * (1 + dependency[v])
+            if v != source:
+                centrality[v] += dependency[v]
+    # 无向图中每对节点被两个方向各计算一次，归一化分母 (n-1)(n-2) 已包含这个因子
+    scale = count / len(sources) / ((count - 1) * (count - 2)) if count > 2 and sources else 0.0
+    return [value * scale for value in centrality], len(sources)
+
+def connected_components(present, neighbors, edges):
+    """
+    无向连通分量
+
+    Returns:
+        (按 uid 排列的分量序号，没有节点的 uid 为 None, 各分量的节点数)；
+        分量按节点数从多到少、再按最小 uid 编号
+    """
+    node_count = len(present)
+    if sparse is not None:
+        rows = [s for s, _ in edges]
+        cols = [t for _, t in edges]
+        matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(node_count, node_count))
+        _, labels = csgraph.connected_components(matrix, directed=False)
+        labels = labels.tolist()
+    else:
+        labels = [None] * node_count
+        for start in range(node_count):
+            if labels[start] is not None:
+                continue
+            labels[start] = start
+            queue = deque([start])
+            while queue:
+                for v in neighbors[queue.popleft()]:
+                    if labels[v] is None:
+                        labels[v] = start
+                        queue.append(v)
+
+    members = {}
+    for u in range(node_count):
+        if present[u]:
+            members.setdefault(labels[u], []).append(u)
+    groups = sorted(members.values(), key=lambda group: (-len(group), group[0]))
+    component = [None] * node_count
+    for number, group in enumerate(groups):
+        for u in group:
+            component[u] = number
+    return component, [len(group) for group in groups]
+
+def _ranking(values, uids, limit=None):
+    ranked = sorted(uids, key=lambda u: (-values[u], u))
+    return ranked if limit is None else ranked[:limit]
+
+def build_analytics(all_data):
+    """计算各项指标和排序列表"""
+    node_count, edges = undirected_edges(all_data)
+    nodes = [node for node in all_data['combined']['nodes'] if node.get('uid') is not None]
+    present = [False] * node_count
+    for node in nodes:
+        present[node['uid']] = True
+    neighbors = _neighbor_lists(node_count, edges)
+
+    degree = [0] * node_count
+    for source, target in edges:
+        degree[source] += 1
+        degree[target] += 1
+    if any(present):
+        ranks, iterations = pagerank(present, edges)
+    else:
+        ranks, iterations = [], 0
+    betweenness, samples = approximate_betweenness(present, neighbors)
+    component, sizes = connected_components(present, neighbors, edges)
+
+    uids = [u for u in range(node_count) if present[u]]
+    metrics = {
+        'degree': degree,
+        'pagerank': [round(value, PRECISION) for value in ranks],
+        'betweenness': [round(value, PRECISION) for value in betweenness],
+        'component': component
+    }
+    rankings = {name: _ranking(metrics[name], uids, RANKING_SIZE) for name in ('degree', 'pagerank', 'betweenness')}
+    for key, label in CATEGORIES.items():
+        members = sorted({node['uid'] for node in nodes if any(label in l for l in node['labels'])})
+        rankings[key] = _ranking(metrics['pagerank'], members)
+
+    return {
+        'version': FORMAT_VERSION,
+        'data_version': all_data.get('metadata', {}).get('data_version'),
+        'node_count': node_count,
+        'edge_count': len(edges),
+        'pagerank': {'damping': DAMPING, 'iterations': iterations},
+        'betweenness': {'samples': samples, 'exact': samples == len(uids)},
+        'nodes': {name: [values[u] if present[u] else None for u in range(node_count)]
+                  for name, values in metrics.items()},
+        'component_sizes': sizes,
+        'rankings': rankings
+    }
+
+def analytics_inputs(all_data):
+    """分析结果依赖的全部输入：无向边和各节点的标签，两次构建的输入相同时结果也相同"""
+    _, edges = undirected_edges(all_data)
+    nodes = sorted((node['uid'], node['labels']) for node in all_data['combined']['nodes'] if node.get('uid') is not None)
+    return edges, nodes
+
+def write_analytics(all_data, base_dir, analytics=None):
+    """
+    写入分析结果，内容未变化时不重写
+
+    Args:
+        analytics: 已计算的分析结果（build_analytics 的结果），默认重新计算；数据版本号总是取自 all_data
+
+    Returns:
+        (是否写入, 分析结果)
+    """
+    analytics = dict(analytics or build_analytics(all_data), data_version=all_data.get('metadata', {}).get('data_version'))
+    file_path = os.path.join(base_dir, ANALYTICS_FILE)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return write_if_changed(file_path, encode(analytics)), analytics
+
+def load_analytics(base_dir):
+    """读取网站目录中的分析结果，文件不存在时返回 None"""
+    try:
+        with open(os.path.join(base_dir, ANALYTICS_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+def node_metrics(analytics, uid):
+    """节点的各项指标：{指标名: 值}，uid 不在结果中时返回 None"""
+    if not 0 <= uid < analytics['node_count'] or analytics['nodes']['degree'][uid] is None:
+        return None
+    return {name: values[uid] for name, values in analytics['nodes'].items()}
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='显示图分析结果中排名靠前的节点')
+    parser.add_argument('--metric', help='指标（degree、pagerank、betweenness）或类别（persons 等），默认显示全部指标')
+    parser.add_argument('--top', type=int, default=10, help='显示的节点数（默认 10）')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    analytics = load_analytics(base_dir)
+    if analytics is None:
+        print("尚未生成图分析结果，请先运行 organize_data.py")
+        sys.exit(1)
+    rankings = analytics['rankings']
+    if args.metric and args.metric not in rankings:
+        print(f"未知的指标: {args.metric}（可选: {', '.join(rankings)}）")
+        sys.exit(1)
+
+    names = {node.get('uid'): entity_name(node['properties'])
+             for node in load_site_data(base_dir)['combined']['nodes']}
+    sizes = analytics['component_sizes']
+    print(f"{analytics['node_count']} 个节点编号，{analytics['edge_count']} 条关系，"
+          f"{len(sizes)} 个连通分量（最大 {sizes[0] if sizes else 0} 个节点）")
+    for metric in [args.metric] if args.metric else ('degree', 'pagerank', 'betweenness', 'persons'):
+        column = analytics['nodes']['pagerank' if metric in CATEGORIES else metric]
+        print(f"\n{metric}:")
+        for uid in rankings[metric][:args.top]:
+            print(f"  {column[uid]:>12}  uid={uid}  {names.get(uid) or ''}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全局节点编号分配
+为每个 (作用域, 原始ID) 分配稠密的整数编号，并持久化到映射文件，
+多次运行之间同一节点的编号保持不变
+"""
+
+from content_hash import load_state, save_state
+
+# 映射文件格式版本
+ID_MAP_VERSION = 1
+
+class IdAllocator:
+    """
+    整数编号分配器
+
+    作用域一般是数据集名或CSV文件名，同一作用域内原始ID唯一即可；
+    已分配的编号不会回收，新节点从当前最大编号之后继续分配
+    """
+
+    __slots__ = ('file_path', 'scopes', 'next_id', 'changed')
+
+    def __init__(self, file_path=None, scopes=None, next_id=0):
+        self.file_path = file_path
+        self.scopes = scopes if scopes is not None else {}
+        self.next_id = next_id
+        self.changed = False
+
+    @classmethod
+    def load(cls, file_path):
+        """读取映射文件，不存在或版本不符时从零开始"""
+        state = load_state(file_path)
+        if state.get('version') != ID_MAP_VERSION:
+            return cls(file_path)
+        scopes = state.get('scopes', {})
+        next_id = max((uid + 1 for ids in scopes.values() for uid in ids.values()), default=0)
+        return cls(file_path, scopes, next_id)
+
+    def save(self):
+        """有新分配的编号时写回映射文件"""
+        if self.changed and self.file_path:
+            save_state(self.file_path, {'version': ID_MAP_VERSION, 'scopes': self.scopes})
+            self.changed = False
+
+    def allocate(self, scope, key):
+        """返回 (作用域, 原始ID) 的编号，首次出现时分配新编号"""
+        ids = self.scopes.setdefault(scope, {})
+        uid = ids.get(key)
+        if uid is None:
+            uid = ids[key] = self.next_id
+            self.next_id += 1
+            self.changed = True
+        return uid
+
+    def lookup(self, scope, key):
+        """返回已分配的编号，没有时返回 None"""
+        return self.scopes.get(scope, {}).get(key)
+
+    def assign(self, nodes, scope):
+        """
+        为节点记录添加 uid 字段，原始ID保留在 id 字段中
+
+        同一批节点中ID重复、标签和属性也相同的记录是同一节点，使用同一编号；
+        标签或属性不同的改为 原始ID#序号（从 2 开始）后各自分配编号，按ID连接的关系仍指向第一个节点
+
+        Returns:
+            [(原始ID, 新ID)]：被改名的重复节点
+        """
+        seen = {}
+        duplicates = []
+        for node in nodes:
+            key = node['id']
+            first = seen.get(key)
+            if first is not None and (first['labels'] != node['labels'] or first['properties'] != node['properties']):
+                number = 2
+                while f"{key}#{number}" in seen:
+                    number += 1
+                node['id'] = f"{key}#{number}"
+                duplicates.append((key, node['id']))
+            seen.setdefault(node['id'], node)
+            node['uid'] = self.allocate(scope, node['id'])
+        return duplicates
+
+def report_duplicates(scope, duplicates, limit=5):
+    """汇总打印 assign 改名的重复ID"""
+    if not duplicates:
+        return
+    print(f"  警告: {scope} 中有 {len(duplicates)} 个节点的ID与前面的节点重复，已按 ID#序号 区分")
+    for key, node_id in duplicates[:limit]:
+        print(f"    {key} -> {node_id}")
+    if len(duplicates) > limit:
+        print(f"    ... 还有 {len(duplicates) - limit} 个")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 JSON 写入
+记录分批编码后直接写入临时文件，编码后的文本只在内存中保留一批；
+记录本身仍由调用方整体持有，占用的内存与数据总量成正比。安装了 orjson 时用它编码，否则使用标准库 json；
+两者的输出逐字节相同（浮点数按标准库的写法，NaN 和无穷大写成 null），内容哈希不受是否安装 orjson 影响
+"""
+
+import filecmp
+import json
+import math
+import os
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 每批编码的记录数
+BATCH_SIZE = 1000
+
+# orjson 的浮点数写法与标准库不同（1e16 / 1e+16，0.00001 / 1e-05），输出中可能含这类数字时逐个改写
+_FLOAT_HINT = re.compile(rb'\d[eE]|0\.0000')
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?')
+
+def _float_repr(match):
+    token = match.group()
+    if token[:1] == b'"' or not any(c in token for c in b'.eE'):
+        return token
+    return repr(float(token)).encode('ascii')
+
+def _finite(value):
+    """把 NaN 和无穷大换成 None，与 orjson 的输出一致"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+def _dumps(value, pretty):
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, indent=2, allow_nan=False)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+def encode(value, pretty=False):
+    """
+    把值编码为 UTF-8 字节串
+
+    默认紧凑输出（不缩进、不留空格），pretty 为 True 时缩进两格；
+    orjson 无法编码的值（如超出64位的整数）退回标准库。无论用哪种编码，结果都相同
+    """
+    if orjson is not None:
+        try:
+            data = orjson.dumps(value, option=orjson.OPT_INDENT_2 if pretty else 0)
+        except TypeError:
+            pass
+        else:
+            return _TOKEN.sub(_float_repr, data) if _FLOAT_HINT.search(data) else data
+    try:
+        text = _dumps(value, pretty)
+    except ValueError:
+        text = _dumps(_finite(value), pretty)
+    return text.encode('utf-8')
+
+def encode_items(items, pretty=False):
+    """把一组记录编码为数组内部的字节串（不含方括号），整批一起编码"""
+    if not items:
+        return b''
+    body = encode(list(items), pretty)
+    # 去掉外层的 [ ]，保留元素之间的分隔
+    return body[1:-1].strip()
+
+def encode_batches(items, pretty=False, batch_size=BATCH_SIZE):
+    """按批生成数组元素的字节串，批与批之间需以逗号连接"""
+    for start in range(0, len(items), batch_size):
+        yield encode_items(items[start:start + batch_size], pretty)
+
+def replace_if_changed(tmp_path, file_path):
+    """用临时文件替换目标文件；内容相同时删除临时文件，返回是否替换"""
+    if os.path.exists(file_path) and filecmp.cmp(tmp_path, file_path, shallow=False):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, file_path)
+    return True
+
+class JsonStreamWriter:
+    """
+    把 JSON 对象逐个成员写入文件
+
+    先写入临时文件，关闭时与已有文件比较，内容相同则丢弃临时文件，
+    因此未变化的输出不会被重写；changed 记录是否实际写入
+
+    用法：
+        with JsonStreamWriter(path) as w:
+            w.member('schema_version', 2)
+            w.begin_array('nodes')
+            w.items(nodes)
+            w.end_array()
+    """
+
+    def __init__(self, file_path, pretty=False):
+        self.file_path = file_path
+        self.tmp_path = file_path + '.tmp'
+        self.pretty = pretty
+        self.changed = False
+        self.bytes = 0
+        self._f = None
+        self._first_member = True
+        self._first_item = True
+
+    def __enter__(self):
+        self._f = open(self.tmp_path, 'wb')
+        self._write(b'{')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._f.close()
+            os.remove(self.tmp_path)
+            return False
+        self._write(b'}')
+        self._f.close()
+        self.changed = replace_if_changed(self.tmp_path, self.file_path)
+        return False
+
+    def _write(self, data):
+        self._f.write(data)
+        self.bytes += len(data)
+
+    def _key(self, key):
+        if not self._first_member:
+            self._write(b',\n' if self.pretty else b',')
+        self._first_member = False
+        self._write(encode(key) + b':')
+
+    def member(self, key, value):
+        """写入一个成员"""
+        self._key(key)
+        self._write(encode(value, self.pretty))
+
+    def raw_member(self, key, data):
+        """写入一个已编码的成员值"""
+        self._key(key)
+        self._write(data)
+
+    def begin_array(self, key):
+        self._key(key)
+        self._write(b'[')
+        self._first_item = True
+
+    def raw_items(self, data):
+        """追加已编码的数组元素（encode_items 的结果）"""
+        if not data:
+            return
+        if not self._first_item:
+            self._write(b',\n' if self.pretty else b',')
+        self._first_item = False
+        self._write(data)
+
+    def items(self, items):
+        """分批编码并追加数组元素"""
+        for data in encode_batches(items, self.pretty):
+            self.raw_items(data)
+
+    def end_array(self):
+        self._write(b']')
+
+def write_parts(file_path, parts):
+    """把若干字节串依次写入文件，内容未变化时不重写，返回是否写入"""
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for data in parts:
+            f.write(data)
+    return replace_if_changed(tmp_path, file_path)
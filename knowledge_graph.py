@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存中的知识图谱模型
+节点和边按列存储，添加时一次性建立标签、数据集、ID、name 索引，
+供 extract_data、organize_data、check_data 等脚本共用
+"""
+
+# 统计中的节点类别：类别 -> 标签
+CATEGORIES = {
+    'events': '事件',
+    'persons': '人物',
+    'locations': '地点',
+    'times': '时间'
+}
+
+class KnowledgeGraph:
+    """
+    知识图谱
+
+    节点 i 的信息分别存放在 node_ids[i]、node_uids[i]、node_labels[i]、node_props[i]、node_datasets[i]；
+    相同的标签组合共用同一个元组。边保存原始记录，并记录两端节点的序号（无法解析时为 -1）。
+    节点带有全局编号（uid，见 id_allocator）时，按编号查找只需数组下标
+    """
+
+    __slots__ = (
+        'node_ids', 'node_uids', 'node_labels', 'node_props', 'node_datasets',
+        'edges', 'edge_sources', 'edge_targets',
+        '_id_index', '_uid_index', '_label_index', '_dataset_index', '_name_index', '_label_sets'
+    )
+
+    def __init__(self):
+        self.node_ids = []
+        self.node_uids = []
+        self.node_labels = []
+        self.node_props = []
+        self.node_datasets = []
+        self.edges = []
+        self.edge_sources = []
+        self.edge_targets = []
+        self._id_index = {}
+        self._uid_index = []
+        self._label_index = {}
+        self._dataset_index = {}
+        self._name_index = {}
+        self._label_sets = {}
+
+    @classmethod
+    def from_nodes(cls, nodes, relationships=(), dataset=None):
+        """由节点、关系记录列表构建图"""
+        graph = cls()
+        graph.add_nodes(nodes, dataset)
+        for rel in relationships:
+            graph.add_edge(rel)
+        return graph
+
+    @classmethod
+    def from_data(cls, data):
+        """由 data.json 的内容构建合并后的图，节点带上所属数据集"""
+        graph = cls()
+        dataset_of = {}
+        for ds in data.get('datasets', []):
+            for node in ds.get('nodes', []):
+                dataset_of[node['id']] = ds['dataset']
+        combined = data.get('combined', {})
+        for node in combined.get('nodes', []):
+            graph.add_node(node, dataset_of.get(node['id']))
+        for rel in combined.get('relationships', []):
+            graph.add_edge(rel)
+        return graph
+
+    # ---- 构建 ----
+
+    def add_node(self, node, dataset=None):
+        """添加节点记录（{'id', 'labels', 'properties'}），返回节点序号"""
+        index = len(self.node_ids)
+        labels = tuple(node['labels'])
+        labels = self._label_sets.setdefault(labels, labels)
+        props = node['properties']
+
+        self.node_ids.append(node['id'])
+        self.node_labels.append(labels)
+        uid = node.get('uid')
+        self.node_uids.append(uid)
+        if uid is not None:
+            if uid >= len(self._uid_index):
+                self._uid_index.extend([-1] * (uid + 1 - len(self._uid_index)))
+            if self._uid_index[uid] < 0:
+                self._uid_index[uid] = index
+        self.node_props.append(props)
+        self.node_datasets.append(dataset)
+
+        self._id_index.setdefault(node['id'], index)
+        for label in labels:
+            self._label_index.setdefault(label, []).append(index)
+        self._dataset_index.setdefault(dataset, []).append(index)
+        name = props.get('name')
+        if name is not None:
+            self._name_index.setdefault(name, []).append(index)
+        return index
+
+    def add_nodes(self, nodes, dataset=None):
+        for node in nodes:
+            self.add_node(node, dataset)
+
+    def add_edge(self, rel):
+        """添加关系记录；优先按 source_uid/target_uid，其次按节点ID记录两端序号"""
+        self.edges.append(rel)
+        self.edge_sources.append(self._endpoint(rel.get('source_uid'), rel.get('source')))
+        self.edge_targets.append(self._endpoint(rel.get('target_uid'), rel.get('target')))
+
+    def _endpoint(self, uid, node_id):
+        if uid is not None:
+            return self.index_of_uid(uid)
+        if isinstance(node_id, dict):
+            return -1
+        return self._id_index.get(node_id, -1)
+
+    # ---- 查询 ----
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def index_of(self, node_id):
+        """节点ID -> 序号，不存在时返回 None"""
+        return self._id_index.get(node_id)
+
+    def index_of_uid(self, uid):
+        """全局编号 -> 序号，不存在时返回 -1"""
+        return self._uid_index[uid] if 0 <= uid < len(self._uid_index) else -1
+
+    def node(self, index):
+        """序号 -> 节点记录"""
+        node = {
+            'id': self.node_ids[index],
+            'labels': list(self.node_labels[index]),
+            'properties': self.node_props[index]
+        }
+        if self.node_uids[index] is not None:
+            node['uid'] = self.node_uids[index]
+        return node
+
+    def node_by_id(self, node_id):
+        index = self._id_index.get(node_id)
+        return None if index is None else self.node(index)
+
+    def nodes_by_name(self, name):
+        """name 属性等于 name 的节点序号"""
+        return self._name_index.get(name, [])
+
+    def find(self, name, labels=(), dataset=None, props=None):
+        """按 name 查找，并核对标签（全部包含）、数据集和其余属性，返回节点序号列表"""
+        return [
+            i for i in self._name_index.get(name, [])
+            if (dataset is None or self.node_datasets[i] == dataset)
+            and all(label in self.node_labels[i] for label in labels)
+            and (not props or all(self.node_props[i].get(k) == v for k, v in props.items()))
+        ]
+
+    def match(self, match_props, labels=(), var=None, dataset=None):
+        """
+        查找 Cypher 关系端点，返回匹配的节点序号列表
+
+        MATCH 中没有给出属性时，变量名即为 CREATE 时的节点ID；
+        否则按 name 索引取候选，再核对标签和其余属性
+        """
+        if not match_props:
+            index = self._id_index.get(var)
+            if index is None or (dataset is not None and self.node_datasets[index] != dataset):
+                return []
+            return [index]
+        return self.find(match_props.get('name'), labels, dataset, match_props)
+
+    def labels(self):
+        """所有出现过的标签"""
+        return list(self._label_index)
+
+    def with_label(self, label, partial=False):
+        """
+        带有某标签的节点序号，按添加顺序排列
+
+        partial 为 True 时匹配包含该关键字的所有标签（如 '人物' 匹配 '人物'、'历史人物'），
+        只需遍历不同的标签，而不是全部节点
+        """
+        if not partial:
+            return self._label_index.get(label, [])
+        matched = [indexes for name, indexes in self._label_index.items() if label in name]
+        if len(matched) == 1:
+            return matched[0]
+        return sorted(set().union(*matched))
+
+    def label_counts(self):
+        """标签 -> 带有该标签的节点数量"""
+        return {label: len(indexes) for label, indexes in self._label_index.items()}
+
+    def edge_type_counts(self):
+        """关系类型 -> 关系数量"""
+        counts = {}
+        for rel in self.edges:
+            rel_type = rel.get('type', '')
+            counts[rel_type] = counts.get(rel_type, 0) + 1
+        return counts
+
+    def in_dataset(self, dataset):
+        """属于某数据集的节点序号"""
+        return self._dataset_index.get(dataset, [])
+
+    def nodes(self, indexes=None):
+        """节点记录列表，默认全部"""
+        if indexes is None:
+            indexes = range(len(self.node_ids))
+        return [self.node(i) for i in indexes]
+
+    def categories(self, partial=False):
+        """类别 -> 节点序号列表"""
+        return {key: self.with_label(label, partial) for key, label in CATEGORIES.items()}
+
+    def summary(self, partial=False):
+        """节点、关系数量及各类别数量"""
+        summary = {
+            'total_nodes': len(self.node_ids),
+            'total_relationships': len(self.edges)
+        }
+        for key, indexes in self.categories(partial).items():
+            summary[key] = len(indexes)
+        return summary
@@ -576,8 +576,7 @@ function drawRegionLabels() {
 // 加载数据
 async function loadData() {
     try {
-        const response = await fetch('data.json');
-        const data = await response.json();
+        const data = await fetchShardedData(['events']);
         
         if (!data || !data.combined) {
             console.error('数据格式错误');
@@ -794,7 +793,7 @@ async function loadBoundaries() {
         const filePath = mergedFile.startsWith('/') ? mergedFile : './' + mergedFile;
         console.log(`正在加载合并边界文件: ${filePath}`);
         
-        const res = await fetch(filePath);
+        const res = await fetchAsset(filePath);
         if (!res.ok) {
             console.error(`加载边界文件失败: HTTP ${res.status}, URL: ${res.url || filePath}`);
             throw new Error(`无法加载边界文件: ${res.status}`);
@@ -1423,7 +1422,7 @@ async function loadCityBoundaries(cityKey) {
         try {
             const filePath = targetCity.file.startsWith('/') ? targetCity.file : './' + targetCity.file;
             console.log(`正在加载${cityKey}的详细边界文件: ${filePath}`);
-            const res = await fetch(filePath);
+            const res = await fetchAsset(filePath);
             if (!res.ok) {
                 console.error(`加载${cityKey}边界失败: HTTP ${res.status}`);
                 return;
@@ -1783,7 +1782,7 @@ async function loadCityBoundaries_OLD(cityKey) {
         if (!targetCity) return;
         
         try {
-            const res = await fetch(targetCity.file);
+            const res = await fetchAsset(targetCity.file);
             if (!res.ok) return;
             const gj = await res.json();
             
@@ -2061,7 +2060,7 @@ async function loadCityBoundaries_OLD(cityKey) {
         if (!targetCity) return;
         
         try {
-            const res = await fetch(targetCity.file);
+            const res = await fetchAsset(targetCity.file);
             if (!res.ok) return;
             const gj = await res.json();
             
@@ -2339,7 +2338,7 @@ async function loadCityBoundaries_OLD(cityKey) {
         if (!targetCity) return;
         
         try {
-            const res = await fetch(targetCity.file);
+            const res = await fetchAsset(targetCity.file);
             if (!res.ok) return;
             const gj = await res.json();
             
@@ -2554,7 +2553,7 @@ async function loadCityBoundaries(cityKey) {
         if (!targetCity) return;
         
         try {
-            const res = await fetch(targetCity.file);
+            const res = await fetchAsset(targetCity.file);
             if (!res.ok) return;
             const gj = await res.json();
             
@@ -2848,7 +2847,7 @@ async function loadCityBoundaries(cityKey) {
         if (!targetCity) return;
         
         try {
-            const res = await fetch(targetCity.file);
+            const res = await fetchAsset(targetCity.file);
             if (!res.ok) return;
             const gj = await res.json();
             
@@ -83,8 +83,7 @@ function calculateRegionStats() {
 // 加载数据
 async function loadData() {
     try {
-        const response = await fetch('data.json');
-        const data = await response.json();
+        const data = await fetchShardedData(['events']);
         
         if (!data || !data.combined) {
             console.error('数据格式错误');
@@ -230,7 +229,7 @@ async function loadAndRegisterMap() {
         const file = cityFiles[currentCity];
         if (!file) return;
         
-        const response = await fetch(file);
+        const response = await fetchAsset(file);
         if (!response.ok) {
             console.error('加载地图数据失败');
             return;
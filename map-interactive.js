@@ -53,7 +53,7 @@ async function loadBoundaries() {
     try {
         const results = await Promise.all(
             cityFiles.map(async ({ key, file }) => {
-                const res = await fetch(file);
+                const res = await fetchAsset(file);
                 if (!res.ok) throw new Error(`${file} 加载失败`);
                 const gj = await res.json();
                 return { key, gj };
@@ -164,8 +164,7 @@ async function initMap() {
 // 加载并显示数据
 async function loadAndDisplayData() {
     try {
-        const response = await fetch('data.json');
-        currentData = await response.json();
+        currentData = await fetchShardedData();
         
         if (!currentData || !currentData.combined) {
             console.error('数据格式错误');
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Neo4j JSON 导出文件的流式读取
+自动识别导出格式（路径行、n/r/m 行、APOC JSONL），逐条生成节点和关系，
+整个文件不需要一次性载入内存
+"""
+
+import json
+import sys
+
+# 每次读取的字符数
+CHUNK_SIZE = 1 << 16
+# 解析错误位于缓冲区末尾这么多个字符以内时，视为元素被块边界截断（最长的未读完记号为 -Infinity）
+TRUNCATED_TAIL = 9
+
+# 已注册的导出格式：名称 -> {'container': 'array' 或 'lines', 'detect': 函数, 'records': 函数}
+FORMAT_ADAPTERS = {}
+
+def register_format(name, container, detect):
+    """
+    注册一种导出格式
+
+    Args:
+        name: 格式名
+        container: 'array'（顶层为 JSON 数组）或 'lines'（JSONL）
+        detect: 接收第一条记录，返回是否属于该格式
+
+    被装饰的函数接收一条记录，生成
+    ('node', identity, labels, properties) 或
+    ('relationship', start, end, type, properties)
+    """
+    def decorator(records):
+        FORMAT_ADAPTERS[name] = {
+            'container': container,
+            'detect': detect,
+            'records': records
+        }
+        return records
+    return decorator
+
+# ---- 增量读取 ----
+
+def _truncated(error, buf):
+    """解析错误是否可能由缓冲区末尾的截断引起：错误位于末尾，或字符串一直延续到末尾"""
+    return error.pos >= len(buf) - TRUNCATED_TAIL or error.msg.startswith('Unterminated string')
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    逐个生成顶层 JSON 数组中的元素，内存中只保留当前元素和一个读取块
+
+    元素不完整时只在解析错误位于缓冲区末尾时补读，其余错误立即报告（带字符偏移），
+    不会因一个损坏的元素把文件剩余部分都读入内存
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    # buf 之前已丢弃的字符数，用于报告错误位置
+    offset = 0
+    # 开头的空白可能跨越多个读取块
+    while buf and buf.isspace():
+        offset += len(buf)
+        buf = f.read(chunk_size)
+    offset += len(buf) - len(buf.lstrip())
+    buf = buf.lstrip()
+    eof = not buf
+    if not buf.startswith('['):
+        raise ValueError("不是 JSON 数组")
+    pos = 1
+
+    while True:
+        # 跳过空白和逗号
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = f.read(chunk_size)
+            offset += len(buf)
+            buf = chunk
+            pos = 0
+            eof = not chunk
+
+        if pos >= len(buf):
+            raise ValueError("JSON 数组未闭合")
+        if buf[pos] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            if eof or not _truncated(e, buf):
+                raise ValueError(f"无法解析的 JSON 元素（第 {offset + e.pos} 个字符）: {e.msg}: "
+                                 f"{buf[pos:pos + 30]!r}") from None
+            end = None
+        # 元素被块边界截断（或数字可能未读完，如 "-0" 之后还有 ".5e3"），补读后重试
+        if end is None or (not eof and (end == len(buf) or end > len(buf) - TRUNCATED_TAIL and _is_number(item))):
+            chunk = f.read(chunk_size)
+            offset += pos
+            buf = buf[pos:] + chunk
+            pos = 0
+            eof = not chunk
+            continue
+
+        pos = end
+        yield item
+
+def iter_json_lines(f):
+    """逐行生成 JSONL 中的对象"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def open_export(file_path):
+    """打开导出文件，返回 (容器类型, 记录迭代器)"""
+    f = open(file_path, 'r', encoding='utf-8-sig')
+    head = f.read(1)
+    while head and head.isspace():
+        head = f.read(1)
+    f.seek(0)
+
+    def records():
+        with f:
+            if head == '[':
+                yield from iter_json_array(f)
+            else:
+                yield from iter_json_lines(f)
+
+    return ('array' if head == '[' else 'lines'), records()
+
+# ---- 格式识别 ----
+
+def detect_format(file_path):
+    """根据第一条记录识别导出格式，返回格式名"""
+    container, records = open_export(file_path)
+    first = next(records, None)
+    records.close()
+    if first is None:
+        return None
+    for name, adapter in FORMAT_ADAPTERS.items():
+        if adapter['container'] == container and adapter['detect'](first):
+            return name
+    raise ValueError(f"无法识别的 Neo4j 导出格式: {file_path}")
+
+def iter_export(file_path, format_name=None):
+    """逐条生成导出文件中的节点和关系"""
+    if format_name is None:
+        format_name = detect_format(file_path)
+    if format_name is None:
+        return
+    adapter = FORMAT_ADAPTERS[format_name]
+    _, records = open_export(file_path)
+    for record in records:
+        yield from adapter['records'](record)
+
+def identity(value):
+    """Neo4j 标识，兼容驱动导出的 {low, high} 形式"""
+    if isinstance(value, dict) and 'low' in value:
+        return value['low'] + (value.get('high', 0) << 32)
+    return value
+
+def is_node(value):
+    return isinstance(value, dict) and 'identity' in value and 'labels' in value
+
+def is_relationship(value):
+    return isinstance(value, dict) and 'type' in value and 'start' in value and 'end' in value
+
+def intern_properties(props):
+    """
+    驻留属性键
+
+    每条记录单独解析，相同的键在每条记录中都是新的字符串对象，驻留后所有记录共用一份
+    """
+    return {sys.intern(key): value for key, value in props.items()}
+
+def intern_labels(labels):
+    return [sys.intern(label) for label in labels]
+
+def node_record(node):
+    return ('node', identity(node['identity']), intern_labels(node.get('labels', [])),
+            intern_properties(node.get('properties', {})))
+
+def relationship_record(rel, start=None, end=None):
+    """关系记录；关系自身带 start/end 时以其为准，否则使用路径段的端点"""
+    if 'start' in rel and 'end' in rel:
+        start, end = rel['start'], rel['end']
+    return ('relationship', identity(start), identity(end), sys.intern(rel.get('type', '')),
+            intern_properties(rel.get('properties', {})))
+
+# ---- 已支持的格式 ----
+
+def detect_path(record):
+    return any(isinstance(v, dict) and 'segments' in v for v in record.values())
+
+@register_format('path', 'array', detect_path)
+def path_records(record):
+    """Neo4j Browser 导出的路径行：[{"p": {"start", "end", "segments"}}]"""
+    for path in record.values():
+        if not isinstance(path, dict) or 'segments' not in path:
+            continue
+        yield node_record(path['start'])
+        yield node_record(path['end'])
+        for segment in path['segments']:
+            start = segment.get('start', path['start'])
+            end = segment.get('end', path['end'])
+            yield node_record(start)
+            yield node_record(end)
+            yield relationship_record(segment['relationship'], start['identity'], end['identity'])
+
+def detect_rows(record):
+    return any(is_node(v) or is_relationship(v) for v in record.values())
+
+@register_format('rows', 'array', detect_rows)
+def row_records(record):
+    """Neo4j Browser 导出的节点/关系行：[{"n": 节点, "r": 关系, "m": 节点}]"""
+    values = list(record.values())
+    for value in values:
+        if is_node(value):
+            yield node_record(value)
+    for value in values:
+        if is_relationship(value):
+            yield relationship_record(value)
+
+def detect_apoc(record):
+    return record.get('type') in ('node', 'relationship') and 'id' in record
+
+@register_format('apoc', 'lines', detect_apoc)
+def apoc_records(record):
+    """apoc.export.json 的 JSONL：每行一个 {"type": "node"|"relationship", ...}"""
+    if record['type'] == 'node':
+        yield ('node', record['id'], intern_labels(record.get('labels', [])),
+               intern_properties(record.get('properties', {})))
+    else:
+        yield ('relationship', record['start']['id'], record['end']['id'],
+               sys.intern(record.get('label', '')), intern_properties(record.get('properties', {})))
+
+def load_export(file_path, id_prefix, provenance, format_name=None):
+    """
+    读取 Neo4j 导出文件并转换为节点/关系列表
+
+    Args:
+        file_path: 导出文件路径
+        id_prefix: 节点ID前缀，如 feishui → feishui_12
+        provenance: 来源信息（data_source、import_time）
+        format_name: 指定格式名，默认自动识别
+    """
+    nodes = []
+    relationships = []
+    seen = set()
+
+    for record in iter_export(file_path, format_name):
+        if record[0] == 'node':
+            _, node_id, labels, props = record
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            props.update(provenance)
+            nodes.append({
+                'id': f"{id_prefix}_{node_id}",
+                'labels': labels,
+                'properties': props
+            })
+        else:
+            _, start, end, rel_type, props = record
+            rel = {
+                'source': f"{id_prefix}_{start}",
+                'target': f"{id_prefix}_{end}",
+                'type': rel_type,
+                'properties': props
+            }
+            rel.update(provenance)
+            relationships.append(rel)
+
+    return nodes, relationships
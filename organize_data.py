@@ -5,12 +5,34 @@
 整合CSV和JSON数据，补充属性，添加数据来源
 """
 
+import argparse
 import json
 import csv
 import os
-from collections import defaultdict
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from adjacency import ADJACENCY_FILE, write_adjacency
+from aggregates import STATS_FILE, build_aggregates, write_aggregates
+from autocomplete import AUTOCOMPLETE_FILE, build_autocomplete, collect_entries, write_autocomplete
+from columnar_export import FORMATS as COLUMNAR_FORMATS, write_columnar
+from content_hash import file_digest, load_state, save_state, write_if_changed
+from csv_ingest import (CSV_NODE_SCHEMAS, CSV_REL_SCHEMAS, build_id_index, iter_csv_edges,
+                        intern_row, iter_csv_nodes, make_provenance, report_errors)
+from cypher_parser import parse_cypher_file, report_collisions
+from data_delta import DELTA_DIR, write_delta
+from data_shards import SHARD_DIR, write_data
+from entity_resolution import apply_resolution, find_duplicates
+from entity_store import ENTITY_DIR, write_entity_store
+from geo_regions import REGION_FILE, load_regions
+from graph_analytics import ANALYTICS_FILE, analytics_inputs, build_analytics, sparse, write_analytics
+from search_index import SEARCH_DIR, build_search_index, collect_documents, write_search_index
+from id_allocator import IdAllocator, report_duplicates
+from knowledge_graph import KnowledgeGraph
+from neo4j_json import load_export
+
 # 数据来源信息
 DATA_SOURCES = {
     'rel_E&E.csv': '事件与事件关系数据',
@@ -23,6 +45,37 @@ DATA_SOURCES = {
     '花园口决堤_Neo4j导入脚本_最终版.cypher': '花园口决堤知识图谱数据'
 }
 
+# CSV关系文件及说明
+CSV_REL_FILES = {
+    'rel_E&E.csv': '事件-事件关系',
+    'rel_E&L.csv': '事件-地点关系',
+    'rel_E&P.csv': '事件-人物关系',
+    'rel_P&L.csv': '人物-地点关系',
+    'rel_P&P.csv': '人物-人物关系'
+}
+
+# 图数据源：数据集名称、文件路径（相对于项目上级目录）、格式；
+# 新增数据集只需在此登记
+GRAPH_SOURCES = [
+    {
+        'dataset': '花园口决堤',
+        'file': '花园口决堤_Neo4j导入脚本_最终版.cypher',
+        'format': 'cypher'
+    },
+    {
+        'dataset': '淝水之战',
+        'file': os.path.join('neo4j导入数据', '淝水.json'),
+        'format': 'neo4j_json',
+        'id_prefix': 'feishui'
+    },
+    {
+        'dataset': '双堆集战争',
+        'file': os.path.join('neo4j导入数据', '双堆集.json'),
+        'format': 'neo4j_json',
+        'id_prefix': 'shuangduiji'
+    }
+]
+
 def load_csv_relationships(file_path, source_name):
     """加载CSV关系文件"""
     relationships = []
@@ -45,309 +98,217 @@ def load_json_data(file_path, source_name):
         'data': data
     }
 
-def parse_cypher_file(file_path):
-    """解析Cypher文件，提取节点和关系"""
-    nodes = []
-    relationships = []
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 提取节点
-    node_pattern = r'CREATE\s+\((\w+):([^:]+)(?::([^:]+))?\s*\{([^}]+)\}\)'
-    import re
-    
-    for match in re.finditer(node_pattern, content):
-        var_name = match.group(1)
-        label1 = match.group(2).strip()
-        label2 = match.group(3).strip() if match.group(3) else None
-        props_str = match.group(4)
-        
-        props = {}
-        for prop_match in re.finditer(r'(\w+):\s*([^,}]+)', props_str):
-            key = prop_match.group(1).strip()
-            value = prop_match.group(2).strip().strip('"')
-            try:
-                if '.' in value:
-                    props[key] = float(value)
-                else:
-                    props[key] = int(value)
-            except ValueError:
-                props[key] = value
-        
-        # 补充属性
-        props['data_source'] = '花园口决堤_Neo4j导入脚本_最终版.cypher'
-        props['import_time'] = datetime.now().isoformat()
-        
-        node = {
-            'id': var_name,
-            'labels': [label1] + ([label2] if label2 else []),
-            'properties': props
-        }
-        nodes.append(node)
-    
-    # 提取关系
-    rel_pattern = r'MATCH\s+\((\w+):[^:]+(?::[^:]+)?\s*\{([^}]+)\}\),\s*\((\w+):[^:]+(?::[^:]+)?\s*\{([^}]+)\}\)\s+CREATE\s+\(\1\)-\[:([^\]]+)\]->\(\3\)'
-    
-    for match in re.finditer(rel_pattern, content):
-        source_var = match.group(1)
-        source_props = match.group(2)
-        target_var = match.group(3)
-        target_props = match.group(4)
-        rel_type = match.group(5).strip()
-        
-        source_match = {}
-        if 'name:' in source_props:
-            name_match = re.search(r'name:\s*"([^"]+)"', source_props)
-            if name_match:
-                source_match['name'] = name_match.group(1)
-        
-        target_match = {}
-        if 'name:' in target_props:
-            name_match = re.search(r'name:\s*"([^"]+)"', target_props)
-            if name_match:
-                target_match['name'] = name_match.group(1)
-        
-        rel = {
-            'source': source_match,
-            'target': target_match,
-            'type': rel_type,
-            'source_var': source_var,
-            'target_var': target_var,
-            'data_source': '花园口决堤_Neo4j导入脚本_最终版.cypher',
-            'import_time': datetime.now().isoformat()
-        }
-        relationships.append(rel)
-    
-    return nodes, relationships
-
-def process_feishui_json(json_data):
-    """处理淝水之战JSON数据"""
-    nodes = []
-    relationships = []
-    node_map = {}
-    
-    # 提取节点和关系
-    for item in json_data:
-        if 'p' in item:
-            # 关系数据
-            path = item['p']
-            start_node = path['start']
-            end_node = path['end']
-            
-            # 处理开始节点
-            if start_node['identity'] not in node_map:
-                props = start_node.get('properties', {})
-                props['data_source'] = '淝水.json'
-                props['import_time'] = datetime.now().isoformat()
-                node_map[start_node['identity']] = {
-                    'id': f"feishui_{start_node['identity']}",
-                    'labels': start_node.get('labels', []),
-                    'properties': props
-                }
-                nodes.append(node_map[start_node['identity']])
-            
-            # 处理结束节点
-            if end_node['identity'] not in node_map:
-                props = end_node.get('properties', {})
-                props['data_source'] = '淝水.json'
-                props['import_time'] = datetime.now().isoformat()
-                node_map[end_node['identity']] = {
-                    'id': f"feishui_{end_node['identity']}",
-                    'labels': end_node.get('labels', []),
-                    'properties': props
-                }
-                nodes.append(node_map[end_node['identity']])
-            
-            # 处理关系
-            if 'segments' in path and len(path['segments']) > 0:
-                rel_data = path['segments'][0]['relationship']
-                relationships.append({
-                    'source': f"feishui_{start_node['identity']}",
-                    'target': f"feishui_{end_node['identity']}",
-                    'type': rel_data.get('type', ''),
-                    'properties': rel_data.get('properties', {}),
-                    'data_source': '淝水.json',
-                    'import_time': datetime.now().isoformat()
-                })
-    
-    return nodes, relationships
-
-def process_shuangduiji_json(json_data):
-    """处理双堆集JSON数据"""
-    nodes = []
-    relationships = []
-    node_map = {}
+def process_cypher_file(file_path, provenance):
+    """解析Cypher文件，为节点和关系补充数据来源"""
+    collisions = []
+    nodes, relationships = parse_cypher_file(file_path, collisions)
+    report_collisions(os.path.basename(file_path), collisions)
     
-    for item in json_data:
-        # 提取节点
-        if 'n' in item:
-            node = item['n']
-            node_id = node['identity']
-            if node_id not in node_map:
-                props = node.get('properties', {})
-                props['data_source'] = '双堆集.json'
-                props['import_time'] = datetime.now().isoformat()
-                node_map[node_id] = {
-                    'id': f"shuangduiji_{node_id}",
-                    'labels': node.get('labels', []),
-                    'properties': props
-                }
-                nodes.append(node_map[node_id])
-        
-        if 'm' in item:
-            node = item['m']
-            node_id = node['identity']
-            if node_id not in node_map:
-                props = node.get('properties', {})
-                props['data_source'] = '双堆集.json'
-                props['import_time'] = datetime.now().isoformat()
-                node_map[node_id] = {
-                    'id': f"shuangduiji_{node_id}",
-                    'labels': node.get('labels', []),
-                    'properties': props
-                }
-                nodes.append(node_map[node_id])
-        
-        # 提取关系
-        if 'r' in item:
-            rel = item['r']
-            relationships.append({
-                'source': f"shuangduiji_{rel['start']}",
-                'target': f"shuangduiji_{rel['end']}",
-                'type': rel.get('type', ''),
-                'properties': rel.get('properties', {}),
-                'data_source': '双堆集.json',
-                'import_time': datetime.now().isoformat()
-            })
+    for node in nodes:
+        node['properties'].update(provenance)
+    for rel in relationships:
+        rel.update(provenance)
     
     return nodes, relationships
 
-def process_csv_events(file_path):
-    """处理事件CSV文件，转换为节点格式"""
-    nodes = []
-    
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            props = dict(row)
-            props['data_source'] = 'events.csv'
-            props['import_time'] = datetime.now().isoformat()
-            
-            # 转换坐标
-            if props.get('lng'):
-                try:
-                    props['lng'] = float(props['lng'])
-                except:
-                    props['lng'] = None
-            if props.get('lat'):
-                try:
-                    props['lat'] = float(props['lat'])
-                except:
-                    props['lat'] = None
-            
-            node = {
-                'id': props.get('事件ID', f"event_{len(nodes)}"),
-                'labels': ['事件'],
-                'properties': props
-            }
-            nodes.append(node)
-    
-    return nodes
+def process_neo4j_json(file_path, id_prefix, provenance):
+    """流式读取Neo4j导出的JSON（自动识别导出格式），转换为节点和关系"""
+    return load_export(file_path, id_prefix, provenance)
 
-def process_csv_persons(file_path):
-    """处理人物CSV文件，转换为节点格式"""
-    nodes = []
-    
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            props = dict(row)
-            props['data_source'] = 'persons.csv'
-            props['import_time'] = datetime.now().isoformat()
-            
-            # 转换坐标
-            if props.get('lng'):
-                try:
-                    props['lng'] = float(props['lng'])
-                except:
-                    props['lng'] = None
-            if props.get('lat'):
-                try:
-                    props['lat'] = float(props['lat'])
-                except:
-                    props['lat'] = None
-            
-            # 转换权重
-            if props.get('权重'):
-                try:
-                    props['权重'] = int(props['权重'])
-                except:
-                    props['权重'] = None
-            
-            node = {
-                'id': props.get('人物序号', f"person_{len(nodes)}"),
-                'labels': ['人物'],
-                'properties': props
-            }
-            nodes.append(node)
-    
-    return nodes
+def build_dataset(name, nodes, relationships, data_source):
+    """汇总单个数据集"""
+    graph = KnowledgeGraph.from_nodes(nodes, relationships, name)
+    return {
+        'dataset': name,
+        'summary': graph.summary(),
+        'nodes': nodes,
+        'relationships': relationships,
+        'data_source': data_source
+    }
 
-def process_csv_locations(file_path):
-    """处理地点CSV文件，转换为节点格式"""
-    nodes = []
-    
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            props = dict(row)
-            props['data_source'] = 'geo_coords.csv'
-            props['import_time'] = datetime.now().isoformat()
-            
-            # 转换坐标
-            if props.get('lng'):
-                try:
-                    props['lng'] = float(props['lng'])
-                except:
-                    props['lng'] = None
-            if props.get('lat'):
-                try:
-                    props['lat'] = float(props['lat'])
-                except:
-                    props['lat'] = None
-            
-            node = {
-                'id': props.get('LocationID', f"location_{len(nodes)}"),
-                'labels': ['地点'],
-                'properties': props
-            }
-            nodes.append(node)
-    
-    return nodes
+def process_csv_nodes(file_path, provenance):
+    """处理节点CSV文件（事件、人物、地点），按schema流式生成节点，结束后汇总报告错误行"""
+    file_name = os.path.basename(file_path)
+    errors = []
+    yield from iter_csv_nodes(file_path, CSV_NODE_SCHEMAS[file_name], provenance, errors)
+    report_errors(file_name, errors)
 
-def process_csv_relationships(file_path, rel_type):
+def process_csv_relationships(file_path, rel_type, import_time):
     """处理CSV关系文件，转换为标准格式"""
     relationships = []
+    source_file = os.path.basename(file_path)
+    data_source = DATA_SOURCES.get(source_file, '未知来源')
     
     with open(file_path, 'r', encoding='utf-8-sig') as f:
         reader = csv.DictReader(f)
         for row in reader:
             rel = {
-                'source_file': os.path.basename(file_path),
-                'data_source': DATA_SOURCES.get(os.path.basename(file_path), '未知来源'),
-                'import_time': datetime.now().isoformat(),
-                'raw_data': row
+                'source_file': source_file,
+                'data_source': data_source,
+                'import_time': import_time,
+                'raw_data': intern_row(row)
             }
             relationships.append(rel)
     
     return relationships
 
-def main():
-    """主函数"""
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(os.path.dirname(base_dir), 'neo4j导入数据')
+def join_csv_relationships(csv_relationships, nodes, import_times):
+    """
+    把CSV关系连接为图中的边
+
+    Args:
+        import_times: 文件名 -> 该文件的导入时间
+
+    Returns:
+        edges: 解析出的边列表
+        unresolved: 文件名 -> {'source': 数量, 'target': 数量}，记录找不到的端点
+    """
+    id_index = build_id_index(nodes)
+    edges = []
+    unresolved = {}
+    
+    for filename, rels in csv_relationships.items():
+        schema = CSV_REL_SCHEMAS.get(filename)
+        if schema is None:
+            continue
+        counts = {'source': 0, 'target': 0}
+        provenance = make_provenance(filename, import_times[filename])
+        rows = (rel['raw_data'] for rel in rels)
+        edges.extend(iter_csv_edges(rows, schema, id_index, provenance, counts))
+        unresolved[filename] = counts
+        if counts['source'] or counts['target']:
+            print(f"  {filename}: {counts['source']} 个起点、{counts['target']} 个终点未找到")
+    
+    return edges, unresolved
+
+def collect_sources(base_dir):
+    """列出所有存在的数据源；列表顺序即合并顺序"""
+    root_dir = os.path.dirname(base_dir)
+    data_dir = os.path.join(root_dir, 'neo4j导入数据')
+    sources = []
+    
+    for source in GRAPH_SOURCES:
+        file_path = os.path.join(root_dir, source['file'])
+        if os.path.exists(file_path):
+            sources.append(dict(source, kind='graph', path=file_path))
+    
+    for filename in CSV_NODE_SCHEMAS:
+        file_path = os.path.join(data_dir, filename)
+        if os.path.exists(file_path):
+            sources.append({'kind': 'csv_nodes', 'file': filename, 'path': file_path})
+    
+    for filename, desc in CSV_REL_FILES.items():
+        file_path = os.path.join(data_dir, filename)
+        if os.path.exists(file_path):
+            sources.append({'kind': 'csv_relationships', 'file': filename, 'desc': desc, 'path': file_path})
+    
+    return sources
+
+def assign_import_times(sources, import_time, state_file):
+    """
+    为每个数据源确定导入时间
+
+    内容未变化的数据源沿用上次的导入时间，这样它对应的输出文件内容不变，
+    不会被重新写入；内容变化或新增的数据源使用本次运行时间
+    """
+    state = load_state(state_file)
+    new_state = {}
+    for source in sources:
+        digest = file_digest(source['path'])
+        previous = state.get(source['path'])
+        if previous and previous.get('sha256') == digest:
+            source['import_time'] = previous['import_time']
+        else:
+            source['import_time'] = import_time
+        new_state[source['path']] = {'sha256': digest, 'import_time': source['import_time']}
+    save_state(state_file, new_state)
+
+def load_source(source):
+    """解析单个数据源，各数据源互不依赖，可在子进程中运行"""
+    file_path = source['path']
+    import_time = source['import_time']
+    data_source = os.path.basename(file_path)
+    provenance = make_provenance(data_source, import_time)
+    
+    if source['kind'] == 'graph':
+        print(f"处理{source['dataset']}数据...")
+        if source['format'] == 'cypher':
+            nodes, relationships = process_cypher_file(file_path, provenance)
+        else:
+            nodes, relationships = process_neo4j_json(file_path, source['id_prefix'], provenance)
+        return build_dataset(source['dataset'], nodes, relationships, data_source)
+    
+    print(f"  处理 {source['file']}...")
+    if source['kind'] == 'csv_nodes':
+        return list(process_csv_nodes(file_path, provenance))
+    return process_csv_relationships(file_path, source['desc'], import_time)
+
+def load_sources(sources, jobs=1):
+    """
+    解析所有数据源
+
+    jobs 大于1时在进程池中并行解析；结果按 sources 的顺序返回，
+    与子进程完成的先后无关，因此输出顺序和节点ID保持稳定
+    """
+    if jobs > 1 and len(sources) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(sources))) as executor:
+            return list(executor.map(load_source, sources))
+    return [load_source(source) for source in sources]
+
+def endpoint_uid(graph, allocator, dataset, endpoint, labels, var):
+    """关系端点的全局编号；端点为 MATCH 条件时按条件在本数据集中查找，唯一匹配才返回"""
+    if isinstance(endpoint, dict):
+        if endpoint:
+            matches = graph.find(endpoint.get('name'), labels, dataset, endpoint)
+            return graph.node_uids[matches[0]] if len(matches) == 1 else None
+        endpoint = var
+    return allocator.lookup(dataset, endpoint)
+
+def assign_edge_uids(graph, allocator, dataset, relationships):
+    """为数据集内的关系记录添加 source_uid/target_uid"""
+    for rel in relationships:
+        source = endpoint_uid(graph, allocator, dataset, rel['source'], rel.get('source_labels', []), rel.get('source_var'))
+        target = endpoint_uid(graph, allocator, dataset, rel['target'], rel.get('target_labels', []), rel.get('target_var'))
+        if source is not None and target is not None:
+            rel['source_uid'] = source
+            rel['target_uid'] = target
+
+def resolve_entities(all_datasets, graph):
+    """
+    跨数据源实体消解：合并不同数据源中的同一实体，返回由去重后的节点重新建立的图（尚未添加边）
+    """
+    combined = all_datasets['combined']
+    dataset_of = {}
+    for i, node in enumerate(combined['nodes']):
+        dataset_of.setdefault(node.get('uid'), graph.node_datasets[i])
+    clusters, comparisons = find_duplicates(combined['nodes'])
+    merged = apply_resolution(all_datasets, clusters)
+    all_datasets['metadata']['entity_resolution'] = {
+        'clusters': len(clusters),
+        'merged_nodes': merged,
+        'comparisons': comparisons
+    }
+    print(f"  {len(clusters)} 组重复实体，合并 {merged} 个节点（比较 {comparisons} 次）")
     
+    resolved = KnowledgeGraph()
+    for node in combined['nodes']:
+        resolved.add_node(node, dataset_of.get(node.get('uid')))
+    return resolved
+
+def merge_sources(sources, results, import_time, allocator, regions=(), resolve=True):
+    """
+    按数据源顺序合并解析结果，连接CSV关系并计算统计
+
+    节点按 (数据集或CSV文件名, 原始ID) 由 allocator 分配全局编号，
+    不同数据源中相同的原始ID不会混淆
+
+    Args:
+        regions: geo_regions.load_regions 的结果，用于按地区统计
+        resolve: 合并不同数据源中的同一实体（见 entity_resolution）
+
+    Returns:
+        (合并数据, 汇总统计)；汇总统计由合并图直接计算，写入 data/stats.json
+    """
     all_datasets = {
         'datasets': [],
         'combined': {
@@ -359,152 +320,107 @@ def main():
             'times': []
         },
         'metadata': {
-            'generated_at': datetime.now().isoformat(),
+            'generated_at': import_time,
             'data_sources': DATA_SOURCES,
             'version': '1.0.0'
         }
     }
-    
-    # 1. 处理花园口决堤数据
-    print("处理花园口决堤数据...")
-    huayuan_file = os.path.join(os.path.dirname(base_dir), '花园口决堤_Neo4j导入脚本_最终版.cypher')
-    if os.path.exists(huayuan_file):
-        nodes, relationships = parse_cypher_file(huayuan_file)
-        dataset = {
-            'dataset': '花园口决堤',
-            'summary': {
-                'total_nodes': len(nodes),
-                'total_relationships': len(relationships),
-                'events': len([n for n in nodes if '事件' in n['labels']]),
-                'persons': len([n for n in nodes if '人物' in n['labels']]),
-                'locations': len([n for n in nodes if '地点' in n['labels']]),
-                'times': len([n for n in nodes if '时间' in n['labels']])
-            },
-            'nodes': nodes,
-            'relationships': relationships,
-            'data_source': '花园口决堤_Neo4j导入脚本_最终版.cypher'
-        }
-        all_datasets['datasets'].append(dataset)
-        all_datasets['combined']['nodes'].extend(nodes)
-        all_datasets['combined']['relationships'].extend(relationships)
-    
-    # 2. 处理淝水之战数据
-    print("处理淝水之战数据...")
-    feishui_file = os.path.join(data_dir, '淝水.json')
-    if os.path.exists(feishui_file):
-        with open(feishui_file, 'r', encoding='utf-8-sig') as f:
-            feishui_data = json.load(f)
-        nodes, relationships = process_feishui_json(feishui_data)
-        dataset = {
-            'dataset': '淝水之战',
-            'summary': {
-                'total_nodes': len(nodes),
-                'total_relationships': len(relationships),
-                'events': len([n for n in nodes if '事件' in n['labels']]),
-                'persons': len([n for n in nodes if '人物' in n['labels']]),
-                'locations': len([n for n in nodes if '地点' in n['labels']]),
-                'times': len([n for n in nodes if '时间' in n['labels']])
-            },
-            'nodes': nodes,
-            'relationships': relationships,
-            'data_source': '淝水.json'
-        }
-        all_datasets['datasets'].append(dataset)
-        all_datasets['combined']['nodes'].extend(nodes)
-        all_datasets['combined']['relationships'].extend(relationships)
-    
-    # 3. 处理双堆集数据
-    print("处理双堆集数据...")
-    shuangduiji_file = os.path.join(data_dir, '双堆集.json')
-    if os.path.exists(shuangduiji_file):
-        with open(shuangduiji_file, 'r', encoding='utf-8-sig') as f:
-            shuangduiji_data = json.load(f)
-        nodes, relationships = process_shuangduiji_json(shuangduiji_data)
-        dataset = {
-            'dataset': '双堆集战争',
-            'summary': {
-                'total_nodes': len(nodes),
-                'total_relationships': len(relationships),
-                'events': len([n for n in nodes if '事件' in n['labels']]),
-                'persons': len([n for n in nodes if '人物' in n['labels']]),
-                'locations': len([n for n in nodes if '地点' in n['labels']]),
-                'times': len([n for n in nodes if '时间' in n['labels']])
-            },
-            'nodes': nodes,
-            'relationships': relationships,
-            'data_source': '双堆集.json'
-        }
-        all_datasets['datasets'].append(dataset)
-        all_datasets['combined']['nodes'].extend(nodes)
-        all_datasets['combined']['relationships'].extend(relationships)
-    
-    # 4. 处理CSV节点文件（事件、人物、地点）
-    print("处理CSV节点文件...")
-    
-    # 处理事件数据
-    events_file = os.path.join(data_dir, 'events.csv')
-    if os.path.exists(events_file):
-        print("  处理 events.csv...")
-        csv_events = process_csv_events(events_file)
-        all_datasets['combined']['nodes'].extend(csv_events)
-        all_datasets['combined']['events'].extend(csv_events)
-    
-    # 处理人物数据
-    persons_file = os.path.join(data_dir, 'persons.csv')
-    if os.path.exists(persons_file):
-        print("  处理 persons.csv...")
-        csv_persons = process_csv_persons(persons_file)
-        all_datasets['combined']['nodes'].extend(csv_persons)
-        all_datasets['combined']['persons'].extend(csv_persons)
-    
-    # 处理地点数据
-    geo_coords_file = os.path.join(data_dir, 'geo_coords.csv')
-    if os.path.exists(geo_coords_file):
-        print("  处理 geo_coords.csv...")
-        csv_locations = process_csv_locations(geo_coords_file)
-        all_datasets['combined']['nodes'].extend(csv_locations)
-        all_datasets['combined']['locations'].extend(csv_locations)
-    
-    # 5. 处理CSV关系文件
-    print("处理CSV关系文件...")
-    csv_files = {
-        'rel_E&E.csv': '事件-事件关系',
-        'rel_E&L.csv': '事件-地点关系',
-        'rel_E&P.csv': '事件-人物关系',
-        'rel_P&L.csv': '人物-地点关系',
-        'rel_P&P.csv': '人物-人物关系'
-    }
-    
     csv_relationships = {}
-    for filename, desc in csv_files.items():
-        file_path = os.path.join(data_dir, filename)
-        if os.path.exists(file_path):
-            print(f"  处理 {filename}...")
-            csv_relationships[filename] = process_csv_relationships(file_path, desc)
+    csv_import_times = {}
+    
+    combined = all_datasets['combined']
+    graph = KnowledgeGraph()
+    
+    for source, result in zip(sources, results):
+        if source['kind'] == 'graph':
+            all_datasets['datasets'].append(result)
+            combined['nodes'].extend(result['nodes'])
+            combined['relationships'].extend(result['relationships'])
+            report_duplicates(result['dataset'], allocator.assign(result['nodes'], result['dataset']))
+            graph.add_nodes(result['nodes'], result['dataset'])
+            assign_edge_uids(graph, allocator, result['dataset'], result['relationships'])
+        elif source['kind'] == 'csv_nodes':
+            combined['nodes'].extend(result)
+            report_duplicates(source['file'], allocator.assign(result, source['file']))
+            graph.add_nodes(result)
+        else:
+            csv_relationships[source['file']] = result
+            csv_import_times[source['file']] = source['import_time']
     
     # 添加CSV关系到组合数据
     all_datasets['csv_relationships'] = csv_relationships
     
-    # 分类组合数据
-    all_datasets['combined']['events'] = [n for n in all_datasets['combined']['nodes'] if any('事件' in label for label in n['labels'])]
-    all_datasets['combined']['persons'] = [n for n in all_datasets['combined']['nodes'] if any('人物' in label for label in n['labels'])]
-    all_datasets['combined']['locations'] = [n for n in all_datasets['combined']['nodes'] if any('地点' in label for label in n['labels'])]
-    all_datasets['combined']['times'] = [n for n in all_datasets['combined']['nodes'] if any('时间' in label for label in n['labels'])]
+    # 按ID把CSV关系连接为边
+    print("连接CSV关系...")
+    csv_edges, unresolved = join_csv_relationships(csv_relationships, combined['nodes'], csv_import_times)
+    combined['relationships'].extend(csv_edges)
+    all_datasets['metadata']['csv_unresolved_endpoints'] = unresolved
+    print(f"  生成 {len(csv_edges)} 条边")
+    if resolve:
+        print("跨数据源实体消解...")
+        graph = resolve_entities(all_datasets, graph)
+    for rel in combined['relationships']:
+        graph.add_edge(rel)
+    
+    # 分类组合数据：标签包含类别关键字即归入该类别
+    for key, indexes in graph.categories(partial=True).items():
+        combined[key] = [combined['nodes'][i] for i in indexes]
     
     # 计算组合统计
-    all_datasets['combined']['summary'] = {
-        'total_nodes': len(all_datasets['combined']['nodes']),
-        'total_relationships': len(all_datasets['combined']['relationships']),
-        'events': len(all_datasets['combined']['events']),
-        'persons': len(all_datasets['combined']['persons']),
-        'locations': len(all_datasets['combined']['locations']),
-        'times': len(all_datasets['combined']['times'])
-    }
+    combined['summary'] = graph.summary(partial=True)
+    csv_edge_counts = Counter(edge['data_source'] for edge in csv_edges)
+    aggregates = build_aggregates(graph, all_datasets, csv_edge_counts, regions)
     
-    # 保存数据
+    return all_datasets, aggregates
+
+class IndexCache:
+    """
+    监视模式下缓存派生索引的构建结果：索引的输入（检索文档、补全名称、图的边和节点标签）
+    与上次构建时相同时直接复用，不再重新计算
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, name, inputs, build):
+        cached = self.entries.get(name)
+        if cached is None or cached[0] != inputs:
+            cached = self.entries[name] = (inputs, build())
+        return cached[1]
+
+def write_outputs(all_datasets, base_dir, legacy=False, pretty=False, export=None, aggregates=None, cache=None,
+                  monolithic=False):
+    """
+    保存按数据集和类别拆分的分片（data/ 目录）、实体存储（data/entities/ 目录）、
+    汇总统计（data/stats.json）、邻接索引（data/adjacency.bin）、全文检索索引（data/search/ 目录）、
+    自动补全索引（data/autocomplete.json）以及图分析结果（data/analytics.json）
+
+    Args:
+        aggregates: merge_sources 计算的汇总统计
+        legacy: data.json 使用旧格式（节点对象重复存放、缩进），默认使用紧凑格式
+        pretty: 分片和紧凑格式的 data.json 也缩进输出
+        export: 同时导出列式文件的格式（'arrow' 或 'parquet'），默认不导出
+        cache: IndexCache，监视模式下跳过输入未变化的检索、补全和图分析索引的重新计算
+        monolithic: 同时写入包含全部记录的 data.json（见 data_shards.write_data），legacy 格式总是写入
+    """
     output_file = os.path.join(base_dir, 'data.json')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_datasets, f, ensure_ascii=False, indent=2)
+    # 先与上次构建比较，数据版本号随 metadata 写入分片清单（以及 data.json）
+    version, patch = write_delta(all_datasets, base_dir)
+    written, total = write_data(all_datasets, base_dir, legacy, pretty, monolithic)
+    if aggregates is not None:
+        aggregates = dict(aggregates, data_version=version)
+        write_aggregates(aggregates, base_dir)
+    _, node_count, edge_count = write_adjacency(all_datasets, base_dir)
+    search = completions = analytics = None
+    if cache is not None:
+        documents = collect_documents(all_datasets)
+        search = cache.get('search', documents, lambda: build_search_index(all_datasets, documents))
+        entries = collect_entries(all_datasets)
+        completions = cache.get('autocomplete', entries, lambda: build_autocomplete(all_datasets, entries))
+        analytics = cache.get('analytics', analytics_inputs(all_datasets), lambda: build_analytics(all_datasets))
+    search_written, documents, terms = write_search_index(all_datasets, base_dir, search)
+    _, names, completion_keys = write_autocomplete(all_datasets, base_dir, completions)
+    _, analytics = write_analytics(all_datasets, base_dir, analytics)
     
     print(f"\n数据整理完成！")
     print(f"共处理 {len(all_datasets['datasets'])} 个数据集")
@@ -514,14 +430,161 @@ def main():
     print(f"  - 人物: {all_datasets['combined']['summary']['persons']}")
     print(f"  - 地点: {all_datasets['combined']['summary']['locations']}")
     print(f"  - 时间: {all_datasets['combined']['summary']['times']}")
-    print(f"数据已保存到: {output_file}")
+    if legacy or monolithic:
+        print(f"数据已保存到: {output_file}")
+    print(f"分片已保存到: {os.path.join(base_dir, SHARD_DIR)}（{total} 个分片，更新 {written} 个文件）")
+    if aggregates is not None:
+        print(f"汇总统计已保存到: {os.path.join(base_dir, STATS_FILE)}")
+    print(f"邻接索引已保存到: {os.path.join(base_dir, ADJACENCY_FILE)}（{node_count} 个节点编号，{edge_count} 条关系）")
+    print(f"检索索引已保存到: {os.path.join(base_dir, SEARCH_DIR)}"
+          f"（{documents} 个文档，{terms} 个词项，更新 {search_written} 个文件）")
+    print(f"自动补全索引已保存到: {os.path.join(base_dir, AUTOCOMPLETE_FILE)}（{names} 个名称，{completion_keys} 个键）")
+    print(f"图分析结果已保存到: {os.path.join(base_dir, ANALYTICS_FILE)}"
+          f"（{len(analytics['component_sizes'])} 个连通分量，PageRank 迭代 {analytics['pagerank']['iterations']} 次，"
+          f"介数中心性抽样 {analytics['betweenness']['samples']} 个节点，"
+          f"{'SciPy 稀疏矩阵' if sparse is not None else '纯 Python'}）")
+    if patch:
+        print(f"增量补丁已保存到: {os.path.join(base_dir, DELTA_DIR, patch['file'])}"
+              f"（版本 {patch['from']} -> {patch['to']}，{patch['bytes'] / 1024:.1f} KB）")
+    else:
+        print(f"数据版本: {version}")
+    
+    # 按ID分桶的实体存储，供详情页查找单个节点
+    written, total = write_entity_store(all_datasets['combined']['nodes'], base_dir)
+    print(f"实体存储已保存到: {os.path.join(base_dir, ENTITY_DIR)}（{total} 个桶，更新 {written} 个文件）")
+    
+    if export:
+        write_columnar(all_datasets, base_dir, export)
+
+def source_signature(file_path):
+    """用修改时间和大小判断文件是否变化，不存在时返回 None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def reload_sources(sources, signatures, digests, results):
+    """
+    监视模式中重新解析有变化的数据源，就地更新 signatures、digests 和 results（均以文件路径为键）
+
+    修改时间或大小变化、但内容摘要与上次相同的文件（例如只保存了文件）不重新解析；
+    解析失败的文件保留上次的结果
+
+    Returns:
+        是否需要重新合并：有数据源的内容变化、新增或删除
+    """
+    modified = False
+    for source in sources:
+        path = source['path']
+        signature = source_signature(path)
+        if signature == signatures.get(path):
+            continue
+        signatures[path] = signature
+        digest = file_digest(path)
+        if digest == digests.get(path):
+            continue
+        try:
+            results[path] = load_source(source)
+        except Exception as e:
+            # 文件可能仍在编辑中，保留上次的解析结果，等待下一次变化
+            print(f"  解析 {path} 失败: {e}")
+            continue
+        digests[path] = digest
+        modified = True
+    for path in set(signatures) - set(source['path'] for source in sources):
+        del signatures[path]
+        digests.pop(path, None)
+        results.pop(path, None)
+        modified = True
+    return modified
+
+def watch(base_dir, jobs=1, interval=0.5, legacy=False, pretty=False, export=None, resolve=True, monolithic=False):
+    """
+    监视模式：解析结果常驻内存，数据源变化时只重新解析该数据源。
+    合并不是增量的：uid 分配、跨数据源的实体合并和CSV关系的端点查找都涉及全部数据源，
+    因此每次变化仍与其余数据源的解析结果整体重新合并，这一步的耗时随数据总量增长。
+    合并之后，输入未变化的检索、补全和图分析索引直接复用上次的结果，内容未变化的输出文件不会重写；
+    文件内容未变化时（例如只保存了文件）不重新解析也不重新合并，见 reload_sources
+    """
+    state_file = os.path.join(base_dir, '.organize-state.json')
+    import_time = datetime.now().isoformat()
+    sources = collect_sources(base_dir)
+    assign_import_times(sources, import_time, state_file)
+    allocator = IdAllocator.load(os.path.join(base_dir, 'node_ids.json'))
+    regions = load_regions(os.path.join(base_dir, REGION_FILE))
+    results = dict(zip((s['path'] for s in sources), load_sources(sources, jobs)))
+    signatures = {s['path']: source_signature(s['path']) for s in sources}
+    digests = {s['path']: file_digest(s['path']) for s in sources}
+    all_datasets, aggregates = merge_sources(sources, list(results.values()), import_time, allocator, regions, resolve)
+    cache = IndexCache()
+    write_outputs(all_datasets, base_dir, legacy, pretty, export, aggregates, cache, monolithic)
+    allocator.save()
+    print(f"\n正在监视数据源变化（每 {interval} 秒检查一次，Ctrl+C 退出）...")
+    
+    try:
+        while True:
+            time.sleep(interval)
+            current = collect_sources(base_dir)
+            if all(source_signature(s['path']) == signatures.get(s['path']) for s in current) and \
+                    len(current) == len(signatures):
+                continue
+            
+            started = time.perf_counter()
+            import_time = datetime.now().isoformat()
+            assign_import_times(current, import_time, state_file)
+            if not reload_sources(current, signatures, digests, results):
+                continue
+            
+            current = [s for s in current if s['path'] in results]
+            all_datasets, aggregates = merge_sources(current, [results[s['path']] for s in current],
+                                                     import_time, allocator, regions, resolve)
+            write_outputs(all_datasets, base_dir, legacy, pretty, export, aggregates, cache, monolithic)
+            allocator.save()
+            print(f"已更新，用时 {time.perf_counter() - started:.2f} 秒")
+    except KeyboardInterrupt:
+        print("\n已退出监视模式")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='整合CSV、JSON和Cypher数据，生成数据分片和各项索引')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='并行解析数据源的进程数，0 表示使用全部CPU核心（默认 1）')
+    parser.add_argument('-w', '--watch', action='store_true',
+                        help='监视模式：数据源变化时增量重建')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='监视模式下检查文件变化的间隔秒数（默认 0.5）')
+    parser.add_argument('--monolithic', action='store_true',
+                        help='除分片外同时写入包含全部记录的 data.json（供没有分片的页面和工具读取，默认不写）')
+    parser.add_argument('--legacy-schema', action='store_true',
+                        help='写入旧格式的 data.json，不做引用压缩')
+    parser.add_argument('--pretty', action='store_true',
+                        help='缩进输出 data.json 和分片，便于查看（默认紧凑输出）')
+    parser.add_argument('--export', choices=sorted(COLUMNAR_FORMATS),
+                        help='同时把节点、边和CSV关系表导出为 Arrow 或 Parquet 文件（columnar/ 目录，需要 pyarrow）')
+    parser.add_argument('--no-resolve', action='store_true',
+                        help='不合并不同数据源中的同一实体，保留全部原始节点')
+    args = parser.parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
     
-    # 保存各数据集单独文件
-    for dataset in all_datasets['datasets']:
-        dataset_file = os.path.join(base_dir, f"data_{dataset['dataset']}.json")
-        with open(dataset_file, 'w', encoding='utf-8') as f:
-            json.dump(dataset, f, ensure_ascii=False, indent=2)
-        print(f"  - {dataset['dataset']}: {dataset_file}")
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    if args.watch:
+        watch(base_dir, jobs, args.interval, args.legacy_schema, args.pretty, args.export, not args.no_resolve,
+              args.monolithic)
+        return
+    
+    # 本次运行的导入时间，所有记录共用
+    import_time = datetime.now().isoformat()
+    
+    sources = collect_sources(base_dir)
+    assign_import_times(sources, import_time, os.path.join(base_dir, '.organize-state.json'))
+    results = load_sources(sources, jobs)
+    allocator = IdAllocator.load(os.path.join(base_dir, 'node_ids.json'))
+    regions = load_regions(os.path.join(base_dir, REGION_FILE))
+    all_datasets, aggregates = merge_sources(sources, results, import_time, allocator, regions, not args.no_resolve)
+    write_outputs(all_datasets, base_dir, args.legacy_schema, args.pretty, args.export, aggregates,
+                  monolithic=args.monolithic)
+    allocator.save()
 
 if __name__ == '__main__':
     main()
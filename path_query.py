@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点之间的最短路径和关系链查询
+在邻接索引 data/adjacency.bin（按 uid 的压缩稀疏行数组，见 adjacency.py）上搜索，
+不必加载 data.json 或导入 Neo4j：
+
+    最少步数：双向广度优先搜索，从两端中较小的一侧逐层扩展
+    最小代价：按关系类型的代价从两端同时做 Dijkstra 搜索（TYPE_COSTS，可用 --cost 覆盖）
+    前 k 条路径：Yen 算法，路径中不含重复节点
+    --max-hops 限制路径的最大步数；带步数限制的代价搜索从起点单向搜索并记录步数，结果仍是限制内的最优路径
+
+关系默认按无向边处理（--directed 时只沿关系方向搜索）；起点和终点可以是多个节点（如同名节点），
+找到到达任一终点的路径即停止。
+
+用法：
+    python path_query.py 蒋介石 淮北                    # 最少步数的路径
+    python path_query.py jjs 双堆集 --k 3 --max-hops 4   # 名称可以用拼音或首字母（见 autocomplete.py）
+    python path_query.py uid=0 uid=57 --weighted --cost 涉及=3
+"""
+
+import argparse
+import heapq
+import os
+import sys
+import time
+
+from adjacency import load_adjacency
+from autocomplete import Autocomplete, completion_key
+
+# 设置输出编码为UTF-8
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 关系的默认代价
+DEFAULT_COST = 1.0
+# 按代价搜索（--weighted）时各关系类型的代价：含义较弱的关系代价较高，路径优先经过具体的关系
+TYPE_COSTS = {
+    '关联': 2.0,
+    '涉及': 1.5,
+    '涉及地点': 1.5,
+    '包括': 1.5
+}
+
+# 命令行中名称前缀匹配时使用的节点数
+NAME_MATCH_LIMIT = 10
+
+class Path:
+    """
+    一条路径
+
+    nodes 为依次经过的节点 uid；edges 与相邻两个节点对应，每项为
+    (关系在 combined.relationships 中的下标, 关系类型, 关系方向是否与路径方向相同)；
+    cost 为各关系的代价之和（按步数搜索时为步数）
+    """
+
+    __slots__ = ('nodes', 'edges', 'cost')
+
+    def __init__(self, nodes, edges, cost):
+        self.nodes = nodes
+        self.edges = edges
+        self.cost = cost
+
+    @property
+    def hops(self):
+        return len(self.edges)
+
+    def key(self):
+        return tuple(self.nodes), tuple(edge for edge, _, _ in self.edges)
+
+    def __repr__(self):
+        return f"Path(nodes={self.nodes}, cost={self.cost})"
+
+class PathFinder:
+    """
+    邻接索引上的路径搜索
+
+    Args:
+        adjacency: adjacency.load_adjacency 返回的邻接索引
+        costs: 关系类型 -> 代价（必须为正数），未列出的类型为 DEFAULT_COST；None 时每条关系代价相同
+        directed: 只沿关系方向搜索
+    """
+
+    def __init__(self, adjacency, costs=None, directed=False):
+        self.adjacency = adjacency
+        self.directed = directed
+        costs = costs or {}
+        invalid = [name for name, cost in costs.items() if not cost > 0]
+        if invalid:
+            raise ValueError(f"关系代价必须为正数: {', '.join(invalid)}")
+        self.type_costs = [float(costs.get(name, DEFAULT_COST)) for name in adjacency.types]
+
+    def _steps(self, u, forward=True):
+        """
+        从 u 出发的一步：(邻居, 关系下标, 类型序号, 关系是否为 u -> 邻居)
+
+        有向搜索时正向只走出边，反向（从终点往回搜索）只走入边
+        """
+        adjacency = self.adjacency
+        if forward or not self.directed:
+            neighbors, edges, types = adjacency.out_neighbors, adjacency.out_edges, adjacency.out_types
+            for i in range(adjacency.out_offsets[u], adjacency.out_offsets[u + 1]):
+                yield neighbors[i], edges[i], types[i], True
+        if not forward or not self.directed:
+            neighbors, edges, types = adjacency.in_neighbors, adjacency.in_edges, adjacency.in_types
+            for i in range(adjacency.in_offsets[u], adjacency.in_offsets[u + 1]):
+                yield neighbors[i], edges[i], types[i], False
+
+    def _valid(self, uids):
+        return {uid for uid in uids if 0 <= uid < self.adjacency.node_count}
+
+    def _edge(self, edge, type_id, along):
+        return edge, self.adjacency.types[type_id], along
+
+    def shortest_path(self, sources, targets, max_hops=None):
+        """
+        步数最少的路径（双向广度优先搜索），找不到时返回 None
+        """
+        sources, targets = self._valid(sources), self._valid(targets)
+        if sources & targets:
+            return Path([min(sources & targets)], [], 0)
+        # 节点 -> (步数, 前一个节点, 关系下标, 类型序号, 关系是否为 前一个节点 -> 该节点)
+        forward = {uid: (0, None, None, None, None) for uid in sources}
+        backward = {uid: (0, None, None, None, None) for uid in targets}
+        frontiers = {True: sorted(sources), False: sorted(targets)}
+        depth = {True: 0, False: 0}
+        while frontiers[True] and frontiers[False] and (max_hops is None or depth[True] + depth[False] < max_hops):
+            # 扩展节点较少的一侧，整层扩展完后取经过相遇点的最短路径
+            side = len(frontiers[True]) <= len(frontiers[False])
+            visited, other = (forward, backward) if side else (backward, forward)
+            depth[side] += 1
+            frontier = []
+            best = None
+            for u in frontiers[side]:
+                for v, edge, type_id, outgoing in self._steps(u, side):
+                    if v in visited:
+                        continue
+                    visited[v] = (depth[side], u, edge, type_id, outgoing)
+                    frontier.append(v)
+                    if v in other and (best is None or other[v][0] < other[best][0]):
+                        best = v
+            if best is not None:
+                return self._join(best, forward, backward)
+            frontiers[side] = frontier
+        return None
+
+    def _join(self, meet, forward, backward, cost=None):
+        """由双向搜索的相遇点拼出路径，cost 为 None 时代价为步数"""
+        nodes, edges = [meet], []
+        node = meet
+        while forward[node][1] is not None:
+            _, prev, edge, type_id, outgoing = forward[node]
+            nodes.append(prev)
+            edges.append(self._edge(edge, type_id, outgoing))
+            node = prev
+        nodes.reverse()
+        edges.reverse()
+        node = meet
+        while backward[node][1] is not None:
+            _, following, edge, type_id, outgoing = backward[node]
+            # 反向搜索记录的方向是 following -> node，与路径方向相反
+            nodes.append(following)
+            edges.append(self._edge(edge, type_id, not outgoing))
+            node = following
+        return Path(nodes, edges, len(edges) if cost is None else cost)
+
+    def cheapest_path(self, sources, targets, max_hops=None, banned_nodes=(), banned_edges=()):
+        """
+        代价最小的路径，找不到时返回 None
+
+        没有步数限制时从两端同时做 Dijkstra 搜索；有步数限制时同一节点可能以不同步数到达，
+        代价更高但步数更少的到达方式仍需保留，因此从起点单向搜索，只跳过步数不少于已出队记录的到达方式
+
+        Args:
+            banned_nodes: 不能经过的节点
+            banned_edges: 不能经过的关系（关系下标）
+        """
+        sources, targets = self._valid(sources) - set(banned_nodes), self._valid(targets)
+        if max_hops is None:
+            return self._bidirectional_dijkstra(sources, targets, banned_nodes, banned_edges)
+        # 搜索记录：(节点, 步数, 上一条记录, 关系下标, 类型序号, 关系是否为 上一个节点 -> 该节点)
+        labels = []
+        heap = []
+        for uid in sorted(sources):
+            heapq.heappush(heap, (0.0, 0, len(labels)))
+            labels.append((uid, 0, None, None, None, None))
+        settled = {}
+        best = {}
+        while heap:
+            cost, hops, label = heapq.heappop(heap)
+            u = labels[label][0]
+            if u in settled and (max_hops is None or hops >= settled[u]):
+                continue
+            settled[u] = hops
+            if u in targets:
+                return self._trace(labels, label, cost)
+            if max_hops is not None and hops >= max_hops:
+                continue
+            for v, edge, type_id, outgoing in self._steps(u):
+                if v == u or v in banned_nodes or edge in banned_edges:
+                    continue
+                if v in settled and (max_hops is None or hops + 1 >= settled[v]):
+                    continue
+                total = cost + self.type_costs[type_id]
+                if max_hops is None:
+                    if total >= best.get(v, float('inf')):
+                        continue
+                    best[v] = total
+                heapq.heappush(heap, (total, hops + 1, len(labels)))
+                labels.append((v, hops + 1, label, edge, type_id, outgoing))
+        return None
+
+    def _bidirectional_dijkstra(self, sources, targets, banned_nodes, banned_edges):
+        """
+        双向 Dijkstra：每次扩展队列较短的一侧，两侧队首代价之和不小于已知最短路径时停止
+        """
+        if sources & targets:
+            return Path([min(sources & targets)], [], 0.0)
+        # 节点 -> (已知最小代价, 前一个节点, 关系下标, 类型序号, 关系是否为 前一个节点 -> 该节点)
+        reached = {
+            True: {uid: (0.0, None, None, None, None) for uid in sources},
+            False: {uid: (0.0, None, None, None, None) for uid in targets}
+        }
+        heaps = {True: [(0.0, uid) for uid in sorted(sources)], False: [(0.0, uid) for uid in sorted(targets)]}
+        settled = {True: set(), False: set()}
+        best, meet = float('inf'), None
+        while heaps[True] and heaps[False] and heaps[True][0][0] + heaps[False][0][0] < best:
+            side = len(heaps[True]) <= len(heaps[False])
+            cost, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            this, other = reached[side], reached[not side]
+            for v, edge, type_id, outgoing in self._steps(u, side):
+                if v == u or v in banned_nodes or edge in banned_edges:
+                    continue
+                total = cost + self.type_costs[type_id]
+                if total < this.get(v, (float('inf'),))[0]:
+                    this[v] = (total, u, edge, type_id, outgoing)
+                    heapq.heappush(heaps[side], (total, v))
+                    if v in other and total + other[v][0] < best:
+                        best, meet = total + other[v][0], v
+        if meet is None:
+            return None
+        return self._join(meet, reached[True], reached[False], best)
+
+    def _trace(self, labels, label, cost):
+        nodes, edges = [], []
+        while label is not None:
+            node, _, previous, edge, type_id, outgoing = labels[label]
+            nodes.append(node)
+            if previous is not None:
+                edges.append(self._edge(edge, type_id, outgoing))
+            label = previous
+        nodes.reverse()
+        edges.reverse()
+        return Path(nodes, edges, cost)
+
+    def k_shortest_paths(self, sources, targets, k, max_hops=None):
+        """
+        代价最小的前 k 条不含重复节点的路径（Yen 算法），按 (代价, 步数) 排列；
+        有多个起点时分别搜索后合并
+        """
+        targets = self._valid(targets)
+        paths = []
+        for source in sorted(self._valid(sources)):
+            paths.extend(self._yen(source, targets, k, max_hops))
+        paths.sort(key=lambda path: (path.cost, path.hops, path.nodes))
+        return paths[:k]
+
+    def _yen(self, source, targets, k, max_hops):
+        first = self.cheapest_path([source], targets, max_hops)
+        if first is None:
+            return []
+        paths = [first]
+        seen = {first.key()}
+        candidates = []
+        while len(paths) < k:
+            last = paths[-1]
+            root_cost = 0.0
+            for i, spur in enumerate(last.nodes[:-1]):
+                root = last.nodes[:i + 1]
+                root_edges = [edge for edge, _, _ in last.edges[:i]]
+                # 与已找到的路径前 i 个节点和关系都相同时，不能再走它们的下一条关系；
+                # 两个节点之间可能有多条关系，只比较节点会误禁经由另一条关系到达的路径
+                banned_edges = {
+                    path.edges[i][0] for path in paths
+                    if path.hops > i and path.nodes[:i + 1] == root and [e for e, _, _ in path.edges[:i]] == root_edges
+                }
+                spur_path = self.cheapest_path(
+                    [spur], targets, None if max_hops is None else max_hops - i,
+                    banned_nodes=set(root[:-1]), banned_edges=banned_edges
+                )
+                if spur_path is not None:
+                    path = Path(root[:-1] + spur_path.nodes, last.edges[:i] + spur_path.edges, root_cost + spur_path.cost)
+                    if path.key() not in seen:
+                        seen.add(path.key())
+                        heapq.heappush(candidates, (path.cost, path.hops, len(seen), path))
+                root_cost += self.cost_of(last.edges[i][1])
+            if not candidates:
+                break
+            paths.append(heapq.heappop(candidates)[3])
+        return paths
+
+    def cost_of(self, type_name):
+        return self.type_costs[self.adjacency.types.index(type_name)]
+
+    def find(self, sources, targets, k=1, max_hops=None, weighted=False):
+        """
+        按参数选择搜索方式：k 为 1 且不按代价时用双向广度优先搜索，否则用 Dijkstra / Yen
+
+        Returns:
+            [Path]，找不到时为空列表
+        """
+        if k > 1:
+            return self.k_shortest_paths(sources, targets, k, max_hops)
+        path = self.cheapest_path(sources, targets, max_hops) if weighted else self.shortest_path(sources, targets, max_hops)
+        return [path] if path is not None else []
+
+def find_paths(base_dir, sources, targets, k=1, max_hops=None, costs=None, directed=False):
+    """
+    在网站目录的邻接索引中查询路径
+
+    Args:
+        sources, targets: 起点、终点的 uid 列表
+        costs: 关系类型 -> 代价；None 时按步数搜索，传入 TYPE_COSTS 或自定义代价时按代价搜索
+
+    Returns:
+        [Path]；尚未生成邻接索引时返回 None
+    """
+    adjacency = load_adjacency(base_dir)
+    if adjacency is None:
+        return None
+    with adjacency:
+        finder = PathFinder(adjacency, costs, directed)
+        return finder.find(sources, targets, k, max_hops, weighted=costs is not None)
+
+def resolve_names(completer, text):
+    """
+    把命令行中的节点名称转为 uid 列表
+
+    uid=123 直接指定节点；否则优先取名称完全相同的节点，没有时取名称（或拼音）以它开头的前几个节点
+
+    Returns:
+        (uid 列表, 匹配到的名称列表)
+    """
+    if text.startswith('uid='):
+        return [int(text[4:])], [text]
+    matches = completer.complete(text, limit=NAME_MATCH_LIMIT)
+    exact = [entry for entry in matches if completion_key(entry[0]) == completion_key(text)]
+    matches = exact or matches
+    return [uid for _, _, uids in matches for uid in uids], [name for name, _, _ in matches]
+
+def format_path(path, names):
+    """路径的文字表示：名称 -[类型]-> 名称 <-[类型]- 名称 ..."""
+    label = lambda uid: names.get(uid, f"uid={uid}")
+    parts = [label(path.nodes[0])]
+    for (_, type_name, along), node in zip(path.edges, path.nodes[1:]):
+        parts.append(f"-[{type_name}]->" if along else f"<-[{type_name}]-")
+        parts.append(label(node))
+    return ' '.join(parts)
+
+def _parse_costs(values):
+    costs = dict(TYPE_COSTS)
+    for value in values:
+        name, _, cost = value.rpartition('=')
+        if not name:
+            raise argparse.ArgumentTypeError(f"关系代价的格式应为 类型=代价: {value}")
+        costs[name] = float(cost)
+    return costs
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='查询两个节点之间的最短路径和关系链')
+    parser.add_argument('source', help='起点名称（可用拼音或首字母）或 uid=编号')
+    parser.add_argument('target', help='终点名称（可用拼音或首字母）或 uid=编号')
+    parser.add_argument('--k', type=int, default=1, help='返回的路径数（默认 1）')
+    parser.add_argument('--max-hops', type=int, help='路径的最大步数')
+    parser.add_argument('--weighted', action='store_true', help='按关系类型的代价搜索（默认按步数）')
+    parser.add_argument('--cost', action='append', default=[], metavar='类型=代价',
+                        help='指定关系类型的代价，可重复；指定后按代价搜索')
+    parser.add_argument('--directed', action='store_true', help='只沿关系方向搜索')
+    args = parser.parse_args()
+
+    weighted = args.weighted or bool(args.cost)
+    try:
+        costs = _parse_costs(args.cost) if weighted else None
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    completer = Autocomplete.load(base_dir)
+    adjacency = load_adjacency(base_dir)
+    if completer is None or adjacency is None:
+        print("尚未生成邻接索引或自动补全索引，请先运行 organize_data.py")
+        sys.exit(1)
+
+    names = {uid: name for name, _, uids in completer.index['entries'] for uid in uids}
+    ends = []
+    for text in (args.source, args.target):
+        try:
+            uids, matched = resolve_names(completer, text)
+        except ValueError:
+            parser.error(f"uid 必须为整数: {text}")
+        if not uids:
+            print(f"未找到节点: {text}")
+            sys.exit(1)
+        print(f"{text}: {', '.join(matched)}（{len(uids)} 个节点）")
+        ends.append(uids)
+
+    with adjacency:
+        finder = PathFinder(adjacency, costs, args.directed)
+        started = time.perf_counter()
+        paths = finder.find(ends[0], ends[1], args.k, args.max_hops, weighted)
+        elapsed = (time.perf_counter() - started) * 1000
+
+    if not paths:
+        limit = f"{args.max_hops} 步内" if args.max_hops is not None else ''
+        print(f"\n{limit}没有连接两者的路径（用时 {elapsed:.1f} ms）")
+        return
+    print(f"\n找到 {len(paths)} 条路径（用时 {elapsed:.1f} ms）：")
+    for number, path in enumerate(paths, 1):
+        print(f"{number}. {path.hops} 步，代价 {path.cost:g}：{format_path(path, names)}")
+
+if __name__ == '__main__':
+    main()
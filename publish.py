@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布静态资源
+把 data.json、数据分片、实体存储和边界文件压缩为紧凑 JSON（邻接索引等二进制文件原样发布），
+按内容哈希重命名后写入 dist/，
+并生成 .gz / .br 预压缩文件；asset-manifest.json 记录原路径到带哈希文件名的映射，
+页面通过 assets.js 解析实际地址。文件名随内容变化，服务器可以对 dist/ 设置长期缓存
+
+用法：
+    python publish.py              # 发布全部资源
+    python publish.py --no-brotli  # 不生成 .br 文件
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+from content_hash import write_if_changed
+from json_writer import encode
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 设置输出编码为UTF-8
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 要发布的资源（相对于网站根目录，可使用通配符）
+ASSETS = [
+    'data.json',
+    'data/*.json',
+    'data/*.bin',
+    'data/entities/*.json',
+    'data/search/*.json',
+    'data/search/terms/*.json',
+    'data/search/docs/*.json',
+    'six_cities_*.geojson',
+    'boundaries/*.json'
+]
+
+# 带哈希的文件所在目录，以及资源清单
+DIST_DIR = 'dist'
+ASSET_MANIFEST = 'asset-manifest.json'
+ASSET_MANIFEST_VERSION = 1
+
+# 文件名中保留的哈希位数
+HASH_LENGTH = 10
+
+def find_assets(base_dir):
+    """要发布的资源文件（相对路径，使用 / 分隔，排序）"""
+    files = set()
+    for pattern in ASSETS:
+        for path in glob.glob(os.path.join(base_dir, pattern)):
+            if os.path.isfile(path):
+                files.add(os.path.relpath(path, base_dir).replace(os.sep, '/'))
+    return sorted(files)
+
+def minify(file_path):
+    """读取 JSON 文件并重新编码为紧凑格式，其他文件原样读取"""
+    if not file_path.endswith(('.json', '.geojson')):
+        with open(file_path, 'rb') as f:
+            return f.read()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return encode(json.load(f))
+
+def hashed_name(path, data):
+    """带内容哈希的文件名，如 boundaries/亳州市.json -> boundaries/亳州市.3f2a9c0d1e.json"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+def compress(data, use_brotli=True):
+    """
+    生成预压缩内容
+
+    gzip 固定 mtime，相同内容得到相同的 .gz 文件
+
+    Returns:
+        扩展名 -> 压缩后的字节串
+    """
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if use_brotli and brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+def publish_asset(base_dir, path, use_brotli=True):
+    """
+    发布一个资源
+
+    文件名中的哈希由内容决定，已存在的同名文件及其压缩文件无需重新生成
+
+    Returns:
+        (清单条目, 实际写入的文件数)
+    """
+    data = minify(os.path.join(base_dir, path))
+    name = hashed_name(path, data)
+    target = os.path.join(base_dir, DIST_DIR, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    written = write_if_changed(target, data)
+    entry = {'file': f"{DIST_DIR}/{name}", 'bytes': len(data)}
+    suffixes = ['.gz'] + (['.br'] if use_brotli and brotli is not None else [])
+    if written or not all(os.path.exists(target + suffix) for suffix in suffixes):
+        for suffix, compressed in compress(data, use_brotli).items():
+            written += write_if_changed(target + suffix, compressed)
+    for suffix in suffixes:
+        entry[suffix[1:]] = os.path.getsize(target + suffix)
+    return entry, written
+
+def remove_stale(base_dir, keep):
+    """删除 dist/ 中不再被清单引用的文件（包括压缩文件）"""
+    removed = 0
+    dist_dir = os.path.join(base_dir, DIST_DIR)
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), base_dir).replace(os.sep, '/')
+            if path not in keep:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+def publish(base_dir, use_brotli=True):
+    """
+    发布全部资源并写入资源清单
+
+    Returns:
+        资源清单
+    """
+    assets = {}
+    written = 0
+    for path in find_assets(base_dir):
+        try:
+            assets[path], count = publish_asset(base_dir, path, use_brotli)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠ 跳过 {path}: {e}")
+            continue
+        written += count
+
+    keep = set()
+    for entry in assets.values():
+        keep.add(entry['file'])
+        keep.update(f"{entry['file']}.{kind}" for kind in ('gz', 'br') if kind in entry)
+    removed = remove_stale(base_dir, keep)
+
+    manifest = {'version': ASSET_MANIFEST_VERSION, 'assets': assets}
+    written += write_if_changed(os.path.join(base_dir, ASSET_MANIFEST), encode(manifest, pretty=True))
+
+    original = sum(os.path.getsize(os.path.join(base_dir, path)) for path in assets)
+    minified = sum(entry['bytes'] for entry in assets.values())
+    print(f"已发布 {len(assets)} 个资源到 {os.path.join(base_dir, DIST_DIR)}"
+          f"（写入 {written} 个文件，删除 {removed} 个旧文件）")
+    print(f"  原始大小: {original / 1024 / 1024:.2f} MB")
+    print(f"  压缩为紧凑 JSON: {minified / 1024 / 1024:.2f} MB")
+    for kind in ('gz', 'br'):
+        size = sum(entry.get(kind, 0) for entry in assets.values())
+        if size:
+            print(f"  .{kind}: {size / 1024 / 1024:.2f} MB")
+    return manifest
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='发布带内容哈希和预压缩文件的静态资源')
+    parser.add_argument('--no-brotli', action='store_true', help='不生成 .br 文件')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    use_brotli = not args.no_brotli
+    if use_brotli and brotli is None:
+        print("未安装 brotli（pip install brotli），只生成 .gz 文件")
+    publish(base_dir, use_brotli)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+// 全文检索索引（data/search/，由 organize_data.py 生成，格式见 search_index.py）
+// 查询只下载查询词项所在的倒排桶和排在前面的结果所在的文档块，耗时与数据总量基本无关；
+// 桶号使用 entity-store.js 中的 fnv1a，需要先加载 entity-store.js
+
+const SEARCH_DIR = 'data/search';
+// 中日韩统一表意文字，必须与 search_index.py 中的 _CJK 相同
+const SEARCH_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff';
+const SEARCH_TOKEN = new RegExp(`[${SEARCH_CJK}]+|[a-z0-9]+`, 'g');
+const SEARCH_CJK_CHAR = new RegExp(`^[${SEARCH_CJK}]`);
+
+let searchMetaPromise = null;
+const searchFiles = {};
+
+function normalizeSearchText(text) {
+    return String(text).normalize('NFKC').toLowerCase();
+}
+
+// 查询词项（去重）：两字以上的中文段用相邻两字，单字时用单字，英文和数字用整词
+function searchQueryTerms(text) {
+    const terms = [];
+    (normalizeSearchText(text).match(SEARCH_TOKEN) || []).forEach(run => {
+        const chars = Array.from(run);
+        if (SEARCH_CJK_CHAR.test(run) && chars.length > 1) {
+            for (let i = 0; i < chars.length - 1; i++) terms.push(chars[i] + chars[i + 1]);
+        } else {
+            terms.push(run);
+        }
+    });
+    return [...new Set(terms)];
+}
+
+// 加载索引中的一个文件（同一文件只请求一次），不存在时返回 fallback
+function fetchSearchFile(path, fallback) {
+    if (!searchFiles[path]) {
+        searchFiles[path] = fetchAsset(`${SEARCH_DIR}/${path}`).then(response => {
+            if (response.status === 404) return fallback;
+            if (!response.ok) {
+                throw new Error(`HTTP错误: ${response.status} ${response.statusText}`);
+            }
+            return response.json();
+        });
+        searchFiles[path].catch(() => { delete searchFiles[path]; });
+    }
+    return searchFiles[path];
+}
+
+function fetchSearchMeta() {
+    if (!searchMetaPromise) {
+        searchMetaPromise = fetchSearchFile('meta.json', null);
+        searchMetaPromise.catch(() => { searchMetaPromise = null; });
+    }
+    return searchMetaPromise;
+}
+
+// 查询索引，返回 [{ score, doc }]；doc.kind 为 'node'（带 uid）或 'relationship'（带 index、source_uid、target_uid）。
+// 先按匹配的查询词项数、再按分值之和排序，标题包含完整查询词的结果排在前面，与 search_index.search 一致。
+// 尚未生成索引时返回 null
+async function searchIndex(query, { limit = 20, kind = null } = {}) {
+    const meta = await fetchSearchMeta();
+    if (!meta) return null;
+    const terms = searchQueryTerms(query);
+    if (!terms.length) return [];
+
+    const postings = await Promise.all(terms.map(async term => {
+        const bucket = (fnv1a(term) % meta.bucket_count).toString(16).padStart(2, '0');
+        const terms = await fetchSearchFile(`terms/${bucket}.json`, {});
+        return terms[term] || [[], []];
+    }));
+    const matched = new Map();
+    const scores = new Map();
+    postings.forEach(([docs, values]) => {
+        docs.forEach((doc, i) => {
+            matched.set(doc, (matched.get(doc) || 0) + 1);
+            scores.set(doc, (scores.get(doc) || 0) + values[i]);
+        });
+    });
+    const ranked = [...scores.keys()].sort((a, b) =>
+        (matched.get(b) - matched.get(a)) || (scores.get(b) - scores.get(a)) || (a - b)
+    );
+
+    const results = [];
+    for (const doc of ranked) {
+        const chunk = await fetchSearchFile(`docs/${Math.floor(doc / meta.chunk_size)}.json`, []);
+        const info = chunk[doc % meta.chunk_size];
+        if (info && (!kind || info.kind === kind)) {
+            results.push({ score: Math.round(scores.get(doc) * 1000) / 1000, doc: info });
+            if (results.length >= limit) break;
+        }
+    }
+    const needle = normalizeSearchText(query).trim();
+    const contains = result => normalizeSearchText(result.doc.title).includes(needle);
+    return [...results.filter(contains), ...results.filter(result => !contains(result))];
+}
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点名称和描述的全文检索索引（data/search/ 目录）
+中文按单字和相邻两字（bigram）切分，英文和数字按词切分；倒排表按词项散列到固定数量的桶中，
+查询只需下载查询词所在的几个桶，文档信息按编号分块存放，只下载排在前面的结果所在的块，
+因此查询耗时与数据总量基本无关。相关度为按字段加权的 BM25，分值在构建时算好写入倒排表。
+前端对应的函数见 search-index.js
+
+文件：
+    meta.json：文档数、桶数、块大小等
+    terms/<桶号两位十六进制>.json：词项 -> [文档编号列表（升序）, 分值列表]
+    docs/<块号>.json：文档列表，每个文档为 {kind, uid 或 index, title, type/labels, text}
+
+用法：
+    python search_index.py 蒋介石          # 在已生成的索引中查询
+    python search_index.py 黄河 --limit 5
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+
+from content_hash import write_if_changed
+from entity_resolution import entity_name
+from entity_store import fnv1a
+from json_writer import encode
+
+# 设置输出编码为UTF-8
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 索引目录（相对于网站根目录）
+SEARCH_DIR = os.path.join('data', 'search')
+SEARCH_META = 'meta.json'
+FORMAT_VERSION = 1
+
+# 倒排表的桶数，search-index.js 从 meta.json 读取
+BUCKET_COUNT = 256
+# 每个文档块的文档数
+CHUNK_SIZE = 500
+
+# 字段权重：名称中的匹配比描述中的重要
+FIELD_WEIGHTS = {'name': 3.0, 'text': 1.0}
+# 作为描述检索的属性（节点和关系）
+DESCRIPTION_KEYS = ('描述', 'description', '关联解释', '关联词')
+# 文档信息中保存的描述长度
+SNIPPET_LENGTH = 80
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+
+# 中日韩统一表意文字（含扩展A区和兼容区），search-index.js 中的 SEARCH_CJK 必须相同
+_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN = re.compile(f'[{_CJK}]+|[a-z0-9]+')
+_CJK_CHAR = re.compile(f'[{_CJK}]')
+
+def normalize(text):
+    """全角转半角并转小写"""
+    return unicodedata.normalize('NFKC', str(text)).lower()
+
+def tokenize(text):
+    """
+    索引用的词项：中文连续段的每个字和相邻两字，英文和数字的整词
+    """
+    terms = []
+    for run in _TOKEN.findall(normalize(text)):
+        if _CJK_CHAR.match(run):
+            terms.extend(run)
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+def query_terms(text):
+    """
+    查询用的词项（去重）：两字以上的中文段只用相邻两字，单字时用单字
+    """
+    terms = []
+    for run in _TOKEN.findall(normalize(text)):
+        if _CJK_CHAR.match(run) and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return list(dict.fromkeys(terms))
+
+def term_bucket(term):
+    return fnv1a(term) % BUCKET_COUNT
+
+def _descriptions(container):
+    return [str(container[key]) for key in DESCRIPTION_KEYS if container.get(key) not in (None, '')]
+
+def collect_documents(all_data):
+    """
+    参与检索的文档：有名称或描述的节点，以及有描述的关系
+
+    Returns:
+        [(文档信息, {字段: 文本})]
+    """
+    documents = []
+    names = {}
+    for node in all_data['combined']['nodes']:
+        props = node['properties']
+        name = entity_name(props)
+        if name is not None:
+            names[node.get('uid')] = str(name)
+        descriptions = _descriptions(props)
+        if name is None and not descriptions:
+            continue
+        text = ' '.join(descriptions)
+        doc = {'kind': 'node', 'uid': node.get('uid'), 'title': str(name) if name is not None else text[:SNIPPET_LENGTH],
+               'labels': node['labels']}
+        if text:
+            doc['text'] = text[:SNIPPET_LENGTH]
+        documents.append((doc, {'name': str(name) if name is not None else '', 'text': text}))
+
+    for index, rel in enumerate(all_data['combined']['relationships']):
+        descriptions = _descriptions(rel.get('properties') or {})
+        if not descriptions:
+            continue
+        text = ' '.join(descriptions)
+        source, target = names.get(rel.get('source_uid'), ''), names.get(rel.get('target_uid'), '')
+        doc = {'kind': 'relationship', 'index': index, 'type': rel.get('type', ''),
+               'source_uid': rel.get('source_uid'), 'target_uid': rel.get('target_uid'),
+               'title': f"{source} {rel.get('type', '')} {target}".strip(), 'text': text[:SNIPPET_LENGTH]}
+        documents.append((doc, {'name': rel.get('type', ''), 'text': text}))
+    return documents
+
+def build_search_index(all_data, documents=None):
+    """
+    构建索引
+
+    Args:
+        documents: 已收集的文档（collect_documents 的结果），默认重新收集
+
+    Returns:
+        (meta, 桶号 -> {词项: [文档编号列表, 分值列表]}, 文档信息列表)
+    """
+    if documents is None:
+        documents = collect_documents(all_data)
+    frequencies = []
+    lengths = []
+    document_frequency = Counter()
+    for _, fields in documents:
+        weighted = Counter()
+        length = 0.0
+        for field, text in fields.items():
+            terms = tokenize(text)
+            length += FIELD_WEIGHTS[field] * len(terms)
+            for term in terms:
+                weighted[term] += FIELD_WEIGHTS[field]
+        frequencies.append(weighted)
+        lengths.append(length)
+        document_frequency.update(weighted.keys())
+
+    count = len(documents)
+    average = sum(lengths) / count if count else 0.0
+    postings = {}
+    for doc, (weighted, length) in enumerate(zip(frequencies, lengths)):
+        norm = K1 * (1 - B + B * length / average) if average else K1
+        for term, tf in weighted.items():
+            df = document_frequency[term]
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            score = round(idf * tf * (K1 + 1) / (tf + norm), 3)
+            docs, scores = postings.setdefault(term, ([], []))
+            docs.append(doc)
+            scores.append(score)
+
+    buckets = {}
+    for term in sorted(postings):
+        docs, scores = postings[term]
+        buckets.setdefault(term_bucket(term), {})[term] = [docs, scores]
+    meta = {
+        'version': FORMAT_VERSION,
+        'documents': count,
+        'terms': len(postings),
+        'bucket_count': BUCKET_COUNT,
+        'chunk_size': CHUNK_SIZE,
+        'data_version': all_data.get('metadata', {}).get('data_version')
+    }
+    return meta, buckets, [doc for doc, _ in documents]
+
+def _write_dir(directory, files):
+    """写入目录中的文件（文件名 -> 字节串），删除多余的旧文件，返回写入数"""
+    os.makedirs(directory, exist_ok=True)
+    written = sum(write_if_changed(os.path.join(directory, name), data) for name, data in files.items())
+    for name in os.listdir(directory):
+        if name.endswith('.json') and name not in files:
+            os.remove(os.path.join(directory, name))
+    return written
+
+def write_search_index(all_data, base_dir, built=None):
+    """
+    写入索引，内容未变化的文件不重写
+
+    Args:
+        built: 已构建的索引（build_search_index 的结果），默认重新构建；数据版本号总是取自 all_data
+
+    Returns:
+        (实际写入的文件数, 文档数, 词项数)
+    """
+    meta, buckets, docs = built or build_search_index(all_data)
+    meta = dict(meta, data_version=all_data.get('metadata', {}).get('data_version'))
+    search_dir = os.path.join(base_dir, SEARCH_DIR)
+    written = _write_dir(os.path.join(search_dir, 'terms'), {
+        f"{number:02x}.json": encode(bucket) for number, bucket in buckets.items()
+    })
+    written += _write_dir(os.path.join(search_dir, 'docs'), {
+        f"{start // CHUNK_SIZE}.json": encode(docs[start:start + CHUNK_SIZE])
+        for start in range(0, len(docs), CHUNK_SIZE)
+    })
+    written += write_if_changed(os.path.join(search_dir, SEARCH_META), encode(meta, pretty=True))
+    return written, meta['documents'], meta['terms']
+
+def _load(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except OSError:
+        return default
+
+def search(base_dir, query, limit=20, kind=None):
+    """
+    在已生成的索引中查询
+
+    先按匹配的查询词项数、再按分值之和排序；标题包含完整查询词的结果排在前面
+
+    Args:
+        kind: 只返回 'node' 或 'relationship'，默认都返回
+
+    Returns:
+        [(分值, 文档信息)]
+    """
+    search_dir = os.path.join(base_dir, SEARCH_DIR)
+    meta = _load(os.path.join(search_dir, SEARCH_META))
+    terms = query_terms(query)
+    if meta is None or not terms:
+        return []
+
+    buckets = {}
+    matched = Counter()
+    scores = Counter()
+    for term in terms:
+        number = fnv1a(term) % meta['bucket_count']
+        if number not in buckets:
+            buckets[number] = _load(os.path.join(search_dir, 'terms', f"{number:02x}.json"), {})
+        docs, values = buckets[number].get(term, ([], []))
+        for doc, score in zip(docs, values):
+            matched[doc] += 1
+            scores[doc] += score
+
+    chunks = {}
+    results = []
+    for doc in sorted(scores, key=lambda d: (-matched[d], -scores[d], d)):
+        chunk = doc // meta['chunk_size']
+        if chunk not in chunks:
+            chunks[chunk] = _load(os.path.join(search_dir, 'docs', f"{chunk}.json"), [])
+        info = chunks[chunk][doc % meta['chunk_size']]
+        if kind is None or info['kind'] == kind:
+            results.append((round(scores[doc], 3), info))
+            if len(results) >= limit:
+                break
+
+    needle = normalize(query).strip()
+    results.sort(key=lambda item: needle not in normalize(item[1]['title']))
+    return results
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='在 data/search/ 全文检索索引中查询')
+    parser.add_argument('query', help='查询词')
+    parser.add_argument('--limit', type=int, default=20, help='返回的结果数（默认 20）')
+    parser.add_argument('--kind', choices=('node', 'relationship'), help='只返回节点或关系')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    if not os.path.exists(os.path.join(base_dir, SEARCH_DIR, SEARCH_META)):
+        print("尚未生成检索索引，请先运行 organize_data.py")
+        sys.exit(1)
+    for score, doc in search(base_dir, args.query, args.limit, args.kind):
+        target = f"uid={doc['uid']}" if doc['kind'] == 'node' else f"关系 {doc['index']}"
+        print(f"{score:8.3f}  {doc['title']}  [{target}]  {doc.get('text', '')}")
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,25 @@
 // 统一的数据统计加载脚本
 
 async function loadStatsData() {
+    // 统计只需要汇总统计文件或分片清单中的 summary，不必下载完整数据
     try {
-        const response = await fetch('data.json');
-        const data = await response.json();
+        const stats = await fetchStats();
+        console.log('统计数据:', stats.summary);
+        return { ...stats.summary };
+    } catch (error) {
+        console.warn('统计文件加载失败，改为加载分片清单:', error);
+    }
+    
+    try {
+        const manifest = await fetchManifest();
+        console.log('统计数据:', manifest.summary);
+        return { ...manifest.summary };
+    } catch (error) {
+        console.warn('分片清单加载失败，改为加载完整数据:', error);
+    }
+    
+    try {
+        const data = await fetchGraphData('data.json');
         
         if (!data || !data.combined) {
             console.error('数据格式错误');
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+测试共用的夹具
+把项目根目录加入模块搜索路径，并在临时目录中生成一套小型数据源（Cypher 脚本、Neo4j JSON 导出、
+节点和关系CSV），目录结构与实际项目相同：网站根目录为 site/，数据源在其上级目录；
+run_node 在 node 中运行前端脚本，用于核对 Python 与 JavaScript 的实现一致，未安装 node 时跳过
+"""
+
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 固定的导入时间，两次整理的输出可以逐字节比较
+IMPORT_TIME = '2024-01-01T00:00:00'
+
+NODE = shutil.which('node')
+
+# 从标准输入读取 [项目目录, 脚本列表, 函数体]，依次载入脚本后运行函数体，把返回值以 JSON 输出；
+# fetch 读取当前目录（网站根目录）中的文件
+NODE_HARNESS = '''
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+global.fetch = async url => {
+    const file = decodeURIComponent(String(url));
+    const ok = fs.existsSync(file);
+    const body = ok ? fs.readFileSync(file) : null;
+    return {
+        ok, status: ok ? 200 : 404, statusText: ok ? 'OK' : 'Not Found',
+        json: async () => JSON.parse(body.toString('utf8')),
+        arrayBuffer: async () => body.buffer.slice(body.byteOffset, body.byteOffset + body.byteLength)
+    };
+};
+const [root, scripts, body] = JSON.parse(fs.readFileSync(0, 'utf8'));
+for (const file of scripts) vm.runInThisContext(fs.readFileSync(path.join(root, file), 'utf8'), { filename: file });
+vm.runInThisContext(`(async () => { ${body} })()`)
+    .then(result => process.stdout.write(JSON.stringify(result)))
+    .catch(error => { console.error(error); process.exit(1); });
+'''
+
+def run_node(body, scripts, cwd=ROOT_DIR):
+    """载入项目中的前端脚本后运行 JavaScript 函数体，返回其返回值"""
+    if NODE is None:
+        pytest.skip('未安装 node')
+    result = subprocess.run([NODE, '-e', NODE_HARNESS], cwd=cwd, input=json.dumps([ROOT_DIR, scripts, body]),
+                            capture_output=True, text=True, encoding='utf-8')
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+CYPHER_SCRIPT = '''// 花园口
+MATCH (n) DETACH DELETE n;
+CREATE (n1:人物:花园口 {name: "蒋介石", lat: 32.06004, lng: 118.79688});
+CREATE (n2:人物:花园口 {name: "商震", lat: 34.75, lng: 113.62});
+CREATE (n3:事件:花园口 {name: "花园口决堤", time: "1938年6月", description: "国民政府炸开黄河花园口大堤"});
+CREATE (n4:地点:花园口 {name: "郑州", lat: 34.7466, lng: 113.6253});
+MATCH (a:人物 {name: "蒋介石"}), (b:事件 {name: "花园口决堤"}) CREATE (a)-[:下令]->(b);
+MATCH (a:人物 {name: "商震"}), (b:事件 {name: "花园口决堤"}) CREATE (a)-[:执行]->(b);
+MATCH (a:事件 {name: "花园口决堤"}), (b:地点 {name: "郑州"}) CREATE (a)-[:发生于]->(b);
+'''
+
+def _node(identity, labels, props):
+    return {'identity': identity, 'labels': labels, 'properties': props}
+
+def _rel(identity, start, end, rel_type, props=None):
+    return {'identity': identity, 'start': start, 'end': end, 'type': rel_type, 'properties': props or {}}
+
+NEO4J_ROWS = [
+    {'n': _node(1, ['事件'], {'名称': '淝水之战', '描述': '东晋以少胜多击败前秦'}),
+     'r': _rel(10, 1, 2, '参战'),
+     'm': _node(2, ['人物'], {'名称': '谢玄'})},
+    {'n': _node(1, ['事件'], {'名称': '淝水之战', '描述': '东晋以少胜多击败前秦'}),
+     'r': _rel(11, 1, 3, '参战'),
+     'm': _node(3, ['人物'], {'名称': '苻坚'})},
+    {'n': _node(3, ['人物'], {'名称': '苻坚'}),
+     'r': _rel(12, 3, 4, '驻扎'),
+     'm': _node(4, ['地点'], {'名称': '寿阳'})}
+]
+
+CSV_FILES = {
+    'events.csv': [
+        ['事件ID', '事件名称', '时间', '描述', 'lng', 'lat'],
+        ['E001', '楚灭胡', '公元前496年', '楚国攻灭胡国，胡子豹被俘', '115.40309', '34.11858'],
+        ['E002', '召陵会盟', '公元前506年', '诸侯在召陵会盟，商议伐楚', '117.29132', '32.63767'],
+        ['E003', '郑州之战', '1944年4月', '豫中会战中的郑州战斗', 'abc', '34.75']
+    ],
+    'persons.csv': [
+        ['人物序号', '人物姓名', '权重', 'lng', 'lat'],
+        ['P001', '胡子豹', '78', '115.88047', '34.2344'],
+        ['P002', '楚昭王', '19', '116.63648', '33.80657'],
+        ['P003', '蒋介石', '95', '118.79688', '32.06004']
+    ],
+    'geo_coords.csv': [
+        ['LocationID', 'LocationName', 'lng', 'lat'],
+        ['L001', '胡子国', '115.6', '33.9'],
+        ['L002', '郑州', '113.6253', '34.7466']
+    ],
+    'rel_E&E.csv': [
+        ['事件ID1', '事件名称1', '事件ID2', '事件名称2', '关联类型', '关联词', '关联解释'],
+        ['E002', '召陵会盟', 'E001', '楚灭胡', '同一战争系列', '会盟伐楚', '召陵会盟之后楚国攻灭胡国']
+    ],
+    'rel_E&P.csv': [
+        ['关系ID', '事件ID', '查询', '事件名称', '人物序号', '唯一姓名', '人物姓名', '关系类型', '描述'],
+        ['N001', 'E001', '楚灭胡', '楚灭胡', 'P001', '胡子豹', '胡子豹', '被俘', '胡子豹在楚灭胡事件中被俘虏'],
+        ['N002', 'E001', '楚灭胡', '楚灭胡', 'P002', '楚昭王', '楚昭王', '发动', '楚昭王发动灭胡战争'],
+        ['N003', 'E003', '郑州之战', '郑州之战', 'P003', '蒋介石', '蒋介石', '指挥', '蒋介石指挥郑州作战'],
+        ['N004', 'E001', '楚灭胡', '楚灭胡', 'P999', '无名', '无名', '参与', '找不到的人物']
+    ],
+    'rel_E&L.csv': [
+        ['关系ID', '事件ID', '事件名称', '查询', 'LocationID', 'Location查询', 'LocationName', '关系类型', '描述'],
+        ['N005', 'E003', '郑州之战', '郑州之战', 'L002', '郑州', '郑州', '发生地', '郑州之战发生在郑州']
+    ],
+    'rel_P&L.csv': [
+        ['关系ID', '实体ID1', '实体1', '实体1后半部分', '实体ID2', '实体2', '实体2后半部分', '关系类型', '描述'],
+        ['N006', 'P001', '胡子豹', '胡子豹', 'L001', '胡子国', '胡子国', '统治', '胡子豹统治胡子国']
+    ],
+    'rel_P&P.csv': [
+        ['关系ID', '实体ID1', '实体1', '实体1后半部分', '实体ID2', '实体2', '实体2后半部分', '关系类型', '描述'],
+        ['N007', 'P002', '楚昭王', '楚昭王', 'P001', '胡子豹', '胡子豹', '俘虏', '楚昭王俘虏胡子豹']
+    ]
+}
+
+def write_csv(file_path, rows):
+    with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+def make_world(root):
+    """
+    在 root 下生成数据源和空的网站目录
+
+    Returns:
+        网站根目录（organize_data 的 base_dir）
+    """
+    data_dir = os.path.join(root, 'neo4j导入数据')
+    site_dir = os.path.join(root, 'site')
+    os.makedirs(data_dir)
+    os.makedirs(site_dir)
+    with open(os.path.join(root, '花园口决堤_Neo4j导入脚本_最终版.cypher'), 'w', encoding='utf-8') as f:
+        f.write(CYPHER_SCRIPT)
+    with open(os.path.join(data_dir, '淝水.json'), 'w', encoding='utf-8') as f:
+        json.dump(NEO4J_ROWS, f, ensure_ascii=False, indent=2)
+    for file_name, rows in CSV_FILES.items():
+        write_csv(os.path.join(data_dir, file_name), rows)
+    return site_dir
+
+def organize(base_dir, jobs=1, import_time=IMPORT_TIME, monolithic=False):
+    """按 organize_data.main 的步骤整理数据并写入全部输出，返回合并后的数据；monolithic 时同时写入 data.json"""
+    import organize_data
+    from geo_regions import REGION_FILE, load_regions
+    from id_allocator import IdAllocator
+
+    sources = organize_data.collect_sources(base_dir)
+    organize_data.assign_import_times(sources, import_time, os.path.join(base_dir, '.organize-state.json'))
+    results = organize_data.load_sources(sources, jobs)
+    allocator = IdAllocator.load(os.path.join(base_dir, 'node_ids.json'))
+    regions = load_regions(os.path.join(base_dir, REGION_FILE))
+    all_datasets, aggregates = organize_data.merge_sources(sources, results, import_time, allocator, regions)
+    organize_data.write_outputs(all_datasets, base_dir, aggregates=aggregates, monolithic=monolithic)
+    allocator.save()
+    return all_datasets
+
+@pytest.fixture
+def world(tmp_path):
+    """生成数据源，返回网站根目录"""
+    return make_world(str(tmp_path / 'world'))
+
+@pytest.fixture
+def site(world):
+    """整理过一次的网站根目录"""
+    organize(world)
+    return world
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""adjacency：CSR 索引中每个节点的区间与逐条扫描关系的结果一致，adjacency.js 读出相同的数组"""
+
+import os
+import random
+
+import pytest
+
+from adjacency import (ALIGNMENT, FORMAT_VERSION, MAX_TYPES, Adjacency, build_adjacency, load_adjacency,
+                       write_adjacency)
+from conftest import run_node
+from data_shards import load_site_data
+
+def _random_data(seed, node_count=60, edge_count=300):
+    rng = random.Random(seed)
+    uids = rng.sample(range(node_count + 20), node_count)
+    nodes = [{'id': f'n{uid}', 'uid': uid, 'labels': [], 'properties': {}} for uid in uids]
+    nodes.append({'id': 'no-uid', 'labels': [], 'properties': {}})
+    rels = []
+    for _ in range(edge_count):
+        rel = {'source': 'a', 'target': 'b', 'type': rng.choice(['参与', '位于', '认识', ''])}
+        if rng.random() < 0.95:
+            rel['source_uid'] = rng.choice(uids)
+        if rng.random() < 0.95:
+            rel['target_uid'] = rng.choice(uids)
+        if not rel['type']:
+            del rel['type']
+        rels.append(rel)
+    return {'combined': {'nodes': nodes, 'relationships': rels}, 'metadata': {'data_version': 7}}
+
+def _expected_edges(data, uid):
+    """逐条扫描关系，得到节点的出边和入边（各自按关系顺序）"""
+    rels = data['combined']['relationships']
+    valid = [(i, rel) for i, rel in enumerate(rels)
+             if rel.get('source_uid') is not None and rel.get('target_uid') is not None]
+    out = [(rel['target_uid'], i, rel.get('type', ''), True) for i, rel in valid if rel['source_uid'] == uid]
+    incoming = [(rel['source_uid'], i, rel.get('type', ''), False) for i, rel in valid if rel['target_uid'] == uid]
+    return out + incoming
+
+@pytest.mark.parametrize('seed', range(3))
+def test_csr_matches_edge_list(tmp_path, seed):
+    data = _random_data(seed)
+    written, node_count, edge_count = write_adjacency(data, str(tmp_path))
+    assert written
+    assert node_count == max(node['uid'] for node in data['combined']['nodes'] if 'uid' in node) + 1
+    assert not write_adjacency(data, str(tmp_path))[0]
+
+    with load_adjacency(str(tmp_path)) as adjacency:
+        assert (adjacency.node_count, adjacency.edge_count, adjacency.data_version) == (node_count, edge_count, 7)
+        assert edge_count == sum(len(_expected_edges(data, uid)) for uid in range(node_count)) // 2
+        for uid in range(node_count):
+            expected = _expected_edges(data, uid)
+            assert adjacency.edges_of(uid) == expected
+            assert adjacency.degree(uid) == len(expected)
+            assert adjacency.neighbors(uid) == list(dict.fromkeys(entry[0] for entry in expected))
+        assert adjacency.out_offsets[-1] == adjacency.in_offsets[-1] == edge_count
+
+def test_sections_are_aligned(tmp_path):
+    write_adjacency(_random_data(0), str(tmp_path))
+    path = os.path.join(str(tmp_path), 'data', 'adjacency.bin')
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:4] == b'KGCS' and len(data) % ALIGNMENT == 0
+    adjacency = Adjacency(path)
+    header_length = int.from_bytes(data[4:8], 'little')
+    assert (8 + header_length) % ALIGNMENT == 0
+    # 数组直接引用映射的文件，不复制
+    assert isinstance(adjacency.out_neighbors, memoryview)
+    adjacency.close()
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_bytes(b'{"a": 1}')
+    with pytest.raises(ValueError):
+        Adjacency(str(path))
+    assert load_adjacency(str(tmp_path / 'none')) is None
+
+def test_empty_graph():
+    node_count, types, sections = build_adjacency({'combined': {'nodes': [], 'relationships': []}})
+    assert (node_count, types, list(sections['out_offsets'])) == (0, [], [0])
+
+def test_rejects_too_many_types():
+    nodes = [{'id': 'a', 'uid': 0, 'labels': [], 'properties': {}}]
+    rels = [{'source_uid': 0, 'target_uid': 0, 'type': str(i)} for i in range(MAX_TYPES + 1)]
+    with pytest.raises(ValueError):
+        build_adjacency({'combined': {'nodes': nodes, 'relationships': rels}})
+    assert len(build_adjacency({'combined': {'nodes': nodes, 'relationships': rels[:-1]}})[1]) == MAX_TYPES
+
+def test_javascript_reads_the_same_index(site):
+    data = load_site_data(site)
+    with load_adjacency(site) as adjacency:
+        expected = {
+            'version': FORMAT_VERSION,
+            'nodeCount': adjacency.node_count,
+            'types': adjacency.types,
+            'edges': [[list(entry) for entry in adjacency.edges_of(uid)] for uid in range(adjacency.node_count)],
+            'neighbors': [adjacency.neighbors(uid) for uid in range(adjacency.node_count)]
+        }
+    result = run_node('''
+        const adjacency = await fetchAdjacency();
+        const uids = [...Array(adjacency.nodeCount).keys()];
+        return {
+            version: ADJACENCY_FORMAT_VERSION,
+            nodeCount: adjacency.nodeCount,
+            types: adjacency.types,
+            edges: uids.map(uid => adjacencyEdges(adjacency, uid).map(e => [e.neighbor, e.edge, e.type, e.outgoing])),
+            neighbors: uids.map(uid => adjacencyNeighbors(adjacency, uid)),
+            outOfRange: adjacencyEdges(adjacency, adjacency.nodeCount)
+        };''', ['assets.js', 'adjacency.js'], cwd=site)
+    assert result.pop('outOfRange') == []
+    assert result == expected
+    # 被合并节点的 uid 不回收，节点编号范围大于节点数
+    assert result['nodeCount'] > len(data['combined']['nodes'])
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""aggregates / geo_regions：data/stats.json 中的计数与逐个统计合并数据的结果一致，地区按边界判断"""
+
+import json
+import os
+from collections import Counter
+
+from aggregates import NO_COORDINATES, OUTSIDE_REGION, STATS_FILE
+from conftest import organize
+from data_shards import load_site_data
+from geo_regions import REGION_FILE, coordinates, load_regions, region_of
+
+# 郑州一带的正方形，中间挖去一个小方块；另一块为两个多边形组成的地区
+REGIONS = {
+    'type': 'FeatureCollection',
+    'features': [
+        {'type': 'Feature', 'properties': {'name': '郑州市'},
+         'geometry': {'type': 'Polygon', 'coordinates': [
+             [[113, 34], [114, 34], [114, 35], [113, 35], [113, 34]],
+             [[113.7, 34.7], [113.8, 34.7], [113.8, 34.8], [113.7, 34.8], [113.7, 34.7]]
+         ]}},
+        {'type': 'Feature', 'properties': {'name': '南京市'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [
+             [[[118, 31], [119, 31], [119, 33], [118, 33], [118, 31]]],
+             [[[100, 10], [101, 10], [101, 11], [100, 10]]]
+         ]}},
+        {'type': 'Feature', 'properties': {'name': '无边界'}, 'geometry': None}
+    ]
+}
+
+def _write_regions(site):
+    with open(os.path.join(site, REGION_FILE), 'w', encoding='utf-8') as f:
+        json.dump(REGIONS, f, ensure_ascii=False)
+    return load_regions(os.path.join(site, REGION_FILE))
+
+def test_region_lookup(tmp_path):
+    regions = _write_regions(str(tmp_path))
+    assert [region.name for region in regions] == ['郑州市', '南京市']
+    assert region_of(regions, 113.6253, 34.7466) == '郑州市'
+    assert region_of(regions, 113.75, 34.75) is None
+    assert region_of(regions, 118.79688, 32.06004) == '南京市'
+    assert region_of(regions, 100.9, 10.1) == '南京市'
+    assert region_of(regions, 100.1, 10.9) is None
+    assert coordinates({'经度': '113', '纬度': 34}) == (113.0, 34.0)
+    assert coordinates({'lng': 'abc', 'lat': 34}) is None
+    assert load_regions(str(tmp_path / 'none.geojson')) == []
+
+def test_stats_match_data(world, capsys):
+    regions = _write_regions(world)
+    organize(world)
+    capsys.readouterr()
+    with open(os.path.join(world, STATS_FILE), encoding='utf-8') as f:
+        stats = json.load(f)
+    data = load_site_data(world)
+    combined = data['combined']
+
+    assert stats['summary'] == combined['summary']
+    assert stats['labels'] == dict(Counter(label for node in combined['nodes'] for label in node['labels']))
+    assert stats['relationship_types'] == dict(Counter(rel['type'] for rel in combined['relationships']))
+    # 按数量从多到少排列
+    assert list(stats['labels'].values()) == sorted(stats['labels'].values(), reverse=True)
+    for entry, dataset in zip(stats['datasets'], data['datasets']):
+        assert entry['dataset'] == dataset['dataset']
+        assert entry['labels'] == dict(Counter(label for node in dataset['nodes'] for label in node['labels']))
+        assert entry['relationship_types'] == dict(Counter(rel['type'] for rel in dataset['relationships']))
+
+    csv_edges = Counter(rel['data_source'] for rel in combined['relationships'] if 'data_source' in rel)
+    descriptions = data['metadata']['data_sources']
+    for file_name, rows in data['csv_relationships'].items():
+        assert stats['csv_files'][file_name] == {'description': descriptions[file_name], 'rows': len(rows),
+                                                 'edges': csv_edges[file_name]}
+    # N004 的人物不存在，只连出 3 条边
+    assert stats['csv_files']['rel_E&P.csv']['edges'] == 3
+
+    expected = {}
+    for node in combined['nodes']:
+        point = coordinates(node['properties'])
+        name = NO_COORDINATES if point is None else region_of(regions, *point) or OUTSIDE_REGION
+        entry = expected.setdefault(name, Counter())
+        entry['total'] += 1
+        for key in ('events', 'persons', 'locations', 'times'):
+            entry[key] += node['uid'] in {n['uid'] for n in combined[key]}
+    assert list(stats['regions']) == [name for name in ('郑州市', '南京市', OUTSIDE_REGION, NO_COORDINATES)
+                                      if name in expected]
+    for name, counts in stats['regions'].items():
+        assert {key: value for key, value in counts.items() if value} == dict(+expected[name])
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""autocomplete：前缀补全与逐个比较全部名称的结果一致，排序规则和 autocomplete.js 的补全结果相同"""
+
+import json
+import random
+
+import pytest
+
+import autocomplete
+from autocomplete import (SCAN_LIMIT, TOP_K, Autocomplete, build_autocomplete, collect_entries, completion_key,
+                          name_keys, write_autocomplete)
+from conftest import run_node
+
+def _data(names, weights=None, relationships=()):
+    nodes = []
+    for uid, name in enumerate(names):
+        props = {'name': name}
+        if weights and weights[uid] is not None:
+            props['权重'] = weights[uid]
+        nodes.append({'id': f'n{uid}', 'uid': uid, 'labels': ['人物'], 'properties': props})
+    rels = [{'source_uid': s, 'target_uid': t, 'type': '认识'} for s, t in relationships]
+    return {'combined': {'nodes': nodes, 'relationships': rels}}
+
+def _random_data(seed, count=400):
+    rng = random.Random(seed)
+    chars = '张王李赵子豹胡楚昭蒋介石a b'
+    names = ['张' + ''.join(rng.choice(chars) for _ in range(rng.randint(0, 3))) for _ in range(count // 2)]
+    names += [''.join(rng.choice(chars) for _ in range(rng.randint(1, 4))) for _ in range(count // 2)]
+    weights = [rng.choice([None, None, 1, 5, 5.5, '12', 'abc', float('inf'), float('nan')]) for _ in names]
+    rels = [(rng.randrange(count), rng.randrange(count)) for _ in range(count)]
+    return _data(names, weights, rels)
+
+def _brute_force(index, keys, text, limit):
+    """逐个比较全部名称的补全键，keys 为各名称的 name_keys"""
+    prefix = completion_key(text)
+    if not prefix:
+        return []
+    return [tuple(entry) for entry, entry_keys in zip(index['entries'], keys)
+            if any(key.startswith(prefix) for key in entry_keys)][:limit]
+
+@pytest.mark.parametrize('seed', range(2))
+def test_complete_matches_brute_force(seed):
+    index = json.loads(json.dumps(build_autocomplete(_random_data(seed)), ensure_ascii=False))
+    # 短前缀的区间超过 SCAN_LIMIT，使用预先计算的结果
+    assert index['top'] and all(len(ids) <= TOP_K for ids in index['top'].values())
+    completer = Autocomplete(index)
+    keys = [name_keys(name) for name, _, _ in index['entries']]
+    prefixes = {key[:length] for key in index['keys'] for length in (1, 2, 3)} | {'不存在', ' ', 'Ｚ'}
+    for prefix in sorted(prefixes):
+        for limit in (None, 3, TOP_K * 3):
+            expected = _brute_force(index, keys, prefix, TOP_K if limit is None else limit)
+            assert completer.complete(prefix, limit) == expected, prefix
+    assert any(sum(key.startswith(prefix) for key in index['keys']) > SCAN_LIMIT for prefix in index['top'])
+
+def test_ranking():
+    names = ['甲', '乙', '丙', '丁', '戊', '甲']
+    weights = [float('inf'), 3, None, 2.5, float('nan'), 7]
+    entries = collect_entries(_data(names, weights, [(2, 3), (2, 4), (1, 2)]))
+    # 有 权重 的名称在前（按权重），其余按度数；inf、nan 视为没有权重；同名节点中排序最靠前的决定名称的位置
+    assert entries == [['甲', 7, [5, 0]], ['乙', 3, [1]], ['丁', 2.5, [3]], ['丙', 3, [2]], ['戊', 1, [4]]]
+
+def test_pinyin_keys():
+    pytest.importorskip('pypinyin')
+    assert name_keys('蒋介石') == ['蒋介石', 'jiangjieshi', 'jjs']
+    completer = Autocomplete(build_autocomplete(_data(['蒋介石', '蒋经国', '江'])))
+    assert [name for name, _, _ in completer.complete('jj')] == ['蒋介石', '蒋经国']
+    assert [name for name, _, _ in completer.complete("Jiang Jie")] == ['蒋介石']
+
+def test_warns_without_pinyin(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(autocomplete, 'lazy_pinyin', None)
+    assert name_keys('蒋介石') == ['蒋介石']
+    write_autocomplete(_data(['蒋介石']), str(tmp_path))
+    assert 'pypinyin' in capsys.readouterr().out
+    assert Autocomplete.load(str(tmp_path)).complete('jjs') == []
+
+def test_javascript_completes_the_same(tmp_path):
+    data = _random_data(3)
+    write_autocomplete(data, str(tmp_path))
+    completer = Autocomplete.load(str(tmp_path))
+    prefixes = sorted({key[:length] for key in completer.index['keys'][::7] for length in (1, 2)}) + ['', '张 ', 'Ａ']
+    expected = [[list(entry) for entry in completer.complete(prefix, limit)]
+                for prefix in prefixes for limit in (None, 25)]
+    result = run_node(f'''
+        const index = await fetchAutocomplete();
+        const prefixes = {json.dumps(prefixes, ensure_ascii=False)};
+        return prefixes.flatMap(prefix => [completeName(index, prefix), completeName(index, prefix, 25)])
+            .map(list => list.map(({{ name, weight, uids }}) => [name, weight, uids]));
+    ''', ['assets.js', 'autocomplete.js'], cwd=str(tmp_path))
+    assert result == expected
+    assert Autocomplete.load(str(tmp_path / 'none')) is None
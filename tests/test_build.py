@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""build：步骤依赖图、按内容哈希跳过、可选输入"""
+
+import pytest
+
+import build
+import publish
+
+# 把 input 复制为 output，并在 runs.log 中记下运行过的脚本
+COPY_SCRIPT = '''import sys
+src, dst = sys.argv[1], sys.argv[2]
+with open(src, encoding='utf-8') as f:
+    text = f.read()
+with open(dst, 'w', encoding='utf-8') as f:
+    f.write(text.upper())
+with open('runs.log', 'a', encoding='utf-8') as f:
+    f.write(dst + '\\n')
+'''
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    (tmp_path / 'copy.py').write_text(COPY_SCRIPT, encoding='utf-8')
+    (tmp_path / 'src.txt').write_text('a', encoding='utf-8')
+    stages = [
+        {'name': 'first', 'script': 'copy.py', 'args': ['src.txt', 'a.txt'],
+         'inputs': ['src.txt', 'extra.txt'], 'optional': ['extra.txt'], 'outputs': ['a.txt']},
+        {'name': 'second', 'script': 'copy.py', 'args': ['a.txt', 'b.txt'],
+         'inputs': ['a.txt'], 'outputs': ['b.txt']}
+    ]
+    monkeypatch.setattr(build, 'BASE_DIR', str(tmp_path))
+    monkeypatch.setattr(build, 'STATE_FILE', str(tmp_path / '.build-state.json'))
+    monkeypatch.setattr(build, 'STAGES', stages)
+    return tmp_path
+
+def _runs(root):
+    log = root / 'runs.log'
+    runs = log.read_text(encoding='utf-8').split() if log.exists() else []
+    log.unlink(missing_ok=True)
+    return runs
+
+def test_rebuilds_only_changed_stages(pipeline, capsys):
+    assert build.build() == []
+    assert _runs(pipeline) == ['a.txt', 'b.txt']
+    assert (pipeline / 'b.txt').read_text(encoding='utf-8') == 'A'
+
+    assert build.build() == []
+    assert _runs(pipeline) == []
+
+    # 内容不变的改写不触发重跑，内容变化时下游一并重跑
+    (pipeline / 'src.txt').write_text('a', encoding='utf-8')
+    assert build.build() == [] and _runs(pipeline) == []
+    (pipeline / 'src.txt').write_text('b', encoding='utf-8')
+    assert build.build() == []
+    assert _runs(pipeline) == ['a.txt', 'b.txt']
+
+    # 可选输入出现时也会触发重跑
+    (pipeline / 'extra.txt').write_text('x', encoding='utf-8')
+    assert build.build(['first']) == []
+    assert _runs(pipeline) == ['a.txt']
+
+    # 输出被改动时重跑
+    (pipeline / 'b.txt').write_text('edited', encoding='utf-8')
+    assert build.build() == []
+    assert _runs(pipeline) == ['b.txt']
+    capsys.readouterr()
+
+def test_missing_inputs(pipeline, capsys):
+    (pipeline / 'src.txt').unlink()
+    assert build.build() == ['first', 'second']
+    assert _runs(pipeline) == []
+    out = capsys.readouterr().out
+    assert '缺少输入 src.txt' in out and '上游步骤失败' in out
+
+def test_dry_run_accepts_upstream_outputs(pipeline, capsys):
+    assert build.build(dry_run=True) == []
+    assert _runs(pipeline) == []
+    assert capsys.readouterr().out.count('需要运行') == 2
+
+def test_project_stage_graph():
+    graph = build.build_graph(build.STAGES)
+    assert 'extract_city_boundaries' in graph['organize_data']
+    assert 'organize_data' in graph['publish']
+    # extract_data 与 organize_data 输出同一组文件，但不在默认构建中
+    names = [stage['name'] for stage in build.select_stages(build.STAGES, graph, [])]
+    assert 'extract_data' not in names and 'publish' in names
+
+def test_published_assets_are_declared():
+    """publish.py 发布的每一类文件都是 publish 步骤的输入、organize_data 步骤的输出"""
+    by_name = {stage['name']: stage for stage in build.STAGES}
+    for pattern in publish.ASSETS:
+        assert pattern in by_name['publish']['inputs']
+        if pattern.startswith('data'):
+            assert pattern in by_name['organize_data']['outputs']
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""columnar_export：Arrow / Parquet 表与合并数据中的节点、边和 CSV 关系一致"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from columnar_export import COLUMNAR_DIR, load_table, table_name, write_columnar
+from data_shards import load_site_data
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_tables_match_data(site, fmt, capsys):
+    data = load_site_data(site)
+    assert write_columnar(data, site, fmt) == (2 + len(data['csv_relationships']),) * 2
+    assert write_columnar(data, site, fmt)[0] == 0
+    capsys.readouterr()
+
+    nodes = {row['uid']: row for row in load_table(site, 'nodes', fmt).to_pylist()}
+    assert len(nodes) == len(data['combined']['nodes'])
+    persons = {node['uid'] for node in data['combined']['persons']}
+    for node in data['combined']['nodes']:
+        row = nodes[node['uid']]
+        props = node['properties']
+        assert (row['id'], row['labels'], row['data_source']) == (str(node['id']), node['labels'], props['data_source'])
+        assert row['persons'] == (node['uid'] in persons)
+        assert row['lat'] == props.get('lat') and row['权重'] == props.get('权重')
+        extra = json.loads(row['properties']) if row['properties'] else {}
+        assert extra == {k: v for k, v in props.items()
+                         if k not in ('lat', 'lng', '权重', 'data_source', 'import_time')}
+
+    edges = load_table(site, 'edges', fmt).to_pylist()
+    rels = data['combined']['relationships']
+    assert [(e['source_uid'], e['target_uid'], e['type']) for e in edges] == [
+        (rel.get('source_uid'), rel.get('target_uid'), rel['type']) for rel in rels
+    ]
+
+    for file_name, rows in data['csv_relationships'].items():
+        table = load_table(site, table_name(file_name), fmt).to_pylist()
+        assert table == [row['raw_data'] for row in rows]
+
+def test_stale_tables_are_removed(site, capsys):
+    data = load_site_data(site)
+    write_columnar(data, site)
+    del data['csv_relationships']['rel_P&P.csv']
+    write_columnar(data, site)
+    capsys.readouterr()
+    assert 'csv_rel_P&P.arrow' not in os.listdir(os.path.join(site, COLUMNAR_DIR))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""csv_ingest：按 schema 转换类型、汇总错误行、按ID索引连接关系"""
+
+from conftest import write_csv
+from csv_ingest import (CSV_NODE_SCHEMAS, CSV_REL_SCHEMAS, build_id_index, iter_csv_edges,
+                        iter_csv_nodes, make_provenance)
+
+def test_node_types_and_errors(tmp_path):
+    path = tmp_path / 'persons.csv'
+    write_csv(path, [
+        ['人物序号', '人物姓名', '权重', 'lng', 'lat'],
+        ['P001', '胡子豹', '78', '115.5', '34.25'],
+        ['', '无序号', 'x', '', '33']
+    ])
+    provenance = make_provenance('persons.csv', '2024-01-01T00:00:00')
+    errors = []
+    nodes = list(iter_csv_nodes(str(path), CSV_NODE_SCHEMAS['persons.csv'], provenance, errors))
+
+    assert [node['id'] for node in nodes] == ['P001', 'person_1']
+    assert all(node['labels'] == ['人物'] for node in nodes)
+    first, second = nodes[0]['properties'], nodes[1]['properties']
+    assert first['权重'] == 78 and first['lng'] == 115.5 and first['lat'] == 34.25
+    assert first['data_source'] == 'persons.csv' and first['import_time'] == '2024-01-01T00:00:00'
+    # 转换失败置为空值，空字符串保持原样
+    assert second['权重'] is None and second['lng'] == '' and second['lat'] == 33.0
+    assert errors == [(3, '权重', 'x')]
+
+def test_header_only_file(tmp_path):
+    path = tmp_path / 'events.csv'
+    write_csv(path, [['事件ID', '事件名称']])
+    provenance = make_provenance('events.csv')
+    assert list(iter_csv_nodes(str(path), CSV_NODE_SCHEMAS['events.csv'], provenance)) == []
+
+def _node(node_id, label, props, uid=None):
+    node = {'id': node_id, 'labels': [label], 'properties': props}
+    if uid is not None:
+        node['uid'] = uid
+    return node
+
+def test_edges_join_on_id_columns():
+    nodes = [
+        _node('E001', '事件', {'事件ID': 'E001'}, uid=0),
+        _node('P001', '人物', {'人物序号': 'P001'}, uid=1),
+        # 不同标签的同名ID不会混淆
+        _node('P002', '事件', {'事件ID': 'P002'}, uid=2)
+    ]
+    rows = [
+        {'事件ID': 'E001', '人物序号': 'P001', '关系类型': '被俘', '描述': 'd'},
+        {'事件ID': 'E001', '人物序号': 'P002', '关系类型': '发动'},
+        {'事件ID': 'E404', '人物序号': 'P404', '关系类型': '参与'}
+    ]
+    unresolved = {}
+    provenance = make_provenance('rel_E&P.csv', 't')
+    edges = list(iter_csv_edges(rows, CSV_REL_SCHEMAS['rel_E&P.csv'], build_id_index(nodes), provenance, unresolved))
+
+    assert len(edges) == 1
+    edge = edges[0]
+    assert (edge['source'], edge['target'], edge['type']) == ('E001', 'P001', '被俘')
+    assert (edge['source_uid'], edge['target_uid']) == (0, 1)
+    assert edge['properties'] == {'关系类型': '被俘', '描述': 'd'}
+    assert edge['data_source'] == 'rel_E&P.csv'
+    assert unresolved == {'source': 1, 'target': 2}
+
+def test_type_from_first_nonempty_column():
+    nodes = [_node('E1', '事件', {'事件ID': 'E1'}), _node('E2', '事件', {'事件ID': 'E2'})]
+    rows = [
+        {'事件ID1': 'E1', '事件ID2': 'E2', '关联词': '', '关联类型': '同一战争'},
+        {'事件ID1': 'E2', '事件ID2': 'E1', '关联词': '响应', '关联类型': '同一战争'}
+    ]
+    edges = list(iter_csv_edges(rows, CSV_REL_SCHEMAS['rel_E&E.csv'], build_id_index(nodes), make_provenance('x', 't')))
+    assert [edge['type'] for edge in edges] == ['同一战争', '响应']
+    # 节点没有 uid 时不记录端点编号
+    assert 'source_uid' not in edges[0]
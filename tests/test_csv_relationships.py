@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""organize_data：CSV关系连接为图中的边"""
+
+from data_shards import load_site_data
+from organize_data import join_csv_relationships
+
+def test_join_reports_unresolved(capsys):
+    nodes = [
+        {'id': 'E1', 'uid': 0, 'labels': ['事件'], 'properties': {'事件ID': 'E1'}},
+        {'id': 'P1', 'uid': 1, 'labels': ['人物'], 'properties': {'人物序号': 'P1'}}
+    ]
+    csv_relationships = {
+        'rel_E&P.csv': [
+            {'raw_data': {'事件ID': 'E1', '人物序号': 'P1', '关系类型': '参与'}},
+            {'raw_data': {'事件ID': 'E2', '人物序号': 'P1', '关系类型': '参与'}}
+        ],
+        # 没有 schema 的文件不参与连接
+        'other.csv': [{'raw_data': {}}]
+    }
+    edges, unresolved = join_csv_relationships(csv_relationships, nodes, {'rel_E&P.csv': 't'})
+    assert [(e['source_uid'], e['target_uid'], e['type'], e['import_time']) for e in edges] == [(0, 1, '参与', 't')]
+    assert unresolved == {'rel_E&P.csv': {'source': 1, 'target': 0}}
+    assert '1 个起点' in capsys.readouterr().out
+
+def test_csv_edges_in_output(site):
+    data = load_site_data(site)
+    nodes = {node['uid']: node for node in data['combined']['nodes']}
+    csv_edges = [rel for rel in data['combined']['relationships'] if rel.get('data_source', '').startswith('rel_')]
+    # 7 行关系中有 1 行的人物不存在
+    assert len(csv_edges) == 7
+    for rel in csv_edges:
+        assert rel['source_uid'] in nodes and rel['target_uid'] in nodes
+        assert nodes[rel['source_uid']]['id'] == rel['source']
+        assert nodes[rel['target_uid']]['id'] == rel['target']
+    # 原始行仍保留在 csv_relationships 中
+    assert sum(len(rows) for rows in data['csv_relationships'].values()) == 8
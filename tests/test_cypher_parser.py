@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""cypher_parser：词法单元、块边界、MATCH 绑定、反向关系和语法错误"""
+
+import io
+
+import pytest
+
+from cypher_parser import CypherSyntaxError, iter_cypher_records, parse_cypher_file, tokenize
+
+SCRIPT = '''// 注释 "不是字符串"
+MATCH (n) DETACH DELETE n;
+/* 多行
+   注释 */
+CREATE (a:人物:花园口 {name: "蒋介石", lat: 32.06, 权重: -3, 别名: ['中正', "介石"], 在世: false, 备注: null});
+CREATE (`b`:事件 {name: 'O\\'Brien\\n', time: date("1938-06-09"), 规模: 1.5e3});
+MATCH (x:人物 {name: "蒋介石"}), (y:事件 {name: "O'Brien\\n"})
+CREATE (x)-[:下令 {顺序: 1}]->(y), (y)<-[r:涉及]-(x);
+CREATE (p:人物 {name: "张三"})-[:认识]->(q:人物 {name: "李四"})
+'''
+
+def _write(tmp_path, text):
+    path = tmp_path / 'script.cypher'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_tokenize_values():
+    tokens = list(tokenize(io.StringIO('CREATE (a {x: -2.5e1, y: "a\\u4e2d\\"b"}) <-'), chunk_size=3))
+    assert tokens == [
+        ('name', 'CREATE'), ('punct', '('), ('name', 'a'), ('punct', '{'),
+        ('name', 'x'), ('punct', ':'), ('number', -25.0), ('punct', ','),
+        ('name', 'y'), ('punct', ':'), ('string', 'a中"b'), ('punct', '}'), ('punct', ')'), ('arrow', '<-')
+    ]
+
+def test_records(tmp_path):
+    nodes, rels = parse_cypher_file(_write(tmp_path, SCRIPT))
+
+    assert [node['id'] for node in nodes] == ['a', 'b', 'p', 'q']
+    props = nodes[0]['properties']
+    assert nodes[0]['labels'] == ['人物', '花园口']
+    assert props == {'name': '蒋介石', 'lat': 32.06, '权重': -3, '别名': ['中正', '介石'], '在世': False, '备注': None}
+    assert nodes[1]['properties'] == {'name': "O'Brien\n", 'time': 'date("1938-06-09")', '规模': 1500.0}
+
+    # MATCH 绑定的变量按属性匹配，反向箭头交换起点和终点
+    assert [(rel['type'], rel['source'], rel['target']) for rel in rels[:2]] == [
+        ('下令', {'name': '蒋介石'}, {'name': "O'Brien\n"}),
+        ('涉及', {'name': '蒋介石'}, {'name': "O'Brien\n"})
+    ]
+    assert rels[0]['source_labels'] == ['人物'] and rels[0]['properties'] == {'顺序': 1}
+    # 同一条 CREATE 中创建的节点按节点ID引用
+    assert (rels[2]['source'], rels[2]['source_var'], rels[2]['target_var']) == ({}, 'p', 'q')
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64])
+def test_chunk_boundaries(tmp_path, chunk_size):
+    path = _write(tmp_path, SCRIPT)
+    assert list(iter_cypher_records(path, chunk_size)) == list(iter_cypher_records(path))
+
+def test_bindings_reset_after_semicolon(tmp_path):
+    script = 'MATCH (x:人物 {name: "甲"});\nCREATE (x)-[:认识]->(y:人物 {name: "乙"});'
+    nodes, rels = parse_cypher_file(_write(tmp_path, script))
+    assert [node['id'] for node in nodes] == ['y']
+    assert rels[0]['source'] == {} and rels[0]['source_var'] == 'x'
+
+@pytest.mark.parametrize('script', [
+    'CREATE (a:人物 {name: "未闭合});',
+    'CREATE (a:人物 {name "甲"});',
+    'CREATE (a)-[:认识]->(b',
+    'CREATE (a {x: #})'
+])
+def test_syntax_errors(tmp_path, script):
+    with pytest.raises(CypherSyntaxError):
+        parse_cypher_file(_write(tmp_path, script))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""data_delta：旧数据应用补丁后与重新构建的数据相同，Python 与 data-schema.js 的结果一致"""
+
+import copy
+import json
+import os
+
+import pytest
+
+from conftest import CSV_FILES, organize, run_node, write_csv
+from data_delta import DELTA_DIR, DELTA_INDEX, apply_delta, relationship_key
+from data_schema import CATEGORY_KEYS
+from data_shards import load_site_data
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _key(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+def _normalize(data):
+    """补丁不保证记录顺序，按 uid 和内容排序后比较"""
+    data = copy.deepcopy(data)
+    for group in [data['combined']] + data['datasets']:
+        for key in ('nodes',) + CATEGORY_KEYS:
+            if key in group:
+                group[key].sort(key=_key)
+        if 'relationships' in group:
+            group['relationships'].sort(key=_key)
+    return data
+
+def _edit_sources(world):
+    data_dir = os.path.join(os.path.dirname(world), 'neo4j导入数据')
+    persons = copy.deepcopy(CSV_FILES['persons.csv'])
+    persons[1][1] = '胡子豹（胡国国君）'
+    persons.append(['P004', '沈尹戌', '40', '114.1', '32.5'])
+    write_csv(os.path.join(data_dir, 'persons.csv'), persons)
+    rels = copy.deepcopy(CSV_FILES['rel_P&P.csv'])
+    rels.append(['N008', 'P004', '沈尹戌', '沈尹戌', 'P002', '楚昭王', '楚昭王', '辅佐', '沈尹戌辅佐楚昭王'])
+    write_csv(os.path.join(data_dir, 'rel_P&P.csv'), rels)
+    os.remove(os.path.join(data_dir, 'rel_E&E.csv'))
+    os.remove(os.path.join(data_dir, 'geo_coords.csv'))
+
+@pytest.fixture
+def versions(world, capsys):
+    """(旧数据, 新数据, 补丁)"""
+    organize(world)
+    old = load_site_data(world)
+    _edit_sources(world)
+    organize(world)
+    capsys.readouterr()
+    new = load_site_data(world)
+    index = _read(os.path.join(world, DELTA_DIR, DELTA_INDEX))
+    assert index['version'] == 2
+    assert [(entry['from'], entry['to']) for entry in index['patches']] == [(1, 2)]
+    patch = _read(os.path.join(world, DELTA_DIR, index['patches'][0]['file']))
+    return old, new, patch
+
+def test_patch_reproduces_rebuild(versions):
+    old, new, patch = versions
+    assert old['metadata']['data_version'] == 1 and new['metadata']['data_version'] == 2
+    # 补丁只包含变化的记录
+    # 新增 P004；P001 改名，n4 不再合并 L002；L001 删除
+    assert [entry['node']['id'] for entry in patch['nodes']['added']] == ['P004']
+    assert sorted(entry['node']['id'] for entry in patch['nodes']['changed']) == ['P001', 'n4']
+    assert len(patch['nodes']['removed']) == 1
+    assert patch['csv_relationships']['removed'] == ['rel_E&E.csv']
+
+    patched = apply_delta(copy.deepcopy(old), patch)
+    assert _normalize(patched) == _normalize(new)
+    with pytest.raises(ValueError):
+        apply_delta(patched, patch)
+
+def test_javascript_applies_the_same_patch(world, versions):
+    old, new, patch = versions
+    js = run_node(f'return fetchDataUpdate({json.dumps(old, ensure_ascii=False)});',
+                  ['assets.js', 'data-schema.js'], cwd=world)
+    assert _normalize(js) == _normalize(apply_delta(copy.deepcopy(old), patch))
+    # 已是最新版本时原样返回，没有所需补丁时返回 null
+    assert run_node(f'return fetchDataUpdate({{metadata: {{data_version: 2}}}});',
+                    ['assets.js', 'data-schema.js'], cwd=world) == {'metadata': {'data_version': 2}}
+    assert run_node('return fetchDataUpdate({metadata: {data_version: 0}});',
+                    ['assets.js', 'data-schema.js'], cwd=world) is None
+
+def test_relationship_keys_match_javascript():
+    rels = [{'source': 'a', 'target': 'b', 'type': '认识', 'source_uid': 3, 'target_uid': 0},
+            {'source': 'a', 'target': 'b'},
+            {'source': {'name': '甲'}, 'target': 'b', 'type': '位于', 'target_uid': None}]
+    assert run_node(f'return {json.dumps(rels, ensure_ascii=False)}.map(relationshipKey);',
+                    ['data-schema.js']) == [relationship_key(rel) for rel in rels]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""data_schema：紧凑格式的 data.json 还原后与合并数据一致，Python 与 data-schema.js 还原结果相同"""
+
+import json
+import os
+
+from conftest import organize, run_node
+from data_schema import SCHEMA_VERSION, load_data
+from data_shards import write_data
+
+def _plain(value):
+    return json.loads(json.dumps(value, ensure_ascii=False))
+
+def _by_uid(data):
+    data['combined']['nodes'].sort(key=lambda node: node['uid'])
+    return data
+
+def test_round_trip(world, capsys):
+    expected = _plain(organize(world, monolithic=True))
+    with open(os.path.join(world, 'data.json'), encoding='utf-8') as f:
+        compact = json.load(f)
+    capsys.readouterr()
+
+    assert compact['schema_version'] == SCHEMA_VERSION
+    # 节点只保存一次，数据集和类别列表只保存 uid，来源信息保存在 sources 中
+    assert len(compact['nodes']) == len(expected['combined']['nodes'])
+    assert all(isinstance(uid, int) for dataset in compact['datasets'] for uid in dataset['nodes'])
+    assert all('data_source' not in node['properties'] for node in compact['nodes'] if 'src' in node)
+
+    assert _by_uid(load_data(os.path.join(world, 'data.json'))) == _by_uid(expected)
+
+def test_legacy_schema_reads_the_same(world, tmp_path, capsys):
+    all_data = organize(world, monolithic=True)
+    legacy_dir = tmp_path / 'legacy'
+    legacy_dir.mkdir()
+    write_data(all_data, str(legacy_dir), legacy=True)
+    capsys.readouterr()
+    with open(legacy_dir / 'data.json', encoding='utf-8') as f:
+        assert 'schema_version' not in json.load(f)
+    assert (_by_uid(load_data(str(legacy_dir / 'data.json')))
+            == _by_uid(load_data(os.path.join(world, 'data.json'))))
+
+def test_javascript_expands_the_same(world, capsys):
+    organize(world, monolithic=True)
+    capsys.readouterr()
+    expanded = run_node("return expandData(JSON.parse(require('fs').readFileSync('data.json', 'utf8')));",
+                        ['data-schema.js'], cwd=world)
+    assert expanded == load_data(os.path.join(world, 'data.json'))
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""data_shards：清单与分片文件一致，分片拼回的数据与 data.json 相同，默认不写 data.json，失效分片被删除"""
+
+import json
+import os
+
+from conftest import organize, run_node
+from data_schema import expand_csv_relationships, expand_node, expand_relationship, load_data
+from data_shards import MANIFEST_FILE, SHARD_DIR, load_shards, load_site_data, write_data
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _key(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+def test_manifest_matches_shards(world, capsys):
+    site = world
+    organize(site, monolithic=True)
+    capsys.readouterr()
+    manifest = _read(os.path.join(site, SHARD_DIR, MANIFEST_FILE))
+    data = load_data(os.path.join(site, 'data.json'))
+    sources = manifest['sources']
+    nodes = {}
+    relationships = []
+    for entry in manifest['shards']:
+        path = os.path.join(site, SHARD_DIR, entry['file'])
+        assert os.path.getsize(path) == entry['bytes']
+        shard = _read(path)
+        assert shard['kind'] == entry['kind']
+        records = shard[entry['kind']]
+        if entry['kind'] == 'csv_relationships':
+            rows = expand_csv_relationships(records, sources)
+            assert sum(map(len, rows.values())) == entry['count']
+            assert rows == data['csv_relationships']
+            continue
+        assert len(records) == entry['count']
+        if entry['kind'] == 'nodes':
+            for node in records:
+                nodes[node['uid']] = expand_node(node, sources)
+        else:
+            relationships.extend(expand_relationship(rel, sources) for rel in records)
+
+    # 每个节点和关系恰好出现在分片中，内容与 data.json 相同
+    assert nodes == {node['uid']: node for node in data['combined']['nodes']}
+    assert sorted(map(_key, relationships)) == sorted(map(_key, data['combined']['relationships']))
+    assert manifest['summary'] == data['combined']['summary']
+
+    # load_shards 还原的合并数据与 data.json 相同（数据集中的节点按分片顺序排列）
+    shards = load_shards(site)
+    assert shards['combined'] == data['combined']
+    assert {key: shards[key] for key in ('metadata', 'csv_relationships')} == \
+        {key: data[key] for key in ('metadata', 'csv_relationships')}
+    for dataset, expected in zip(shards['datasets'], data['datasets']):
+        assert sorted(node['uid'] for node in dataset['nodes']) == sorted(node['uid'] for node in expected['nodes'])
+        assert dataset == dict(expected, nodes=dataset['nodes'])
+    # 同一节点在各类别列表中是同一个对象
+    by_uid = {node['uid']: node for node in shards['combined']['nodes']}
+    assert all(node is by_uid[node['uid']] for node in shards['combined']['persons'])
+
+def test_data_json_is_opt_in(site, capsys):
+    # 默认只写分片，并删除上次留下的 data.json
+    assert not os.path.exists(os.path.join(site, 'data.json'))
+    data = load_site_data(site)
+    write_data(data, site, monolithic=True)
+    assert load_data(os.path.join(site, 'data.json'))['combined'] == data['combined']
+    assert write_data(data, site)[0] == 0
+    assert not os.path.exists(os.path.join(site, 'data.json'))
+    # 没有分片时读取 data.json
+    write_data(data, site, monolithic=True)
+    os.remove(os.path.join(site, SHARD_DIR, MANIFEST_FILE))
+    assert load_site_data(site)['combined'] == data['combined']
+    capsys.readouterr()
+
+def test_javascript_assembles_shards(site):
+    assembled = run_node('return fetchShardedData(null, true);', ['assets.js', 'data-schema.js'], cwd=site)
+    assert assembled == load_shards(site)
+    events = run_node("return fetchShardedData(['events']);", ['assets.js', 'data-schema.js'], cwd=site)
+    assert events['combined']['events'] == assembled['combined']['events']
+    assert events['combined']['relationships'] == [] and 'csv_relationships' not in events
+
+def test_unchanged_shards_are_not_rewritten_and_stale_ones_removed(site, capsys):
+    data = load_shards(site)
+    assert write_data(data, site)[0] == 0
+
+    removed = data['datasets'].pop(0)
+    gone = {node['uid'] for node in removed['nodes']}
+    data['combined']['nodes'] = [node for node in data['combined']['nodes'] if node['uid'] not in gone]
+    for key in ('events', 'persons', 'locations', 'times'):
+        data['combined'][key] = [node for node in data['combined'][key] if node['uid'] not in gone]
+    data['combined']['relationships'] = [
+        rel for rel in data['combined']['relationships'] if rel not in removed['relationships']
+    ]
+    write_data(data, site)
+    capsys.readouterr()
+
+    files = [entry['file'] for entry in _read(os.path.join(site, SHARD_DIR, MANIFEST_FILE))['shards']]
+    assert not any(name.startswith(removed['dataset'] + '.') for name in files)
+    assert not any(name.startswith(removed['dataset'] + '.') for name in os.listdir(os.path.join(site, SHARD_DIR)))
+    assert all(os.path.exists(os.path.join(site, SHARD_DIR, name)) for name in files)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""entity_resolution：分块后的聚类与两两比较全部节点的结果相同；合并后关系两端指向代表节点"""
+
+import os
+import random
+
+from conftest import organize
+from data_shards import load_site_data
+from entity_resolution import (MAX_DISTANCE_KM, UnionFind, apply_resolution, distance_km, entity_kind,
+                               entity_name, find_duplicates, merge_cluster, normalize_name)
+from geo_regions import coordinates
+from knowledge_graph import KnowledgeGraph
+
+NAMES = ['郑州', '鄭州', '郑 州', '开封', '胡子豹', '胡子-豹', '商震']
+KINDS = [['地点'], ['人物'], ['事件', '花园口'], ['其他']]
+
+def _random_nodes(seed, count=200):
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(count):
+        props = {'data_source': rng.choice(['a.cypher', 'b.json', 'c.csv'])}
+        props[rng.choice(['name', '名称', 'LocationName'])] = rng.choice(NAMES)
+        if rng.random() < 0.8:
+            props['lng'] = 113 + rng.random() * 1.5
+            props['lat'] = 34 + rng.random() * 1.5
+        if rng.random() < 0.2:
+            props['时间'] = rng.choice(['1938年', '1944年'])
+        nodes.append({'id': f'x{i}', 'uid': i, 'labels': rng.choice(KINDS), 'properties': props})
+    return nodes
+
+def _brute_force(nodes):
+    """两两比较全部节点，再按序号顺序合并"""
+    pairs = []
+    for i, a in enumerate(nodes):
+        for j in range(i):
+            b = nodes[j]
+            pa, pb = a['properties'], b['properties']
+            kind = entity_kind(a['labels'])
+            if kind is None or kind != entity_kind(b['labels']):
+                continue
+            if normalize_name(entity_name(pa)) != normalize_name(entity_name(pb)):
+                continue
+            if pa['data_source'] == pb['data_source']:
+                continue
+            point_a, point_b = coordinates(pa), coordinates(pb)
+            near = point_a and point_b and distance_km(point_a, point_b) <= MAX_DISTANCE_KM
+            if kind == 'locations' and point_a and point_b and not near:
+                continue
+            if pa.get('时间') and pb.get('时间') and pa['时间'] != pb['时间']:
+                continue
+            # 人物、事件还要有坐标或时间相同
+            if kind != 'locations' and not near and not (pa.get('时间') and pa.get('时间') == pb.get('时间')):
+                continue
+            pairs.append((j, i))
+    uf = UnionFind(len(nodes), [node['properties']['data_source'] for node in nodes])
+    for j, i in sorted(pairs):
+        uf.union(j, i)
+    clusters = {}
+    for i in range(len(nodes)):
+        clusters.setdefault(uf.find(i), []).append(i)
+    return sorted(members for members in clusters.values() if len(members) > 1)
+
+def test_blocking_matches_brute_force():
+    for seed in range(5):
+        nodes = _random_nodes(seed)
+        clusters, comparisons = find_duplicates(nodes)
+        assert sorted(clusters) == _brute_force(nodes)
+        assert comparisons < len(nodes) * (len(nodes) - 1) // 2
+
+def test_cluster_has_one_node_per_source():
+    # a 与 b、b 与 c 分别匹配，但 a、c 来自同一数据源，不能经由 b 归为一类
+    nodes = [{'id': f'x{i}', 'uid': i, 'labels': ['地点'], 'properties': {'name': '郑州', 'data_source': source}}
+             for i, source in enumerate(['a.cypher', 'b.json', 'a.cypher', 'c.csv'])]
+    assert find_duplicates(nodes)[0] == [[0, 1, 3]]
+    uf = UnionFind(3, ['a', 'b', 'a'])
+    assert uf.union(0, 1) and not uf.union(1, 2) and uf.union(1, 0)
+    assert uf.find(2) == 2
+
+def test_people_need_a_second_attribute():
+    def person(i, source, **props):
+        return {'id': f'p{i}', 'uid': i, 'labels': ['人物'], 'properties': dict(name='张三', data_source=source, **props)}
+    # 只有名称相同的人物不合并；坐标相近或另有属性相同时合并
+    assert find_duplicates([person(0, 'a'), person(1, 'b')])[0] == []
+    assert find_duplicates([person(0, 'a', lng=113.6, lat=34.7), person(1, 'b', lng=118.8, lat=32.1)])[0] == []
+    assert find_duplicates([person(0, 'a', lng=113.6, lat=34.7), person(1, 'b', 经度='113.61', 纬度='34.7')])[0] == [[0, 1]]
+    assert find_duplicates([person(0, 'a', 籍贯='河南'), person(1, 'b', 籍贯='河南', 时间='1938年')])[0] == [[0, 1]]
+    # 地点仍只按名称和距离判断
+    place = {'id': 'l', 'uid': 2, 'labels': ['地点'], 'properties': {'name': '张三', 'data_source': 'b'}}
+    assert find_duplicates([dict(person(0, 'a'), labels=['地点']), place])[0] == [[0, 1]]
+
+def test_normalize_name():
+    assert normalize_name('郑 州') == normalize_name('郑州') == normalize_name('“郑州”')
+    assert normalize_name('ＡＢ·c') == 'abc'
+
+def test_merge_cluster():
+    first = {'id': 'n4', 'uid': 3, 'labels': ['地点', '花园口'],
+             'properties': {'name': '郑州', 'lat': None, 'data_source': 'a.cypher'}}
+    other = {'id': 'L002', 'uid': 15, 'labels': ['地点', '城市'],
+             'properties': {'LocationName': '郑州', 'lat': 34.7, 'data_source': 'geo.csv'}}
+    merged = merge_cluster([first, other])
+    assert merged['labels'] == ['地点', '花园口', '城市']
+    assert merged['properties'] == {'name': '郑州', 'lat': 34.7, 'data_source': 'a.cypher', 'LocationName': '郑州'}
+    assert merged['merged_from'] == [{'uid': 15, 'id': 'L002', 'data_source': 'geo.csv'}]
+    assert (merged['id'], merged['uid']) == ('n4', 3)
+    assert first['properties']['lat'] is None
+
+def test_relationships_point_to_representatives(world, capsys):
+    organize(world)
+    capsys.readouterr()
+    data = load_site_data(world)
+    nodes = {node['uid']: node for node in data['combined']['nodes']}
+    # P003 并入 n1，L002 并入 n4
+    assert nodes[0]['merged_from'][0]['id'] == 'P003' and nodes[3]['merged_from'][0]['id'] == 'L002'
+    assert 13 not in nodes and 15 not in nodes
+    assert data['metadata']['entity_resolution']['merged_nodes'] == 2
+    for rel in data['combined']['relationships']:
+        for side in ('source', 'target'):
+            node = nodes[rel[f'{side}_uid']]
+            if isinstance(rel[side], str):
+                assert rel[side] == node['id']
+    for dataset in data['datasets']:
+        assert all(node['uid'] in nodes for node in dataset['nodes'])
+
+def test_apply_resolution_does_not_modify_inputs():
+    a = {'id': 'a', 'uid': 0, 'labels': ['人物'], 'properties': {'name': '甲', '时间': '1938年', 'data_source': 'x'}}
+    b = {'id': 'b', 'uid': 1, 'labels': ['人物'], 'properties': {'name': '甲', '时间': '1938年', 'data_source': 'y'}}
+    rel = {'source': 'b', 'target': 'b', 'type': '自指', 'source_uid': 1, 'target_uid': 1}
+    dataset = {'dataset': 'y', 'nodes': [b], 'relationships': [rel]}
+    all_data = {'datasets': [dataset], 'combined': {'nodes': [a, b], 'relationships': [rel]}}
+    clusters, _ = find_duplicates(all_data['combined']['nodes'])
+    assert apply_resolution(all_data, clusters) == 1
+    resolved = all_data['combined']['relationships'][0]
+    assert (resolved['source'], resolved['target'], resolved['source_uid'], resolved['target_uid']) == ('a', 'a', 0, 0)
+    assert all_data['datasets'][0]['relationships'][0] is resolved
+    assert all_data['datasets'][0]['nodes'][0]['id'] == 'a'
+    assert rel['source'] == 'b' and dataset['nodes'] == [b]
+
+def test_summaries_are_recomputed():
+    a = {'id': 'a', 'uid': 0, 'labels': ['地点', '时间'], 'properties': {'name': '郑州', 'data_source': 'x'}}
+    b = {'id': 'b', 'uid': 1, 'labels': ['地点'], 'properties': {'name': '郑州', 'data_source': 'y'}}
+    graph = KnowledgeGraph.from_nodes([b], [], 'y')
+    combined = KnowledgeGraph.from_nodes([a, b])
+    all_data = {'datasets': [{'dataset': 'y', 'summary': graph.summary(), 'nodes': [b], 'relationships': []}],
+                'combined': {'nodes': [a, b], 'relationships': [], 'summary': combined.summary(partial=True),
+                             'locations': [a, b], 'times': [a]}}
+    apply_resolution(all_data, find_duplicates(all_data['combined']['nodes'])[0])
+    # 代表节点带来了 时间 标签，数据集和合并数据的统计随之变化
+    assert all_data['datasets'][0]['summary'] == {'total_nodes': 1, 'total_relationships': 0, 'events': 0,
+                                                  'persons': 0, 'locations': 1, 'times': 1}
+    assert all_data['combined']['summary']['total_nodes'] == 1
+    assert [node['id'] for node in all_data['combined']['locations']] == ['a']
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""entity_store：FNV-1a 分桶与 entity-store.js 一致，按ID、properties.id 和合并前的ID都能查到节点"""
+
+import os
+
+from conftest import organize, run_node
+from data_shards import load_site_data
+from entity_store import BUCKET_COUNT, ENTITY_DIR, bucket_of, fnv1a, lookup, write_entity_store
+
+KEYS = ['', 'a', 'foobar', 'n1', 'P003', '蒋介石', '花园口决堤', '𠀀甲', 'L002']
+
+def test_fnv1a_known_values():
+    # ASCII 字符的 UTF-16 码元与字节相同，结果即标准 32 位 FNV-1a
+    assert fnv1a('') == 0x811c9dc5
+    assert fnv1a('a') == 0xe40c292c
+    assert fnv1a('foobar') == 0xbf9cf968
+    assert all(0 <= bucket_of(key) < BUCKET_COUNT for key in KEYS)
+    assert bucket_of(42) == bucket_of('42')
+
+def test_javascript_hash_matches():
+    hashes = run_node(f'return {KEYS!r}.map(key => [fnv1a(key), entityBucketOf(key)]);', ['entity-store.js'])
+    assert hashes == [[fnv1a(key), bucket_of(key)] for key in KEYS]
+
+def test_lookup_finds_every_node(site):
+    nodes = load_site_data(site)['combined']['nodes']
+    for node in nodes:
+        assert node in lookup(site, node['id'])
+    # 实体消解后 P003 并入 n1，L002 并入 n4，按原ID仍能查到合并后的节点
+    assert [node['id'] for node in lookup(site, 'P003')] == ['n1']
+    assert [node['id'] for node in lookup(site, 'L002')] == ['n4']
+    assert lookup(site, '不存在') == []
+
+def test_javascript_lookup_matches(site):
+    keys = ['n1', 'P003', 'E001', '1', '不存在']
+    found = run_node(f'return Promise.all({keys!r}.map(key => fetchEntities(key)));',
+                     ['assets.js', 'entity-store.js'], cwd=site)
+    assert found == [lookup(site, key) for key in keys]
+
+def test_empty_buckets_are_removed(world, capsys):
+    organize(world)
+    capsys.readouterr()
+    store_dir = os.path.join(world, ENTITY_DIR)
+    node = {'id': 'only', 'labels': [], 'properties': {}}
+    assert write_entity_store([node], world) == (1, 1)
+    assert os.listdir(store_dir) == [f'{bucket_of("only"):02x}.json']
+    assert write_entity_store([node], world) == (0, 1)
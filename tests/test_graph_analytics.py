@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""graph_analytics：PageRank、介数中心性和连通分量与 networkx 的结果一致，稀疏矩阵与纯 Python 实现结果相同"""
+
+import random
+
+import pytest
+
+import graph_analytics
+from conftest import run_node
+from graph_analytics import (BETWEENNESS_SAMPLES, _neighbor_lists, approximate_betweenness, build_analytics,
+                             connected_components, load_analytics, node_metrics, pagerank)
+
+nx = pytest.importorskip('networkx')
+
+def _random_graph(seed, node_count=80, edge_count=120):
+    """随机图：部分 uid 没有节点，含多重边、自环和孤立节点"""
+    rng = random.Random(seed)
+    present = [rng.random() < 0.9 for _ in range(node_count)]
+    uids = [u for u in range(node_count) if present[u]]
+    edges = [(rng.choice(uids), rng.choice(uids)) for _ in range(edge_count)]
+    return present, edges
+
+def _multigraph(present, edges, self_loops=True):
+    graph = nx.MultiGraph()
+    graph.add_nodes_from(u for u, p in enumerate(present) if p)
+    graph.add_edges_from((s, t) for s, t in edges if self_loops or s != t)
+    return graph
+
+@pytest.fixture(params=['scipy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'scipy':
+        pytest.importorskip('scipy')
+    else:
+        monkeypatch.setattr(graph_analytics, 'sparse', None)
+    return request.param
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pagerank_matches_networkx(seed, backend):
+    present, edges = _random_graph(seed)
+    edges = [(s, t) for s, t in edges if s != t]
+    ranks, iterations = pagerank(present, edges)
+    expected = nx.pagerank(_multigraph(present, edges), alpha=graph_analytics.DAMPING, tol=1e-14, max_iter=1000)
+    assert iterations < graph_analytics.MAX_ITERATIONS
+    assert sum(ranks) == pytest.approx(1.0)
+    for u, p in enumerate(present):
+        assert ranks[u] == pytest.approx(expected[u], abs=1e-9) if p else ranks[u] == 0.0
+
+def test_pagerank_backends_agree_with_self_loops(monkeypatch):
+    pytest.importorskip('scipy')
+    present, edges = _random_graph(7)
+    sparse_ranks, _ = pagerank(present, edges)
+    monkeypatch.setattr(graph_analytics, 'sparse', None)
+    python_ranks, _ = pagerank(present, edges)
+    assert sparse_ranks == pytest.approx(python_ranks, abs=1e-12)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_exact_betweenness_matches_networkx(seed):
+    present, edges = _random_graph(seed)
+    values, samples = approximate_betweenness(present, _neighbor_lists(len(present), edges))
+    assert samples == sum(present) <= BETWEENNESS_SAMPLES
+    expected = nx.betweenness_centrality(nx.Graph(_multigraph(present, edges, self_loops=False)), normalized=True)
+    for u, p in enumerate(present):
+        assert values[u] == pytest.approx(expected[u], abs=1e-12) if p else values[u] == 0.0
+
+def test_sampled_betweenness_is_close():
+    # 节点多于抽样数时按抽样比例放大，结果接近精确值且可复现
+    present, edges = _random_graph(0, node_count=400, edge_count=900)
+    neighbors = _neighbor_lists(len(present), edges)
+    values, samples = approximate_betweenness(present, neighbors)
+    assert samples == BETWEENNESS_SAMPLES
+    assert approximate_betweenness(present, neighbors)[0] == values
+    expected = nx.betweenness_centrality(nx.Graph(_multigraph(present, edges, self_loops=False)), normalized=True)
+    top = sorted(expected, key=expected.get, reverse=True)[:10]
+    assert sum(values[u] for u in top) == pytest.approx(sum(expected[u] for u in top), rel=0.2)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_components_match_networkx(seed, backend):
+    present, edges = _random_graph(seed, edge_count=50)
+    component, sizes = connected_components(present, _neighbor_lists(len(present), edges), edges)
+    groups = sorted((sorted(group) for group in nx.connected_components(_multigraph(present, edges))),
+                    key=lambda group: (-len(group), group[0]))
+    assert sizes == [len(group) for group in groups]
+    for number, group in enumerate(groups):
+        assert all(component[u] == number for u in group)
+    assert all(component[u] is None for u, p in enumerate(present) if not p)
+
+def test_site_analytics(site):
+    analytics = load_analytics(site)
+    assert analytics['data_version'] == 1
+    assert analytics['component_sizes'] == [5, 5, 4]
+    assert analytics['betweenness']['exact']
+    # 被合并的 P003（uid 13）没有指标，关系都连到了 n1（uid 0）
+    assert node_metrics(analytics, 13) is None and node_metrics(analytics, 10 ** 6) is None
+    assert node_metrics(analytics, 0)['degree'] == 2
+    persons = analytics['rankings']['persons']
+    pageranks = analytics['nodes']['pagerank']
+    assert [pageranks[u] for u in persons] == sorted((pageranks[u] for u in persons), reverse=True)
+    assert build_analytics({'combined': {'nodes': [], 'relationships': []}})['component_sizes'] == []
+
+    ordered = run_node('''
+        const analytics = await fetchAnalytics();
+        const nodes = [{uid: 2}, {uid: 999}, ...analytics.rankings.persons.map(uid => ({uid})).reverse()];
+        return orderByRanking(nodes, analytics.rankings.persons).map(node => node.uid);
+    ''', ['assets.js', 'data-schema.js'], cwd=site)
+    assert ordered == persons + [2, 999]
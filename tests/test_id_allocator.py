@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""id_allocator：稠密、稳定、按作用域区分的节点编号；Cypher 变量重复使用、同一文件中ID重复时不合并节点"""
+
+import json
+import os
+
+from conftest import CSV_FILES, organize, write_csv
+from cypher_parser import parse_cypher_file
+from data_shards import load_site_data
+from id_allocator import IdAllocator
+
+def test_allocation_is_dense_and_stable(tmp_path):
+    path = str(tmp_path / 'node_ids.json')
+    allocator = IdAllocator.load(path)
+    assert [allocator.allocate('甲', key) for key in ('a', 'b', 'a')] == [0, 1, 0]
+    # 不同作用域中的同名ID是不同节点
+    assert allocator.allocate('乙', 'a') == 2
+    assert allocator.lookup('乙', 'b') is None
+    allocator.save()
+
+    reloaded = IdAllocator.load(path)
+    assert reloaded.lookup('甲', 'b') == 1
+    assert not reloaded.changed
+    # 已分配的编号不回收，新编号接在最大编号之后
+    nodes = [{'id': 'c'}, {'id': 'a'}]
+    reloaded.assign(nodes, '甲')
+    assert [node['uid'] for node in nodes] == [3, 0]
+    assert reloaded.changed
+
+def test_unknown_version_starts_over(tmp_path):
+    path = tmp_path / 'node_ids.json'
+    path.write_text(json.dumps({'version': 0, 'scopes': {'甲': {'a': 9}}}), encoding='utf-8')
+    allocator = IdAllocator.load(str(path))
+    assert allocator.allocate('甲', 'a') == 0
+
+def test_reused_cypher_variables_stay_apart(tmp_path):
+    path = tmp_path / 'script.cypher'
+    path.write_text('''CREATE (a:人物 {name: "甲"});
+CREATE (b:地点 {name: "乙"});
+CREATE (a:事件 {name: "丙"}), (a)-[:发生于]->(b);
+CREATE (a:人物 {name: "甲"});
+''', encoding='utf-8')
+    collisions = []
+    nodes, rels = parse_cypher_file(str(path), collisions)
+
+    assert [node['id'] for node in nodes] == ['a', 'b', 'a:事件:丙', 'a']
+    assert collisions == [('a', 'a:事件:丙')]
+    # 同一语句中的关系指向本语句创建的节点
+    assert (rels[0]['source_var'], rels[0]['target_var']) == ('a:事件:丙', 'b')
+
+    allocator = IdAllocator()
+    allocator.assign(nodes, '花园口决堤')
+    assert [node['uid'] for node in nodes] == [0, 1, 2, 0]
+
+def test_duplicate_ids_get_their_own_uid():
+    nodes = [{'id': 'a', 'labels': ['人物'], 'properties': {'name': '甲'}},
+             {'id': 'a', 'labels': ['人物'], 'properties': {'name': '乙'}},
+             {'id': 'a', 'labels': ['人物'], 'properties': {'name': '甲'}},
+             {'id': 'a', 'labels': ['人物'], 'properties': {'name': '丙'}}]
+    allocator = IdAllocator()
+    # 与第一个节点完全相同的记录是同一节点，内容不同的改名后各自编号
+    assert allocator.assign(nodes, 'persons.csv') == [('a', 'a#2'), ('a', 'a#3')]
+    assert [(node['id'], node['uid']) for node in nodes] == [('a', 0), ('a#2', 1), ('a', 0), ('a#3', 2)]
+
+def test_duplicate_csv_rows_are_kept(world, capsys):
+    data_dir = os.path.join(os.path.dirname(world), 'neo4j导入数据')
+    write_csv(os.path.join(data_dir, 'persons.csv'),
+              CSV_FILES['persons.csv'] + [['P002', '楚庄王', '30', '116.6', '33.8']])
+    organize(world)
+    assert 'persons.csv 中有 1 个节点的ID与前面的节点重复' in capsys.readouterr().out
+
+    data = load_site_data(world)
+    persons = {node['properties']['人物姓名']: node for node in data['combined']['nodes'] if '人物姓名' in node['properties']}
+    assert persons['楚庄王']['id'] == 'P002#2'
+    assert persons['楚庄王']['uid'] != persons['楚昭王']['uid']
+    assert len({node['uid'] for node in data['combined']['nodes']}) == len(data['combined']['nodes'])
+    # 按ID连接的关系指向第一个节点
+    captured = [rel for rel in data['combined']['relationships'] if rel['type'] == '俘虏']
+    assert [rel['source_uid'] for rel in captured] == [persons['楚昭王']['uid']]
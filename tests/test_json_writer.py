@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""json_writer：分批流式写入的结果与整体编码相同，orjson 与标准库输出一致，内容未变化时不重写文件"""
+
+import json
+import os
+import random
+
+import pytest
+
+import json_writer
+from json_writer import BATCH_SIZE, JsonStreamWriter, encode, encode_batches, write_parts
+
+VALUE = {'name': '花园口决堤', 'lat': 34.75, 'count': 3, 'ok': True, 'none': None,
+         'labels': ['事件', '花园口'], 'nested': {'引号': '"\\\n', 'emoji': '𠀀'}}
+
+@pytest.fixture(params=['orjson', 'json'])
+def backend(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(json_writer, 'orjson', None)
+    return request.param
+
+def test_encode_matches_json(backend):
+    assert encode(VALUE) == json.dumps(VALUE, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    assert json.loads(encode(VALUE, pretty=True)) == VALUE
+    # 超出64位的整数 orjson 无法编码，退回标准库
+    assert encode([2 ** 70]) == b'[1180591620717411303424]'
+
+def test_backends_encode_identically(monkeypatch):
+    # 内容哈希取自编码结果，是否安装 orjson 不能改变输出的字节
+    pytest.importorskip('orjson')
+    rng = random.Random(0)
+    floats = [1e16, 1e-5, 0.1, -0.0, 5e-324, 1.5e300, 123e-7, 1e15, 100.0, 2.5]
+    floats += [rng.random() * 10 ** rng.randint(-30, 30) for _ in range(2000)]
+    values = [floats, VALUE, {'1e5': '0.00001 1e16 \\"1e16"', 'x': [1e22, 12, -3]},
+              {'控制': ''.join(map(chr, range(32))) + '\x7f\u2028'}, [float('nan'), float('inf'), -float('inf')]]
+    expected = [[encode(value, pretty) for pretty in (False, True)] for value in values]
+    monkeypatch.setattr(json_writer, 'orjson', None)
+    assert [[encode(value, pretty) for pretty in (False, True)] for value in values] == expected
+    assert encode(floats[:3]) == b'[1e+16,1e-05,0.1]'
+    # NaN 和无穷大写成 null，输出是合法的 JSON
+    assert encode(values[-1]) == b'[null,null,null]'
+    assert json.loads(expected[0][0]) == floats
+
+def test_stream_matches_whole_document(tmp_path, backend):
+    items = [{'uid': i, 'name': f'节点{i}'} for i in range(BATCH_SIZE * 2 + 7)]
+    assert len(list(encode_batches(items))) == 3
+    for pretty in (False, True):
+        path = str(tmp_path / f'out{pretty}.json')
+        with JsonStreamWriter(path, pretty) as w:
+            w.member('schema_version', 3)
+            w.begin_array('empty')
+            w.items([])
+            w.end_array()
+            w.begin_array('nodes')
+            w.items(items)
+            w.raw_items(b'')
+            w.end_array()
+            w.raw_member('raw', encode(VALUE))
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == {'schema_version': 3, 'empty': [], 'nodes': items, 'raw': VALUE}
+        assert w.bytes == os.path.getsize(path)
+
+def test_unchanged_output_is_not_rewritten(tmp_path):
+    path = str(tmp_path / 'out.json')
+    for expected in (True, False):
+        with JsonStreamWriter(path) as w:
+            w.member('a', 1)
+        assert w.changed is expected
+    assert write_parts(path, [b'{"a"', b':1}']) is False
+    assert write_parts(path, [b'{"a":2}']) is True
+    assert os.listdir(tmp_path) == ['out.json']
+
+def test_failed_write_keeps_old_file(tmp_path):
+    path = tmp_path / 'out.json'
+    path.write_bytes(b'{"a":1}')
+    with pytest.raises(RuntimeError):
+        with JsonStreamWriter(str(path)) as w:
+            w.member('a', 2)
+            raise RuntimeError
+    assert path.read_bytes() == b'{"a":1}'
+    assert os.listdir(tmp_path) == ['out.json']
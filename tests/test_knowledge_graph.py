@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""knowledge_graph：标签、名称、数据集和 uid 索引与逐个扫描节点的结果一致"""
+
+import random
+
+from knowledge_graph import KnowledgeGraph
+
+LABELS = [('人物',), ('历史人物',), ('事件', '花园口'), ('地点',), ('时间',)]
+
+def _random_graph(seed=0, count=300):
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(count):
+        node = {'id': f'n{i % 250}', 'labels': list(rng.choice(LABELS)),
+                'properties': {'name': f'名{rng.randrange(40)}', '朝代': rng.choice(['秦', '汉'])}}
+        if rng.random() < 0.9:
+            node['uid'] = rng.randrange(count * 2)
+        nodes.append((node, rng.choice(['甲', '乙', None])))
+    graph = KnowledgeGraph()
+    for node, dataset in nodes:
+        graph.add_node(node, dataset)
+    return graph, nodes
+
+def test_indexes_match_scan():
+    graph, nodes = _random_graph()
+    for label in ('人物', '事件', '花园口', '不存在'):
+        assert graph.with_label(label) == [i for i, (n, _) in enumerate(nodes) if label in n['labels']]
+    assert graph.with_label('人物', partial=True) == [
+        i for i, (n, _) in enumerate(nodes) if any('人物' in l for l in n['labels'])
+    ]
+    for name in ('名0', '名7', '无'):
+        for labels in ((), ('人物',)):
+            for dataset in (None, '甲'):
+                assert graph.find(name, labels, dataset, {'朝代': '秦'}) == [
+                    i for i, (n, d) in enumerate(nodes)
+                    if n['properties']['name'] == name and n['properties']['朝代'] == '秦'
+                    and all(l in n['labels'] for l in labels) and (dataset is None or d == dataset)
+                ]
+    assert graph.in_dataset('乙') == [i for i, (_, d) in enumerate(nodes) if d == '乙']
+
+    # 重复的 ID 和 uid 指向第一次出现的节点
+    for i, (node, _) in enumerate(nodes):
+        assert graph.index_of(node['id']) == next(j for j, (n, _) in enumerate(nodes) if n['id'] == node['id'])
+        if 'uid' in node:
+            assert graph.index_of_uid(node['uid']) == next(
+                j for j, (n, _) in enumerate(nodes) if n.get('uid') == node['uid'])
+        assert graph.node(i)['properties'] is node['properties']
+    assert graph.index_of_uid(10 ** 6) == -1 and graph.index_of_uid(-1) == -1
+
+def test_label_tuples_are_shared():
+    graph, _ = _random_graph()
+    people = graph.with_label('人物')
+    assert all(graph.node_labels[i] is graph.node_labels[people[0]] for i in people)
+
+def test_edges_and_summary():
+    nodes = [
+        {'id': 'a', 'uid': 5, 'labels': ['人物'], 'properties': {'name': '甲'}},
+        {'id': 'b', 'uid': 2, 'labels': ['事件'], 'properties': {'name': '乙'}},
+        {'id': 'c', 'labels': ['地点'], 'properties': {}}
+    ]
+    rels = [
+        {'source': 'a', 'target': 'b', 'type': '参与', 'source_uid': 5, 'target_uid': 2},
+        {'source': 'b', 'target': 'c', 'type': '位于'},
+        {'source': {'name': '甲'}, 'target': 'zzz', 'type': '位于'}
+    ]
+    graph = KnowledgeGraph.from_nodes(nodes, rels, dataset='甲')
+    assert graph.edge_sources == [0, 1, -1]
+    assert graph.edge_targets == [1, 2, -1]
+    assert graph.edge_type_counts() == {'参与': 1, '位于': 2}
+    assert graph.summary() == {'total_nodes': 3, 'total_relationships': 3,
+                               'events': 1, 'persons': 1, 'locations': 1, 'times': 0}
+    assert graph.match({}, var='c') == [2] and graph.match({}, var='c', dataset='乙') == []
+    assert graph.match({'name': '甲'}, ['人物']) == [0]
+
+def test_from_data_keeps_datasets():
+    data = {
+        'datasets': [{'dataset': '甲', 'nodes': [{'id': 'a'}]}, {'dataset': '乙', 'nodes': [{'id': 'b'}]}],
+        'combined': {
+            'nodes': [{'id': 'a', 'labels': ['人物'], 'properties': {}},
+                      {'id': 'b', 'labels': ['人物'], 'properties': {}}],
+            'relationships': [{'source': 'a', 'target': 'b', 'type': '认识'}]
+        }
+    }
+    graph = KnowledgeGraph.from_data(data)
+    assert graph.node_datasets == ['甲', '乙']
+    assert (graph.edge_sources, graph.edge_targets) == ([0], [1])
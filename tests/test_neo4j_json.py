@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""neo4j_json：流式读取 JSON 数组、识别导出格式、转换为节点和关系"""
+
+import io
+import json
+
+import pytest
+
+from conftest import NEO4J_ROWS
+from neo4j_json import detect_format, iter_json_array, load_export
+
+ITEMS = [
+    {'a': 1, 's': '中文 "引号" ]}', 'n': [1.5, -2, None, True]},
+    [],
+    'x' * 50,
+    12345678901234567890,
+    -0.125e-3,
+    {}
+]
+
+class CountingReader(io.StringIO):
+    """记录 read 的调用次数"""
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8, 13, 64, 1 << 16])
+def test_array_round_trip(chunk_size):
+    text = '  \n' + json.dumps(ITEMS, ensure_ascii=False, indent=1)
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == ITEMS
+
+def test_empty_and_invalid_arrays():
+    assert list(iter_json_array(io.StringIO('[ ]'), 1)) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('{"a": 1}')))
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[1, 2'), 1))
+
+def test_malformed_element_fails_fast():
+    # 损坏的元素之后还有大量数据，不应读到文件末尾才报错
+    text = '[{"a": 1}, {"b": tru}, ' + ', '.join(['{"c": 3}'] * 10000) + ']'
+    reader = CountingReader(text)
+    with pytest.raises(ValueError, match='第 17 个字符'):
+        list(iter_json_array(reader, 8))
+    assert reader.reads < 10
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_rows_format(tmp_path):
+    path = _write(tmp_path, 'rows.json', json.dumps(NEO4J_ROWS, ensure_ascii=False))
+    assert detect_format(path) == 'rows'
+    nodes, rels = load_export(path, 'fs', {'data_source': '淝水.json'})
+    # 重复出现的节点只保留一次
+    assert [node['id'] for node in nodes] == ['fs_1', 'fs_2', 'fs_3', 'fs_4']
+    assert nodes[0]['properties'] == {'名称': '淝水之战', '描述': '东晋以少胜多击败前秦', 'data_source': '淝水.json'}
+    assert [(r['source'], r['type'], r['target']) for r in rels] == [
+        ('fs_1', '参战', 'fs_2'), ('fs_1', '参战', 'fs_3'), ('fs_3', '驻扎', 'fs_4')
+    ]
+    assert rels[0]['data_source'] == '淝水.json'
+
+def test_path_format(tmp_path):
+    start = {'identity': {'low': 1, 'high': 1}, 'labels': ['事件'], 'properties': {'名称': '甲'}}
+    middle = {'identity': 2, 'labels': ['人物'], 'properties': {'名称': '乙'}}
+    end = {'identity': 3, 'labels': ['地点'], 'properties': {'名称': '丙'}}
+    path_row = {'p': {'start': start, 'end': end, 'segments': [
+        {'start': start, 'end': middle, 'relationship': {'type': '参与', 'properties': {}}},
+        {'start': end, 'end': middle, 'relationship': {'type': '位于', 'start': 2, 'end': 3, 'properties': {}}}
+    ]}}
+    path = _write(tmp_path, 'path.json', json.dumps([path_row], ensure_ascii=False))
+    assert detect_format(path) == 'path'
+    nodes, rels = load_export(path, 'p', {})
+    # {low, high} 形式的标识合并为一个整数
+    assert sorted(node['id'] for node in nodes) == ['p_2', 'p_3', f'p_{1 + (1 << 32)}']
+    assert [(r['source'], r['type'], r['target']) for r in rels] == [
+        (f'p_{1 + (1 << 32)}', '参与', 'p_2'), ('p_2', '位于', 'p_3')
+    ]
+
+def test_apoc_format(tmp_path):
+    lines = [
+        {'type': 'node', 'id': '1', 'labels': ['人物'], 'properties': {'name': '甲'}},
+        {'type': 'node', 'id': '2', 'labels': ['人物'], 'properties': {'name': '乙'}},
+        {'type': 'relationship', 'id': '9', 'label': '认识', 'start': {'id': '1'}, 'end': {'id': '2'}, 'properties': {}}
+    ]
+    path = _write(tmp_path, 'apoc.json', '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines) + '\n')
+    assert detect_format(path) == 'apoc'
+    nodes, rels = load_export(path, 'a', {})
+    assert [node['id'] for node in nodes] == ['a_1', 'a_2']
+    assert [(r['source'], r['type'], r['target']) for r in rels] == [('a_1', '认识', 'a_2')]
+
+def test_unknown_format(tmp_path):
+    path = _write(tmp_path, 'other.json', '[{"x": 1}]')
+    with pytest.raises(ValueError):
+        detect_format(path)
+    assert detect_format(_write(tmp_path, 'empty.json', '[]')) is None
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""organize_data：并行解析（-j 4）与串行解析（-j 1）的输出逐字节相同"""
+
+import os
+
+from conftest import make_world, organize
+
+def _outputs(site_dir):
+    files = {}
+    for root, _, names in os.walk(site_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, site_dir)
+            # 状态文件中记录的是数据源的绝对路径
+            if relative == '.organize-state.json':
+                continue
+            with open(path, 'rb') as f:
+                files[relative] = f.read()
+    return files
+
+def test_jobs_do_not_change_outputs(tmp_path, capsys):
+    serial = make_world(str(tmp_path / 'serial'))
+    parallel = make_world(str(tmp_path / 'parallel'))
+    organize(serial, jobs=1)
+    organize(parallel, jobs=4)
+    capsys.readouterr()
+
+    expected = _outputs(serial)
+    assert os.path.join('data', 'manifest.json') in expected and 'node_ids.json' in expected
+    assert os.path.join('data', 'adjacency.bin') in expected
+    assert _outputs(parallel) == expected
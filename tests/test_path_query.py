@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""path_query：最少步数、最小代价和前 k 条路径与穷举全部简单路径的结果一致"""
+
+import random
+
+import pytest
+
+from adjacency import load_adjacency, write_adjacency
+from autocomplete import Autocomplete
+from path_query import DEFAULT_COST, TYPE_COSTS, PathFinder, find_paths, format_path, resolve_names
+
+TYPES = ['关联', '涉及', '参与', '位于']
+
+def _random_index(base_dir, seed, node_count=12, edge_count=24):
+    rng = random.Random(seed)
+    nodes = [{'id': f'n{u}', 'uid': u, 'labels': [], 'properties': {}} for u in range(node_count)]
+    rels = [{'source_uid': rng.randrange(node_count), 'target_uid': rng.randrange(node_count),
+             'type': rng.choice(TYPES)} for _ in range(edge_count)]
+    write_adjacency({'combined': {'nodes': nodes, 'relationships': rels}}, base_dir)
+    return rels
+
+def _all_paths(rels, source, targets, directed, costs):
+    """穷举从 source 出发、在第一个终点处结束、不含重复节点的全部路径：[(代价, 步数, 节点, 关系下标)]"""
+    steps = {}
+    for index, rel in enumerate(rels):
+        s, t = rel['source_uid'], rel['target_uid']
+        if s == t:
+            continue
+        steps.setdefault(s, []).append((t, index))
+        if not directed:
+            steps.setdefault(t, []).append((s, index))
+    results = []
+
+    def walk(nodes, edges, cost):
+        u = nodes[-1]
+        if u in targets:
+            results.append((cost, len(edges), nodes, edges))
+            return
+        for v, index in steps.get(u, ()):
+            if v not in nodes:
+                walk(nodes + [v], edges + [index], cost + costs.get(rels[index]['type'], DEFAULT_COST))
+
+    walk([source], [], 0.0)
+    return results
+
+def _check(path, rels, sources, targets, directed, costs):
+    """路径首尾正确、相邻节点由所记录的关系相连、代价与关系一致"""
+    assert path.nodes[0] in sources and path.nodes[-1] in targets
+    assert len(set(path.nodes)) == len(path.nodes)
+    total = 0.0
+    for (index, type_name, along), u, v in zip(path.edges, path.nodes, path.nodes[1:]):
+        rel = rels[index]
+        assert rel['type'] == type_name
+        assert (rel['source_uid'], rel['target_uid']) == ((u, v) if along else (v, u))
+        assert along or not directed
+        total += costs.get(type_name, DEFAULT_COST)
+    return total
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('directed', [False, True])
+def test_paths_match_enumeration(tmp_path, seed, directed):
+    rels = _random_index(str(tmp_path), seed)
+    rng = random.Random(seed)
+    with load_adjacency(str(tmp_path)) as adjacency:
+        unit = PathFinder(adjacency, directed=directed)
+        weighted = PathFinder(adjacency, TYPE_COSTS, directed)
+        for _ in range(10):
+            sources = set(rng.sample(range(12), rng.choice([1, 1, 2])))
+            targets = set(rng.sample(range(12), rng.choice([1, 1, 2]))) - sources or {11}
+            if sources & targets:
+                continue
+            for max_hops in (None, 2, 3):
+                for finder, costs in ((unit, {}), (weighted, TYPE_COSTS)):
+                    costs = {name: costs.get(name, DEFAULT_COST) for name in TYPES} if costs else {t: 1.0 for t in TYPES}
+                    paths = [p for s in sources for p in _all_paths(rels, s, targets, directed, costs)
+                             if max_hops is None or p[1] <= max_hops]
+                    if finder is unit:
+                        found = finder.shortest_path(sources, targets, max_hops)
+                        expected = min((p[1] for p in paths), default=None)
+                        assert (found and found.hops) == expected
+                        if found:
+                            _check(found, rels, sources, targets, directed, costs)
+                    found = finder.cheapest_path(sources, targets, max_hops)
+                    expected = min((p[0] for p in paths), default=None)
+                    if expected is None:
+                        assert found is None
+                    else:
+                        assert found.cost == pytest.approx(expected)
+                        assert _check(found, rels, sources, targets, directed, costs) == pytest.approx(found.cost)
+                        assert max_hops is None or found.hops <= max_hops
+
+                    # 前 k 条路径：代价序列与穷举结果相同，路径互不相同
+                    k_paths = finder.k_shortest_paths(sources, targets, 4, max_hops)
+                    best = sorted(paths)
+                    assert [p.cost for p in k_paths] == pytest.approx([p[0] for p in best[:4]])
+                    assert len({p.key() for p in k_paths}) == len(k_paths)
+                    for path in k_paths:
+                        assert _check(path, rels, sources, targets, directed, costs) == pytest.approx(path.cost)
+
+def test_invalid_costs_and_same_node(tmp_path):
+    _random_index(str(tmp_path), 0)
+    with load_adjacency(str(tmp_path)) as adjacency:
+        with pytest.raises(ValueError):
+            PathFinder(adjacency, {'关联': 0})
+        finder = PathFinder(adjacency)
+        assert finder.shortest_path([3], [3, 4]).nodes == [3]
+        assert finder.find([3], [10 ** 6]) == []
+
+def test_site_paths(site, capsys):
+    completer = Autocomplete.load(site)
+    sources, names = resolve_names(completer, '蒋介石')
+    assert (sources, names) == ([0], ['蒋介石'])
+    targets, _ = resolve_names(completer, 'uid=3')
+    # 蒋介石 -[下令]-> 花园口决堤 -[发生于]-> 郑州，或经过合并后的 郑州之战
+    paths = find_paths(site, sources, targets, k=3)
+    assert [path.hops for path in paths] == [2, 2]
+    text = format_path(paths[0], {0: '蒋介石', 3: '郑州'})
+    assert text.startswith('蒋介石 ') and text.endswith(' 郑州')
+    assert find_paths(site, sources, targets, directed=True)[0].nodes == [0, 2, 3]
+    assert find_paths(site, [4], targets) == []
+    assert find_paths(str(site) + '-none', sources, targets) is None
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""data_schema：来源表、按列保存的 csv_relationships 与 data-schema.js 的还原一致；读取的字符串已驻留"""
+
+import json
+import sys
+
+from conftest import organize, run_node
+from csv_ingest import intern_row
+from data_schema import (SourceTable, compact_csv_relationships, expand_csv_relationships, expand_data,
+                         expand_node, expand_relationship)
+
+def _plain(value):
+    return json.loads(json.dumps(value, ensure_ascii=False))
+
+ROWS = {
+    'rel_E&P.csv': [
+        {'source_file': 'rel_E&P.csv', 'data_source': 'rel_E&P.csv', 'import_time': 't',
+         'raw_data': {'事件ID': 'E1', '人物序号': 'P1', '描述': None}},
+        {'source_file': 'rel_E&P.csv', 'data_source': 'rel_E&P.csv', 'import_time': 't',
+         'raw_data': {'事件ID': 'E1', '人物序号': 'P2', '描述': '甲'}}
+    ],
+    'rel_P&P.csv': [
+        {'source_file': 'rel_P&P.csv', 'data_source': 'rel_P&P.csv', 'import_time': 't',
+         'raw_data': {'实体ID1': 'P1', '实体ID2': 'E1'}}
+    ],
+    'empty.csv': []
+}
+
+def test_source_table():
+    sources = SourceTable()
+    node = {'id': 'a', 'labels': [], 'properties': {'name': '甲', 'data_source': 'x', 'import_time': 't'}}
+    rel = {'source': 'a', 'target': 'b', 'type': '认识', 'data_source': 'x', 'import_time': 't'}
+    compact_node = sources.compact_node(node)
+    compact_rel = sources.compact_relationship(rel)
+    # 同一来源只登记一次，记录中只保留下标
+    assert sources.entries == [{'data_source': 'x', 'import_time': 't'}]
+    assert compact_node == {'id': 'a', 'labels': [], 'properties': {'name': '甲'}, 'src': 0}
+    assert compact_rel == {'source': 'a', 'target': 'b', 'type': '认识', 'src': 0}
+    assert expand_node(compact_node, sources.entries) == node
+    assert expand_relationship(compact_rel, sources.entries) == rel
+    # 来源信息不全的记录原样保存
+    partial = {'id': 'b', 'labels': [], 'properties': {'data_source': 'y'}}
+    assert sources.compact_node(partial) is partial
+
+def test_csv_relationships_columns():
+    sources = SourceTable()
+    encoded = compact_csv_relationships(ROWS, sources)
+    # 各文件共用一张字符串表，重复的值只出现一次
+    assert encoded['strings'].count('E1') == 1 and encoded['strings'].count('P1') == 1
+    assert encoded['files']['empty.csv'] == {'src': None, 'columns': [], 'values': []}
+    assert expand_csv_relationships(_plain(encoded), sources.entries) == ROWS
+
+    js = run_node(f'return expandCsvRelationships({json.dumps(_plain(encoded), ensure_ascii=False)}, '
+                  f'{json.dumps(sources.entries)});', ['data-schema.js'])
+    assert js == ROWS
+
+def test_version_2_is_still_readable():
+    data = {
+        'schema_version': 2,
+        'nodes': [{'id': 'a', 'uid': 0, 'labels': ['人物'], 'properties': {'data_source': 'x'}}],
+        'relationships': [],
+        'datasets': [{'dataset': '甲', 'nodes': [0], 'relationships': []}],
+        'combined': {'summary': {}, 'persons': [0]},
+        'csv_relationships': {'rel.csv': []}
+    }
+    expanded = expand_data(data)
+    assert expanded['datasets'][0]['nodes'] == data['nodes']
+    assert expanded['combined']['persons'] == data['nodes']
+    assert expanded['csv_relationships'] == {'rel.csv': []}
+    assert run_node(f'return expandData({json.dumps(data, ensure_ascii=False)});', ['data-schema.js']) == expanded
+
+def test_loaded_strings_are_interned(world, capsys):
+    all_data = organize(world)
+    capsys.readouterr()
+    row = intern_row({'事件ID': ''.join(['E', '001']), '权重': 1})
+    assert row['事件ID'] is sys.intern('E001')
+    assert row['权重'] == 1
+    # 同一来源的记录共用一组来源字符串
+    persons = [node for node in all_data['combined']['nodes'] if node['properties'].get('data_source') == 'persons.csv']
+    assert len(persons) == 2
+    assert persons[0]['properties']['import_time'] is persons[1]['properties']['import_time']
+    csv_rows = all_data['csv_relationships']['rel_E&P.csv']
+    assert csv_rows[0]['raw_data']['事件ID'] is csv_rows[1]['raw_data']['事件ID']
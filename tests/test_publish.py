@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""publish：带内容哈希的文件名、预压缩文件与资源清单；页面通过 assets.js 读到的内容与原文件相同"""
+
+import gzip
+import hashlib
+import json
+import os
+
+from conftest import run_node
+from data_shards import load_shards
+from publish import ASSET_MANIFEST, HASH_LENGTH, find_assets, publish
+
+def test_published_assets(site, capsys):
+    manifest = publish(site, use_brotli=False)
+    assets = manifest['assets']
+    assert sorted(assets) == find_assets(site)
+    assert {'data/manifest.json', 'data/adjacency.bin', 'data/autocomplete.json'} <= set(assets)
+    # 默认不生成 data.json，数据只发布一份
+    assert 'data.json' not in assets
+
+    for path, entry in assets.items():
+        with open(os.path.join(site, entry['file']), 'rb') as f:
+            data = f.read()
+        assert entry['bytes'] == len(data)
+        stem, ext = os.path.splitext(path)
+        assert entry['file'] == f"dist/{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+        with open(os.path.join(site, entry['file'] + '.gz'), 'rb') as f:
+            assert gzip.decompress(f.read()) == data
+        with open(os.path.join(site, path), 'rb') as f:
+            original = f.read()
+        if path.endswith('.json'):
+            assert json.loads(data) == json.loads(original)
+        else:
+            assert data == original
+
+    # 再次发布不写入任何文件；内容变化后旧的带哈希文件被删除
+    capsys.readouterr()
+    publish(site, use_brotli=False)
+    assert '写入 0 个文件，删除 0 个旧文件' in capsys.readouterr().out
+    old = assets['data/manifest.json']['file']
+    with open(os.path.join(site, 'data', 'manifest.json'), 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert publish(site, use_brotli=False)['assets']['data/manifest.json']['file'] == old
+    with open(os.path.join(site, 'data', 'stats.json'), 'w', encoding='utf-8') as f:
+        f.write('{"changed": true}')
+    new = publish(site, use_brotli=False)['assets']['data/stats.json']['file']
+    assert new != assets['data/stats.json']['file']
+    assert not os.path.exists(os.path.join(site, assets['data/stats.json']['file']))
+    assert not os.path.exists(os.path.join(site, assets['data/stats.json']['file'] + '.gz'))
+    capsys.readouterr()
+
+def test_javascript_reads_published_assets(site, capsys):
+    publish(site, use_brotli=False)
+    capsys.readouterr()
+    with open(os.path.join(site, ASSET_MANIFEST), encoding='utf-8') as f:
+        assets = json.load(f)['assets']
+    resolved = run_node("return Promise.all([resolveAsset('data/manifest.json'), resolveAsset('./none.json'),"
+                        " fetchShardedData(null, true)]);", ['assets.js', 'data-schema.js'], cwd=site)
+    assert resolved[:2] == [assets['data/manifest.json']['file'], 'none.json']
+    assert resolved[2] == load_shards(site)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""extract_data.resolve_relationships：按 name 索引连接端点，结果与逐对比较全部节点一致"""
+
+import random
+
+from extract_data import resolve_relationships
+from knowledge_graph import KnowledgeGraph
+
+def _brute_force(nodes, rel, side):
+    """逐个比较全部节点：MATCH 条件全部相同且标签全部包含"""
+    match, labels, var = rel[side], rel.get(f'{side}_labels', []), rel.get(f'{side}_var')
+    if not match:
+        return [i for i, node in enumerate(nodes) if node['id'] == var][:1]
+    return [i for i, node in enumerate(nodes)
+            if all(node['properties'].get(k) == v for k, v in match.items())
+            and all(label in node['labels'] for label in labels)]
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    names = [f'名{i}' for i in range(30)]
+    labels = ['人物', '事件', '地点']
+    nodes = [
+        {'id': f'n{i}', 'uid': i, 'labels': [rng.choice(labels)],
+         'properties': {'name': rng.choice(names), '朝代': rng.choice(['秦', '汉'])}}
+        for i in range(200)
+    ]
+    rels = []
+    for _ in range(500):
+        rel = {'type': '关联'}
+        for side in ('source', 'target'):
+            if rng.random() < 0.2:
+                rel[side] = {}
+                rel[f'{side}_var'] = f'n{rng.randrange(220)}'
+            else:
+                rel[side] = {'name': rng.choice(names)}
+                if rng.random() < 0.5:
+                    rel[side]['朝代'] = rng.choice(['秦', '汉'])
+                rel[f'{side}_labels'] = [rng.choice(labels)] if rng.random() < 0.7 else []
+        rels.append(rel)
+
+    graph = KnowledgeGraph.from_nodes(nodes)
+    errors = []
+    resolved = resolve_relationships(graph, rels, errors)
+
+    expected = []
+    expected_errors = []
+    for rel in rels:
+        sources, targets = _brute_force(nodes, rel, 'source'), _brute_force(nodes, rel, 'target')
+        if len(sources) == 1 and len(targets) == 1:
+            expected.append((nodes[sources[0]]['id'], nodes[targets[0]]['id'], sources[0], targets[0]))
+        elif not sources or not targets:
+            expected_errors.append('未找到端点')
+        else:
+            expected_errors.append('匹配到多个节点')
+    assert [(r['source'], r['target'], r['source_uid'], r['target_uid']) for r in resolved] == expected
+    assert [reason for reason, _ in errors] == expected_errors
+    assert expected and expected_errors
+
+def test_relationship_fields():
+    nodes = [
+        {'id': 'a', 'uid': 7, 'labels': ['人物'], 'properties': {'name': '蒋介石'}},
+        {'id': 'b', 'uid': 8, 'labels': ['事件'], 'properties': {'name': '花园口决堤'}}
+    ]
+    rel = {'source': {'name': '蒋介石'}, 'target': {}, 'target_var': 'b', 'type': '下令', 'source_labels': ['人物']}
+    (resolved,) = resolve_relationships(KnowledgeGraph.from_nodes(nodes), [rel])
+    assert resolved == {
+        'source': 'a', 'target': 'b', 'type': '下令',
+        'source_name': '蒋介石', 'target_name': '花园口决堤',
+        'source_uid': 7, 'target_uid': 8
+    }
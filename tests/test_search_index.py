@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""search_index：BM25 分值与按公式逐项计算的结果一致，分桶查询与全表扫描排序相同，search-index.js 返回相同结果"""
+
+import json
+import math
+import os
+
+import pytest
+
+from conftest import run_node
+from search_index import (B, BUCKET_COUNT, K1, SEARCH_DIR, build_search_index, normalize, query_terms, search,
+                          term_bucket, tokenize, write_search_index)
+
+QUERIES = ['蒋介石', '郑州', '花园口决堤', '胡', '楚灭胡 会盟', 'ＮＯＮＥ', '被俘', '黄河']
+
+def _node(uid, name, description=None, labels=('人物',)):
+    props = {'name': name}
+    if description:
+        props['描述'] = description
+    return {'id': f'n{uid}', 'uid': uid, 'labels': list(labels), 'properties': props}
+
+def test_tokenize():
+    assert tokenize('黄河决堤') == ['黄', '河', '决', '堤', '黄河', '河决', '决堤']
+    assert tokenize('Ｎｅｏ4j 图谱') == ['neo4j', '图', '谱', '图谱']
+    assert query_terms('黄河决堤 黄河') == ['黄河', '河决', '决堤']
+    assert query_terms('胡') == ['胡']
+
+def test_bm25_matches_formula(tmp_path):
+    data = {'combined': {'nodes': [_node(0, '黄河'), _node(1, '长江', '黄河决堤'), _node(2, '淮河')],
+                         'relationships': []}}
+    _, buckets, docs = build_search_index(data)
+    assert [doc['uid'] for doc in docs] == [0, 1, 2]
+
+    # 字段加权后的词频与文档长度：名称 3 倍，描述 1 倍
+    lengths = [3 * 3, 3 * 3 + 7, 3 * 3]
+    average = sum(lengths) / 3
+    def expected(tf, df, length):
+        idf = math.log(1 + (3 - df + 0.5) / (df + 0.5))
+        return round(idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average)), 3)
+
+    assert buckets[term_bucket('黄河')]['黄河'] == [[0, 1], [expected(3, 2, lengths[0]), expected(1, 2, lengths[1])]]
+    assert buckets[term_bucket('河')]['河'] == [[0, 1, 2], [expected(3, 3, lengths[0]), expected(1, 3, lengths[1]),
+                                                           expected(3, 3, lengths[2])]]
+    assert buckets[term_bucket('决堤')]['决堤'] == [[1], [expected(1, 1, lengths[1])]]
+    # 名称中的匹配排在描述中的匹配之前
+    write_search_index(data, str(tmp_path))
+    assert [doc['uid'] for _, doc in search(str(tmp_path), '黄河')] == [0, 1]
+
+def _scan(site, query, limit=20, kind=None):
+    """读取全部倒排桶和文档，按同样的规则排序"""
+    search_dir = os.path.join(site, SEARCH_DIR)
+    postings = {}
+    for name in os.listdir(os.path.join(search_dir, 'terms')):
+        with open(os.path.join(search_dir, 'terms', name), encoding='utf-8') as f:
+            bucket = json.load(f)
+        for term, posting in bucket.items():
+            assert f'{term_bucket(term):02x}.json' == name
+            postings[term] = posting
+    docs = []
+    for name in sorted(os.listdir(os.path.join(search_dir, 'docs')), key=lambda n: int(n.split('.')[0])):
+        with open(os.path.join(search_dir, 'docs', name), encoding='utf-8') as f:
+            docs.extend(json.load(f))
+
+    matched, scores = {}, {}
+    for term in query_terms(query):
+        for doc, score in zip(*postings.get(term, ([], []))):
+            matched[doc] = matched.get(doc, 0) + 1
+            scores[doc] = scores.get(doc, 0) + score
+    ranked = sorted(scores, key=lambda d: (-matched[d], -scores[d], d))
+    results = [(round(scores[d], 3), docs[d]) for d in ranked if kind is None or docs[d]['kind'] == kind][:limit]
+    needle = normalize(query).strip()
+    return sorted(results, key=lambda item: needle not in normalize(item[1]['title']))
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_search_matches_scan(site, query):
+    assert search(site, query) == _scan(site, query)
+    assert search(site, query, limit=2, kind='node') == _scan(site, query, 2, 'node')
+
+def test_search_finds_names_and_relationships(site):
+    assert search(site, '蒋介石')[0][1]['title'] == '蒋介石'
+    relationships = search(site, '俘虏', kind='relationship')
+    assert relationships and all(doc['kind'] == 'relationship' for _, doc in relationships)
+    assert search(site, '   ') == []
+    with open(os.path.join(site, SEARCH_DIR, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    assert meta['bucket_count'] == BUCKET_COUNT and meta['data_version'] == 1
+
+def test_javascript_search_matches(site):
+    expected = [[[score, doc] for score, doc in search(site, query, limit=5)] for query in QUERIES]
+    expected.append([[score, doc] for score, doc in search(site, '胡', kind='relationship')])
+    result = run_node(f'''
+        const queries = {json.dumps(QUERIES, ensure_ascii=False)};
+        const results = [];
+        for (const query of queries) results.push(await searchIndex(query, {{ limit: 5 }}));
+        results.push(await searchIndex('胡', {{ kind: 'relationship' }}));
+        return results.map(list => list.map(({{ score, doc }}) => [score, doc]));
+    ''', ['assets.js', 'entity-store.js', 'search-index.js'], cwd=site)
+    assert result == expected
+    assert run_node(f'return {json.dumps(QUERIES, ensure_ascii=False)}.map(searchQueryTerms);',
+                    ['search-index.js']) == [query_terms(query) for query in QUERIES]
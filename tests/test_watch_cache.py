@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""organize_data.IndexCache：监视模式复用输入未变化的派生索引，输出与完整重建相同；只保存未修改的文件时不重新解析和合并"""
+
+import copy
+import os
+
+import organize_data
+from conftest import CSV_FILES, IMPORT_TIME, write_csv
+from content_hash import file_digest
+from geo_regions import REGION_FILE, load_regions
+from id_allocator import IdAllocator
+
+def test_cache_rebuilds_only_on_change():
+    cache = organize_data.IndexCache()
+    builds = []
+    build = lambda: builds.append(1) or len(builds)
+    assert cache.get('search', [1, 2], build) == 1
+    assert cache.get('search', [1, 2], build) == 1
+    assert cache.get('search', [1, 3], build) == 2
+    assert cache.get('other', [1, 3], build) == 3
+
+def _snapshot(site_dir):
+    files = {}
+    for root, _, names in os.walk(os.path.join(site_dir, 'data')):
+        for name in names:
+            with open(os.path.join(root, name), 'rb') as f:
+                files[os.path.relpath(os.path.join(root, name), site_dir)] = f.read()
+    return files
+
+def test_cached_outputs_match_full_rebuild(world, capsys):
+    sources = organize_data.collect_sources(world)
+    organize_data.assign_import_times(sources, IMPORT_TIME, os.path.join(world, '.organize-state.json'))
+    results = organize_data.load_sources(sources)
+    allocator = IdAllocator.load(os.path.join(world, 'node_ids.json'))
+    regions = load_regions(os.path.join(world, REGION_FILE))
+    cache = organize_data.IndexCache()
+
+    def write(results, cache):
+        all_datasets, aggregates = organize_data.merge_sources(sources, results, IMPORT_TIME, allocator, regions)
+        organize_data.write_outputs(all_datasets, world, aggregates=aggregates, cache=cache)
+        return _snapshot(world)
+
+    first = write(results, cache)
+    assert write(results, cache) == first
+
+    # 改名后检索和补全索引重建，图分析的输入不变而复用，结果与不使用缓存时相同
+    changed = copy.deepcopy(results)
+    graph = next(result for result in changed if isinstance(result, dict))
+    graph['nodes'][1]['properties']['name'] = '商启予'
+    analytics = cache.entries['analytics'][1]
+    cached = write(changed, cache)
+    assert cache.entries['analytics'][1] is analytics
+    assert cached != first
+    assert write(changed, None) == cached
+    capsys.readouterr()
+
+def test_saving_unchanged_file_does_not_remerge(world, capsys):
+    sources = organize_data.collect_sources(world)
+    organize_data.assign_import_times(sources, IMPORT_TIME, os.path.join(world, '.organize-state.json'))
+    results = dict(zip((s['path'] for s in sources), organize_data.load_sources(sources)))
+    signatures = {s['path']: organize_data.source_signature(s['path']) for s in sources}
+    digests = {s['path']: file_digest(s['path']) for s in sources}
+    # 合并会给解析结果添加 uid 等字段
+    organize_data.merge_sources(sources, list(results.values()), IMPORT_TIME, IdAllocator(), ())
+    cached = dict(results)
+
+    # 只保存不修改：修改时间变化，不重新解析
+    cypher = next(s['path'] for s in sources if s['kind'] == 'graph' and s['format'] == 'cypher')
+    persons = next(s['path'] for s in sources if s.get('file') == 'persons.csv')
+    for path in (cypher, persons):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not organize_data.reload_sources(sources, signatures, digests, results)
+    assert all(results[path] is cached[path] for path in results)
+    assert signatures[cypher] == organize_data.source_signature(cypher)
+
+    # 内容变化时只重新解析该数据源
+    write_csv(persons, CSV_FILES['persons.csv'] + [['P004', '胡子豹之子', '', '', '']])
+    assert organize_data.reload_sources(sources, signatures, digests, results)
+    assert [path for path in results if results[path] is not cached[path]] == [persons]
+    assert len(results[persons]) == 4
+
+    # 删除数据源
+    os.remove(persons)
+    remaining = organize_data.collect_sources(world)
+    assert organize_data.reload_sources(remaining, signatures, digests, results)
+    assert persons not in results and persons not in signatures
+    capsys.readouterr()